@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',  # gzip/brotli for large responses
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Add CORS middleware
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +104,33 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 
+# Uploaded files
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Resumes and documents are served through /api/media/ after permission
+# checks. Set to 'nginx' (X-Accel-Redirect) or 'apache' (X-Sendfile) to hand
+# the transfer to the web server; None streams from Django.
+PROTECTED_MEDIA_SERVER = None
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
+# Shared cache for anonymous job board and blog responses. Use Redis in
+# production so all workers share entries and invalidations.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+PUBLIC_CACHE_TIMEOUT = 300
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -114,8 +142,65 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson is used when installed, otherwise these behave like DRF's defaults
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# MessagePack responses are offered only when msgpack is installed
+try:
+    import msgpack  # noqa: F401
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] += ('api.renderers.MessagePackRenderer',)
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] += ('api.renderers.MessagePackParser',)
+except ImportError:
+    pass
+
+# Responses smaller than this many bytes are not compressed
+RESPONSE_COMPRESSION_MIN_SIZE = 1024
+
+# Uploaded image variants (longest edge in pixels) and the cap for originals
+IMAGE_VARIANTS = {'thumb': 160, 'medium': 640}
+IMAGE_MAX_DIMENSION = 2048
+
+# Chunked uploads are staged here until they are attached to a record. With
+# several app nodes this must be a volume shared by all of them.
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR', os.path.join(BASE_DIR, 'upload_tmp'))
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = 8 * 1024 * 1024
+
+# 'full' stores a row for every attendance day, 'exceptions' stores only days
+# that differ from the branch calendar's default 'Present' day (see api.attendance)
+ATTENDANCE_STORAGE_MODE = os.environ.get('ATTENDANCE_STORAGE_MODE', 'full')
+ATTENDANCE_TIME_ZONE = 'Asia/Kathmandu'
+
+# Split the attendance tables into monthly partitions on PostgreSQL (see api.partitions)
+ATTENDANCE_PARTITIONING = os.environ.get('ATTENDANCE_PARTITIONING') == '1'
+
+# Background tasks (see api.tasks), run by `manage.py run_worker`
+TASK_WORKERS = 4
+TASK_POLL_INTERVAL = 5
+# Seconds before a task held by an unresponsive worker is retried
+TASK_LOCK_TIMEOUT = 3600
+TASK_SCHEDULES = {
+    # Queues each branch's push once its local push time (BranchCalendar) has passed
+    'nightly-attendance-push': {'task': 'attendance.dispatch', 'cron': '*/10 * * * *', 'timezone': 'UTC'},
+    'activity-log-retention': {'task': 'logs.clean', 'cron': '30 0 * * *', 'timezone': 'Asia/Kathmandu'},
+    'task-history-retention': {'task': 'tasks.prune', 'cron': '45 0 * * *', 'timezone': 'Asia/Kathmandu'},
+    'deletion-log-retention': {'task': 'changes.prune', 'cron': '0 1 * * *', 'timezone': 'Asia/Kathmandu'},
+    'upload-cleanup': {'task': 'uploads.clean', 'cron': '15 1 * * *', 'timezone': 'Asia/Kathmandu'},
 }
 
+# Live activity feed fan-out (see api.activity_stream): 'local' reaches the streams of
+# one process, 'postgres' uses LISTEN/NOTIFY to reach every app node
+ACTIVITY_STREAM_BACKEND = os.environ.get('ACTIVITY_STREAM_BACKEND', 'local')
+
 # JWT settings
 from datetime import timedelta
 SIMPLE_JWT = {
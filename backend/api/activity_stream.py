@@ -0,0 +1,270 @@
+"""
+Live activity feed: new ActivityLog entries pushed to SuperAdmins over
+Server-Sent Events (GET /api/activity-logs/stream/).
+
+Entries are published once their ActivityLog row is committed and fanned
+out in-process to every open stream, each with its own bounded queue, so an
+idle feed runs no queries. The default 'local' backend only reaches streams
+in the process that wrote the entry, which is enough for a single ASGI
+process. With ACTIVITY_STREAM_BACKEND = 'postgres' entries are sent with
+NOTIFY in the writing transaction instead, and a listener thread in every
+process LISTENs for them and feeds its local fan-out, so every app node
+sees every entry.
+
+Entries are only serialized when they can reach a stream: with the local
+backend a process with no open stream skips them. The writer cannot see the
+streams of other processes, so with the postgres backend every entry is
+sent.
+
+EventSource cannot send the Authorization header and the access token must
+not appear in a URL. The client POSTs to the stream URL with its access
+token and gets back a link with a signed ?token=, which can be opened for
+ACTIVITY_STREAM_TOKEN_MAX_AGE seconds. The browser's own reconnects reuse
+the link while it is valid; once it is refused the client asks for a new one.
+
+A reconnecting client sends Last-Event-ID and gets the entries it missed
+from the table first. Streams end after ACTIVITY_STREAM_MAX_AGE seconds and
+the browser reconnects on its own, so a stream whose client went away
+without notice does not stay open forever.
+
+Streams need the ASGI app (admin_bridge.asgi); under WSGI one would tie up a
+worker for as long as it is open.
+"""
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import connection, connections, transaction, close_old_connections
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+from .models import ActivityLog
+from .serializers import ActivityLogSerializer
+from .fast_serializers import ActivityLogValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_STREAM_BACKEND = getattr(settings, 'ACTIVITY_STREAM_BACKEND', 'local')
+ACTIVITY_STREAM_MAX_AGE = getattr(settings, 'ACTIVITY_STREAM_MAX_AGE', 600)
+# Seconds a signed stream link can be opened (and reopened) for
+ACTIVITY_STREAM_TOKEN_MAX_AGE = getattr(settings, 'ACTIVITY_STREAM_TOKEN_MAX_AGE', 60)
+
+STREAM_TOKEN_SALT = 'api.activity_stream'
+
+NOTIFY_CHANNEL = 'activity_log'
+# PostgreSQL caps NOTIFY payloads at 8000 bytes, larger entries are sent as their id
+NOTIFY_MAX_PAYLOAD = 7900
+HEARTBEAT_INTERVAL = 15
+RECONNECT_DELAY_MS = 3000
+SUBSCRIBER_QUEUE_SIZE = 500
+# Entries replayed to a reconnecting client at most
+REPLAY_LIMIT = 500
+
+
+class Broker:
+    """In-process fan-out to the asyncio queues of open streams, publish() works from any thread"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+        with self.lock:
+            self.subscribers.add(subscriber)
+        if ACTIVITY_STREAM_BACKEND == 'postgres':
+            start_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def has_subscribers(self):
+        with self.lock:
+            return bool(self.subscribers)
+
+    def publish(self, entry):
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, entry)
+            except RuntimeError:
+                # Its event loop is closed
+                self.unsubscribe((loop, queue))
+
+
+def _offer(queue, entry):
+    if queue.full():
+        # A stream that cannot keep up loses its oldest entries
+        queue.get_nowait()
+    queue.put_nowait(entry)
+
+
+broker = Broker()
+
+
+def serialize_entry(instance):
+    """JSON-ready dict of an entry, as the list endpoints render it"""
+    return json.loads(json.dumps(ActivityLogSerializer(instance).data, cls=JSONEncoder))
+
+
+def publish_activity(sender, instance, created, raw=False, **kwargs):
+    """post_save handler that publishes new entries after they are committed"""
+    if not created or raw:
+        return
+    postgres = ACTIVITY_STREAM_BACKEND == 'postgres' and connection.vendor == 'postgresql'
+    if not postgres and not broker.has_subscribers():
+        return
+    entry = serialize_entry(instance)
+    if postgres:
+        payload = json.dumps(entry)
+        if len(payload.encode()) > NOTIFY_MAX_PAYLOAD:
+            payload = json.dumps({'id': entry['id']})
+        with connection.cursor() as cursor:
+            # Delivered when the transaction commits, dropped on rollback
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, payload])
+    else:
+        transaction.on_commit(lambda: broker.publish(entry))
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """Start this process's LISTEN thread once"""
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=listen_forever, name='activity-stream-listener', daemon=True)
+            _listener.start()
+
+
+def listen_forever():
+    while True:
+        try:
+            listen()
+        except Exception:
+            logger.exception("Activity stream listener failed, reconnecting")
+            time.sleep(5)
+
+
+def listen():
+    # A connection of its own, outside Django's per-thread handling
+    listener = connections.create_connection('default')
+    listener.ensure_connection()
+    raw = listener.connection
+    raw.autocommit = True
+    try:
+        with raw.cursor() as cursor:
+            cursor.execute(f'LISTEN {NOTIFY_CHANNEL}')
+        while True:
+            if select.select([raw], [], [], HEARTBEAT_INTERVAL) == ([], [], []):
+                continue
+            raw.poll()
+            while raw.notifies:
+                entry = json.loads(raw.notifies.pop(0).payload)
+                if set(entry) == {'id'}:
+                    entry = load_entry(entry['id'])
+                if entry is not None:
+                    broker.publish(entry)
+    finally:
+        listener.close()
+
+
+def load_entry(pk):
+    try:
+        return serialize_entry(ActivityLog.objects.select_related('user').get(pk=pk))
+    except ActivityLog.DoesNotExist:
+        return None
+    finally:
+        close_old_connections()
+
+
+def make_stream_token(user):
+    """Signed token that opens the stream as `user` for ACTIVITY_STREAM_TOKEN_MAX_AGE seconds"""
+    return signing.dumps({'user': user.pk}, salt=STREAM_TOKEN_SALT)
+
+
+def stream_user(request):
+    """
+    The user of a signed ?token= from make_stream_token() on GET, or of the
+    access token in the Authorization header. None if neither is valid.
+    """
+    try:
+        token = request.GET.get('token') if request.method == 'GET' else None
+        if token:
+            try:
+                data = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=ACTIVITY_STREAM_TOKEN_MAX_AGE)
+            except signing.BadSignature:
+                return None
+            return get_user_model().objects.filter(pk=data.get('user'), is_active=True).first()
+
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = header and authentication.get_raw_token(header)
+        if not raw_token:
+            return None
+        try:
+            return authentication.get_user(authentication.get_validated_token(raw_token))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+    finally:
+        close_old_connections()
+
+
+def matches(entry, filters):
+    return all(entry.get(field) == value for field, value in filters.items() if value)
+
+
+def missed_entries(last_id, filters):
+    """Entries after `last_id`, oldest first"""
+    queryset = ActivityLog.objects.filter(pk__gt=last_id).order_by('pk')
+    if filters.get('user_role'):
+        queryset = queryset.filter(user__role=filters['user_role'])
+    if filters.get('action_type'):
+        queryset = queryset.filter(action_type=filters['action_type'])
+    try:
+        return ActivityLogValuesSerializer(ActivityLogValuesSerializer.prepare(queryset[:REPLAY_LIMIT])).data
+    finally:
+        close_old_connections()
+
+
+def format_event(entry):
+    return f"id: {entry['id']}\ndata: {json.dumps(entry)}\n\n"
+
+
+async def event_stream(filters, last_id=None):
+    """SSE body: missed entries since `last_id`, then new entries as they are published"""
+    # Subscribed before the replay query, so nothing falls between the two
+    subscriber = broker.subscribe()
+    _, queue = subscriber
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        replayed = last_id or 0
+        if last_id:
+            for entry in await sync_to_async(missed_entries)(last_id, filters):
+                replayed = entry['id']
+                yield format_event(entry)
+
+        deadline = time.monotonic() + ACTIVITY_STREAM_MAX_AGE
+        while time.monotonic() < deadline:
+            try:
+                entry = await asyncio.wait_for(queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if entry['id'] > replayed and matches(entry, filters):
+                yield format_event(entry)
+    finally:
+        broker.unsubscribe(subscriber)
@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 from .models import (
     User, Branch, Employee, Student, Lead,
-    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance
+    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance,
+    BranchCalendar, BranchHoliday, Kiosk, ScheduledTask, QueuedTask, TaskRun
 )
 
 class UserAdmin(BaseUserAdmin):
@@ -195,6 +196,44 @@ class EmployeeAttendanceAdmin(admin.ModelAdmin):
     get_role.short_description = 'Role'
 
 
+class BranchCalendarAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'working_days', 'default_time_in', 'default_time_out', 'timezone', 'push_time')
+    search_fields = ('branch__name',)
+
+
+class BranchHolidayAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'date', 'name')
+    list_filter = ('branch',)
+    search_fields = ('name', 'branch__name')
+    date_hierarchy = 'date'
+
+
+class KioskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'branch', 'last_seq', 'last_synced_at')
+    list_filter = ('branch',)
+    readonly_fields = ('last_seq', 'last_synced_at', 'created_at', 'updated_at')
+
+
+class ScheduledTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'task', 'cron', 'timezone', 'enabled', 'next_run_at', 'last_run_at')
+    list_filter = ('enabled', 'task')
+    readonly_fields = ('next_run_at', 'last_run_at', 'created_at', 'updated_at')
+
+
+class TaskRunInline(admin.TabularInline):
+    model = TaskRun
+    extra = 0
+    readonly_fields = ('attempt', 'worker', 'status', 'result', 'error', 'started_at', 'finished_at')
+    can_delete = False
+
+
+class QueuedTaskAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by', 'updated_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    inlines = [TaskRunInline]
+
+
 # Register models
 admin.site.register(User, UserAdmin)
 admin.site.register(Branch, BranchAdmin)
@@ -206,3 +245,8 @@ admin.site.register(JobResponse, JobResponseAdmin)
 admin.site.register(Blog, BlogAdmin)
 admin.site.register(StudentAttendance, StudentAttendanceAdmin)
 admin.site.register(EmployeeAttendance, EmployeeAttendanceAdmin)
+admin.site.register(BranchCalendar, BranchCalendarAdmin)
+admin.site.register(BranchHoliday, BranchHolidayAdmin)
+admin.site.register(Kiosk, KioskAdmin)
+admin.site.register(ScheduledTask, ScheduledTaskAdmin)
+admin.site.register(QueuedTask, QueuedTaskAdmin)
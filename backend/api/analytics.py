@@ -0,0 +1,361 @@
+"""
+Attendance analytics of a branch over a window of days
+(GET /api/attendance/analytics/).
+
+The window's attendance is loaded into a person × day matrix of status codes
+(the archive's codes, 0 for a day without a record) and a matching matrix of
+arrival times, and every figure is computed over the whole matrix with NumPy:
+
+- attendance rate: days attended (Present or Late, Half Day counts as half)
+  out of the expected days, On Leave days are not expected
+- absence streaks: the longest run of Absent working days and the current one
+- weekday pattern: the branch's attendance rate per weekday and each
+  person's most absent weekday
+- late arrivals: the branch's late rate and minutes late per week, each
+  person's late rate, average minutes late and late trend (the least squares
+  slope of their late rate, in percentage points per 30 days)
+
+Expected days are the branch's working days (BranchCalendar, BranchHoliday)
+from the person's start date to today. In 'exceptions' storage mode a working
+day without a row counts as Present at the default time, as it does in
+api.attendance. Archived months are read from their packed statuses.
+
+Live rows come from one query of plain columns, read without building model
+instances. Results are cached per branch, type and window for
+ATTENDANCE_ANALYTICS_CACHE_TIMEOUT seconds and missed when the branch's
+people change (see api.cache); attendance edits show up once they expire.
+"""
+import hashlib
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, CharField, IntegerField, Value, When
+from django.db.models.functions import Cast, ExtractHour, ExtractMinute
+
+from .models import (
+    Branch, User, Employee, Student, EmployeeAttendance, StudentAttendance,
+    EmployeeAttendanceArchive, StudentAttendanceArchive,
+)
+from .attendance import BranchCalendars, exceptions_mode, employee_people, student_people
+from .attendance_archive import STATUS_CODES, BITS_PER_DAY
+from .attendance_push import branch_local_now
+from .cache import get_versions
+
+ATTENDANCE_ANALYTICS_CACHE_TIMEOUT = getattr(settings, 'ATTENDANCE_ANALYTICS_CACHE_TIMEOUT', 300)
+ATTENDANCE_ANALYTICS_MAX_DAYS = getattr(settings, 'ATTENDANCE_ANALYTICS_MAX_DAYS', 366)
+
+# type: (person model, attendance model, archive model, code field, people loader)
+KINDS = {
+    'employee': (Employee, EmployeeAttendance, EmployeeAttendanceArchive, 'employee_id', employee_people),
+    'student': (Student, StudentAttendance, StudentAttendanceArchive, 'student_id', student_people),
+}
+
+PRESENT = STATUS_CODES['Present']
+ABSENT = STATUS_CODES['Absent']
+LATE = STATUS_CODES['Late']
+HALF_DAY = STATUS_CODES['Half Day']
+ON_LEAVE = STATUS_CODES['On Leave']
+
+WEEKDAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+# Fewer arrivals than this give no late trend
+MIN_TREND_DAYS = 10
+
+PEOPLE_COLUMNS = [
+    'id', 'code', 'name', 'expected_days', 'present', 'late', 'half_day', 'absent', 'on_leave',
+    'not_marked', 'attendance_rate', 'longest_absence_streak', 'current_absence_streak',
+    'most_absent_weekday', 'late_rate', 'avg_minutes_late', 'late_trend',
+]
+
+
+def minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def load_matrix(branch_id, kind, start, end):
+    """
+    The people of the branch and their attendance from `start` to `end` as
+    (people, codes, arrivals), `codes` a person × day uint8 matrix of status
+    codes and `arrivals` the matching float32 matrix of time_in in minutes
+    after midnight, NaN where unknown. Only the times of Late days are loaded
+    from live rows, nothing else reads them.
+    """
+    person_model, model, archive_model, _, load_people = KINDS[kind]
+    people = load_people(person_model.objects.filter(branch_id=branch_id))
+    days = (end - start).days + 1
+    codes = np.zeros((len(people), days), dtype=np.uint8)
+    arrivals = np.full((len(people), days), np.nan, dtype=np.float32)
+    if not people:
+        return people, codes, arrivals
+
+    person_ids = np.array([person['id'] for person in people], dtype=np.int64)
+    order = np.argsort(person_ids)
+
+    def person_index(ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        found = np.clip(np.searchsorted(person_ids[order], ids), 0, len(people) - 1)
+        return order[found], person_ids[order[found]] == ids
+
+    # Archived months first, live rows written after archiving win over them
+    archives = list(archive_model.objects.filter(
+        **{f'{kind}__branch_id': branch_id}, month__gte=start.replace(day=1), month__lte=end,
+    ).values_list(f'{kind}_id', 'month', 'statuses', 'time_in', 'overrides'))
+    if archives:
+        owners, months, packed, times_in, overrides = zip(*archives)
+        rows, known = person_index(owners)
+        # 3 bits per day, least significant first, as attendance_archive.pack_statuses writes them
+        bits = np.unpackbits(
+            np.frombuffer(b''.join(bytes(value) for value in packed), dtype=np.uint8).reshape(len(archives), -1),
+            axis=1, bitorder='little',
+        )[:, :31 * BITS_PER_DAY].reshape(len(archives), 31, BITS_PER_DAY)
+        month_codes = (bits * (1 << np.arange(BITS_PER_DAY, dtype=np.uint8))).sum(axis=2, dtype=np.uint8)
+        month_arrivals = np.repeat(
+            np.array([minutes(value) if value else np.nan for value in times_in], dtype=np.float32)[:, None], 31, axis=1
+        )
+        for index, days_overridden in enumerate(overrides):
+            for day, override in days_overridden.items():
+                if 'time_in' in override:
+                    value = override['time_in']
+                    month_arrivals[index, int(day) - 1] = (
+                        int(value[:2]) * 60 + int(value[3:5]) if value else np.nan
+                    )
+        offsets = np.array([(month - start).days for month in months])[:, None] + np.arange(31)
+        keep = (month_codes > 0) & (offsets >= 0) & (offsets < days) & known[:, None]
+        row_index = np.broadcast_to(rows[:, None], keep.shape)[keep]
+        codes[row_index, offsets[keep]] = month_codes[keep]
+        arrivals[row_index, offsets[keep]] = month_arrivals[keep]
+
+    # Plain numbers and ISO date strings that NumPy converts in bulk, only late arrivals need a time
+    live = model.objects.filter(
+        **{f'{kind}__branch_id': branch_id}, date__range=(start, end), status__in=list(STATUS_CODES),
+    ).order_by().values_list(
+        f'{kind}_id',
+        Cast('date', CharField()),
+        Case(*[When(status=status, then=Value(code)) for status, code in STATUS_CODES.items()],
+             output_field=IntegerField()),
+        Case(When(status='Late', then=ExtractHour('time_in') * 60 + ExtractMinute('time_in')),
+             output_field=IntegerField()),
+    )
+    # Read without the ORM's per-row conversions
+    sql, params = live.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        records = cursor.fetchall()
+    if records:
+        owners, dates, status_codes, arrival = zip(*records)
+        rows, known = person_index(owners)
+        offsets = (np.array(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+        codes[rows[known], offsets[known]] = np.array(status_codes, dtype=np.uint8)[known]
+        arrivals[rows[known], offsets[known]] = np.array(arrival, dtype=np.float32)[known]
+    return people, codes, arrivals
+
+
+def longest_runs(matrix):
+    """Longest run of True per row of a boolean matrix"""
+    longest = np.zeros(matrix.shape[0], dtype=np.int64)
+    if matrix.shape[1] == 0:
+        return longest
+    edges = np.diff(np.pad(matrix.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    _, run_ends = np.nonzero(edges == -1)
+    np.maximum.at(longest, run_rows, run_ends - run_starts)
+    return longest
+
+
+def trailing_runs(matrix):
+    """Run of True at the end of each row of a boolean matrix"""
+    width = matrix.shape[1]
+    last_false = np.where(~matrix, np.arange(width), -1).max(axis=1, initial=-1)
+    return width - 1 - last_false
+
+
+def trend(values, weights, x):
+    """Weighted least squares slope of each row of `values` over `x`, NaN with too little data"""
+    n = weights.sum(axis=-1)
+    sx = weights @ x
+    sy = (weights * values).sum(axis=-1)
+    sxx = weights @ (x * x)
+    sxy = (weights * values) @ x
+    denominator = n * sxx - sx * sx
+    slope = np.divide(n * sxy - sx * sy, denominator, out=np.full(n.shape, np.nan), where=denominator > 0)
+    return np.where(n >= MIN_TREND_DAYS, slope, np.nan)
+
+
+def ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.full(np.shape(numerator), np.nan),
+                     where=np.asarray(denominator) > 0)
+
+
+def as_list(values, digits=1):
+    """Rounded JSON-ready list, NaN as None"""
+    return [None if value != value else value for value in np.round(values, digits).tolist()]
+
+
+def as_number(value, digits=1):
+    """Rounded JSON-ready number, NaN as None"""
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def compute(codes, arrivals, expected, weekdays, default_arrival, implicit_present=False):
+    """
+    Branch summary and per-person columns of a person × day status matrix.
+    `expected` marks the days each person was expected, `weekdays` is the
+    weekday of each day and `default_arrival` the branch's default time_in
+    in minutes.
+    """
+    codes = np.where(expected, codes, 0)
+    if implicit_present:
+        missing = expected & (codes == 0)
+        codes = np.where(missing, PRESENT, codes).astype(np.uint8)
+        arrivals = np.where(missing, default_arrival, arrivals)
+
+    present, absent, late = codes == PRESENT, codes == ABSENT, codes == LATE
+    half_day, on_leave = codes == HALF_DAY, codes == ON_LEAVE
+    arrived = present | late
+    timed_late = late & ~np.isnan(arrivals)
+    minutes_late = np.where(timed_late, np.maximum(arrivals - default_arrival, 0), 0).astype(np.float32)
+    days = np.arange(codes.shape[1], dtype=np.float32)
+
+    # Streaks run over working days only, a weekend does not end one
+    working = expected.any(axis=0)
+    absent_working = absent[:, working]
+
+    weekday_onehot = np.eye(7, dtype=np.float32)[weekdays]
+    absences_by_weekday = absent.astype(np.float32) @ weekday_onehot
+    most_absent = np.where(absences_by_weekday.max(axis=1) > 0, absences_by_weekday.argmax(axis=1), -1)
+
+    def totals(axis):
+        """Day counts per person (axis 1) or per day (axis 0)"""
+        counts = {name: np.count_nonzero(matrix, axis=axis) for name, matrix in (
+            ('expected', expected), ('present', present), ('late', late), ('half_day', half_day),
+            ('absent', absent), ('on_leave', on_leave), ('timed_late', timed_late),
+        )}
+        counts['arrived'] = counts['present'] + counts['late']
+        counts['attended'] = counts['arrived'] + 0.5 * counts['half_day']
+        counts['counted'] = counts['expected'] - counts['on_leave']
+        counts['not_marked'] = counts['expected'] - counts['arrived'] - counts['half_day'] \
+            - counts['absent'] - counts['on_leave']
+        counts['minutes_late'] = minutes_late.sum(axis=axis, dtype=np.float64)
+        return counts
+
+    by_person = totals(1)
+    people = {
+        'expected_days': by_person['expected'],
+        'present': by_person['present'],
+        'late': by_person['late'],
+        'half_day': by_person['half_day'],
+        'absent': by_person['absent'],
+        'on_leave': by_person['on_leave'],
+        'not_marked': by_person['not_marked'],
+        'attendance_rate': 100 * ratio(by_person['attended'], by_person['counted']),
+        'longest_absence_streak': longest_runs(absent_working),
+        'current_absence_streak': trailing_runs(absent_working),
+        'most_absent_weekday': most_absent,
+        'late_rate': 100 * ratio(by_person['late'], by_person['arrived']),
+        'avg_minutes_late': ratio(by_person['minutes_late'], by_person['timed_late']),
+        'late_trend': 100 * 30 * trend(late.astype(np.float32), arrived.astype(np.float32), days),
+    }
+
+    # Branch level, from per-day totals
+    by_day = totals(0)
+    weeks = np.arange(codes.shape[1]) // 7
+
+    def weekly(values):
+        return np.bincount(weeks, weights=values)
+
+    summary = {
+        'people': codes.shape[0],
+        'expected_days': int(by_day['expected'].sum()),
+        'status_counts': {
+            status: int(by_day[key].sum()) for status, key in (
+                ('Present', 'present'), ('Absent', 'absent'), ('Late', 'late'),
+                ('Half Day', 'half_day'), ('On Leave', 'on_leave'),
+            )
+        },
+        'not_marked': int(by_day['not_marked'].sum()),
+        'attendance_rate': 100 * ratio(by_day['attended'].sum(), by_day['counted'].sum()),
+        'weekday_rates': 100 * ratio(np.bincount(weekdays, weights=by_day['attended'], minlength=7),
+                                     np.bincount(weekdays, weights=by_day['counted'], minlength=7)),
+        'absent_now': int(np.count_nonzero(people['current_absence_streak'])),
+        'longest_absence_streak': int(people['longest_absence_streak'].max(initial=0)),
+        'weekly_late_rate': 100 * ratio(weekly(by_day['late']), weekly(by_day['arrived'])),
+        'weekly_avg_minutes_late': ratio(weekly(by_day['minutes_late']), weekly(by_day['timed_late'])),
+        'late_rate': 100 * ratio(by_day['late'].sum(), by_day['arrived'].sum()),
+        'late_trend': 100 * 30 * trend(np.nan_to_num(ratio(by_day['late'], by_day['arrived'])),
+                                       by_day['arrived'].astype(np.float64), days.astype(np.float64)),
+    }
+    return summary, people
+
+
+def branch_analytics(branch_id, kind, start, end):
+    """Analytics of the branch's employees or students from `start` to `end`, cached"""
+    person_model = KINDS[kind][0]
+    versions = '|'.join(get_versions([person_model, User, Branch]))
+    key = f'attendance-analytics:{kind}:{branch_id}:{start}:{end}:' + hashlib.md5(versions.encode()).hexdigest()
+    result = cache.get(key)
+    if result is None:
+        result = build_analytics(branch_id, kind, start, end)
+        cache.set(key, result, ATTENDANCE_ANALYTICS_CACHE_TIMEOUT)
+    return result
+
+
+def build_analytics(branch_id, kind, start, end):
+    calendars = BranchCalendars([branch_id], start, end)
+    calendar = calendars.get(branch_id)
+    today = branch_local_now(calendar).date()
+    # Days to come are not expected yet
+    last = min(end, today)
+    people, codes, arrivals = load_matrix(branch_id, kind, start, end)
+
+    day_list = [start + timedelta(days=offset) for offset in range(codes.shape[1])]
+    working = np.array([calendars.is_working_day(branch_id, day) and day <= last for day in day_list], dtype=bool)
+    since = np.array(
+        [((person['since'] or start) - start).days for person in people], dtype=np.int64
+    ).reshape(-1, 1)
+    expected = working[None, :] & (np.arange(codes.shape[1])[None, :] >= since)
+    weekdays = (start.weekday() + np.arange(codes.shape[1])) % 7
+
+    summary, columns = compute(
+        codes, arrivals, expected, weekdays, minutes(calendar.default_time_in), implicit_present=exceptions_mode()
+    )
+
+    weekday_rates = as_list(summary['weekday_rates'])
+    # Sunday first, as branch calendars list their working days
+    working_weekdays = sorted(calendar.working_weekdays, key=lambda day: (day + 1) % 7)
+    weeks = [(start + timedelta(days=7 * week)).isoformat() for week in range(len(summary['weekly_late_rate']))]
+    most_absent = [WEEKDAY_NAMES[day] if day >= 0 else None for day in columns['most_absent_weekday'].tolist()]
+    name = [f"{person['first_name']} {person['last_name']}" for person in people]
+    rows = zip(
+        [person['id'] for person in people], [person[KINDS[kind][3]] for person in people], name,
+        *(columns[column].tolist() for column in PEOPLE_COLUMNS[3:10]),
+        as_list(columns['attendance_rate']),
+        columns['longest_absence_streak'].tolist(), columns['current_absence_streak'].tolist(),
+        most_absent,
+        as_list(columns['late_rate']), as_list(columns['avg_minutes_late']), as_list(columns['late_trend']),
+    )
+    return {
+        'branch': branch_id,
+        'type': kind,
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'summary': {
+            'people': summary['people'],
+            'expected_days': summary['expected_days'],
+            'status_counts': summary['status_counts'],
+            'not_marked': summary['not_marked'],
+            'attendance_rate': as_number(summary['attendance_rate']),
+            'weekday_rates': {WEEKDAY_NAMES[day]: weekday_rates[day] for day in working_weekdays},
+            'absent_now': summary['absent_now'],
+            'longest_absence_streak': summary['longest_absence_streak'],
+            'late_rate': as_number(summary['late_rate']),
+            'late_trend': as_number(summary['late_trend']),
+            'weekly_late': {
+                'weeks': weeks,
+                'late_rate': as_list(summary['weekly_late_rate']),
+                'avg_minutes_late': as_list(summary['weekly_avg_minutes_late']),
+            },
+        },
+        'people': {'columns': PEOPLE_COLUMNS, 'rows': [list(row) for row in rows]},
+    }
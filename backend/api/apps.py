@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "api"
+
+    def ready(self):
+        from .signals import connect_signals
+        connect_signals()
+        # Fill the task registry used by run_worker
+        from . import task_handlers  # noqa: F401
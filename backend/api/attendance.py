@@ -0,0 +1,197 @@
+"""
+Implicit attendance.
+
+With ATTENDANCE_STORAGE_MODE = 'exceptions' only attendance that differs from
+the default is stored: any status other than 'Present', times other than the
+branch's default hours, or remarks. A working day without a row means the
+person was present during the default hours. The read endpoints add those
+default rows in memory, using each branch's BranchCalendar (working weekdays
+and default hours, Sunday to Friday 09:00-17:00 when a branch has none) and
+BranchHoliday rows. The nightly push that wrote a 'Present' row per person
+is skipped in this mode.
+
+With the default 'full' mode every day is stored as before.
+"""
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BranchCalendar, BranchHoliday
+
+ATTENDANCE_STORAGE_MODE = getattr(settings, 'ATTENDANCE_STORAGE_MODE', 'full')
+ATTENDANCE_TIME_ZONE = getattr(settings, 'ATTENDANCE_TIME_ZONE', 'Asia/Kathmandu')
+
+
+def exceptions_mode():
+    """Check if only attendance exceptions are stored"""
+    return ATTENDANCE_STORAGE_MODE == 'exceptions'
+
+
+def local_today():
+    """Today's date where attendance is taken"""
+    return timezone.localdate(timezone=ZoneInfo(ATTENDANCE_TIME_ZONE))
+
+
+def parse_date_range(params, default_start, default_end):
+    """(start, end) from 'start_date'/'end_date' query params, raises ValueError"""
+    start = params.get('start_date')
+    end = params.get('end_date')
+    start = datetime.strptime(start, '%Y-%m-%d').date() if start else default_start
+    end = datetime.strptime(end, '%Y-%m-%d').date() if end else default_end
+    return start, end
+
+
+class BranchCalendars:
+    """Working-day lookups for a set of branches over a date range, loaded in two queries"""
+
+    def __init__(self, branch_ids, start, end):
+        branch_ids = set(branch_ids)
+        self.calendars = {
+            calendar.branch_id: calendar
+            for calendar in BranchCalendar.objects.filter(branch_id__in=branch_ids)
+        }
+        self.holidays = set(
+            BranchHoliday.objects.filter(branch_id__in=branch_ids, date__range=(start, end))
+            .values_list('branch_id', 'date')
+        )
+        self.weekdays = {}
+
+    def get(self, branch_id):
+        calendar = self.calendars.get(branch_id)
+        if calendar is None:
+            # Unsaved calendar with the model defaults
+            calendar = self.calendars[branch_id] = BranchCalendar(branch_id=branch_id)
+        return calendar
+
+    def is_working_day(self, branch_id, day):
+        weekdays = self.weekdays.get(branch_id)
+        if weekdays is None:
+            weekdays = self.weekdays[branch_id] = self.get(branch_id).working_weekdays
+        return day.weekday() in weekdays and (branch_id, day) not in self.holidays
+
+
+def employee_people(queryset):
+    """Employees as plain dicts for expand_rows(), ordered like attendance rows"""
+    people = list(queryset.order_by('user__first_name', 'pk').values(
+        'id', 'employee_id', 'branch_id', 'joining_date', 'created_at',
+        first_name=F('user__first_name'), last_name=F('user__last_name'),
+        role=F('user__role'), branch_name=F('branch__name'),
+    ))
+    for person in people:
+        person['since'] = person['joining_date'] or timezone.localdate(person['created_at'])
+    return people
+
+
+def student_people(queryset):
+    """Students as plain dicts for expand_rows()"""
+    people = list(queryset.order_by('pk').values(
+        'id', 'student_id', 'branch_id', 'enrollment_date',
+        first_name=F('user__first_name'), last_name=F('user__last_name'),
+        branch_name=F('branch__name'),
+    ))
+    for person in people:
+        person['since'] = person['enrollment_date']
+    return people
+
+
+def employee_row(person, day, status, time_in=None, time_out=None, remarks=None):
+    """Row not backed by an EmployeeAttendance, shaped like EmployeeAttendanceValuesSerializer output"""
+    return {
+        'id': None,
+        'employee': person['id'],
+        'employee_name': f"{person['first_name']} {person['last_name']}",
+        'employee_role': person['role'],
+        'employee_id': person['employee_id'],
+        'branch_name': person['branch_name'],
+        'date': day.isoformat(),
+        'time_in': time_in.isoformat() if time_in else None,
+        'time_out': time_out.isoformat() if time_out else None,
+        'status': status,
+        'remarks': remarks,
+        'created_by': None,
+        'updated_by': None,
+        'created_at': None,
+        'updated_at': None,
+    }
+
+
+def student_row(person, day, status, time_in=None, time_out=None, remarks=None):
+    """Row not backed by a StudentAttendance, shaped like StudentAttendanceValuesSerializer output"""
+    return {
+        'id': None,
+        'student': person['id'],
+        'student_name': f"{person['first_name']} {person['last_name']}",
+        'student_id': person['student_id'],
+        'branch_name': person['branch_name'],
+        'date': day.isoformat(),
+        'time_in': time_in.isoformat() if time_in else None,
+        'time_out': time_out.isoformat() if time_out else None,
+        'status': status,
+        'remarks': remarks,
+        'created_by': None,
+        'updated_by': None,
+        'created_at': None,
+        'updated_at': None,
+    }
+
+
+def employee_default_row(person, day, calendar):
+    """Implicit 'Present' row"""
+    return employee_row(person, day, 'Present', calendar.default_time_in, calendar.default_time_out)
+
+
+def student_default_row(person, day, calendar):
+    """Implicit 'Present' row"""
+    return student_row(person, day, 'Present', calendar.default_time_in, calendar.default_time_out)
+
+
+def student_placeholder_row(person, day):
+    """Row for a student day without attendance"""
+    return {
+        'id': None,
+        'student': person['id'],
+        'student_name': f"{person['first_name']} {person['last_name']}",
+        'student_id': person['student_id'],
+        'branch_name': person['branch_name'],
+        'date': day.isoformat(),
+        'time_in': None,
+        'time_out': None,
+        'status': 'Not Marked',
+        'remarks': None,
+    }
+
+
+def expand_rows(records, people, start, end, person_key, default_row=None, missing_row=None,
+                newest_first=True):
+    """
+    Rows for every person and day from `start` to `end`.
+
+    Stored `records` (values serializer rows) are used where they exist.
+    Otherwise `default_row(person, day, calendar)` fills working days between
+    the person's start date and today, and `missing_row(person, day)`, if
+    given, fills the remaining days.
+    """
+    stored = {(row[person_key], row['date']): row for row in records}
+    calendars = BranchCalendars({person['branch_id'] for person in people}, start, end)
+    today = local_today()
+
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    if newest_first:
+        days.reverse()
+
+    rows = []
+    for day in days:
+        day_str = day.isoformat()
+        for person in people:
+            row = stored.get((person['id'], day_str))
+            if row is not None:
+                rows.append(row)
+            elif default_row is not None and person['since'] <= day <= today \
+                    and calendars.is_working_day(person['branch_id'], day):
+                rows.append(default_row(person, day, calendars.get(person['branch_id'])))
+            elif missing_row is not None:
+                rows.append(missing_row(person, day))
+    return rows
@@ -0,0 +1,181 @@
+"""
+Compact archive of closed attendance months.
+
+`manage.py archive_attendance` moves the rows of closed months out of
+EmployeeAttendance / StudentAttendance into one archive row per person and
+month. Statuses are packed 3 bits per day (12 bytes per month, code 0 for a
+day without a record). The most common time_in/time_out pair of the month is
+stored once, and only days with other times or with remarks are kept in
+`overrides`. Audit columns (created_by, updated_by, timestamps) are dropped.
+
+by_employee, by_student and by_date read archived days alongside the live
+rows. A live row for an archived day (written after archiving) wins, and is
+folded into the archive the next time its month is archived.
+"""
+import calendar
+from collections import Counter, defaultdict
+from datetime import date, time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance import employee_row, student_row
+from .changes import delete_untracked
+from .models import (
+    EmployeeAttendance, StudentAttendance, EmployeeAttendanceArchive, StudentAttendanceArchive,
+)
+
+# Index is the stored 3-bit code, 0 means no record for the day
+ARCHIVE_STATUSES = (None, 'Present', 'Absent', 'Late', 'Half Day', 'On Leave')
+STATUS_CODES = {status: code for code, status in enumerate(ARCHIVE_STATUSES) if status}
+BITS_PER_DAY = 3
+STATUS_BYTES = (31 * BITS_PER_DAY + 7) // 8
+
+# person_key: (live model, archive model, row builder)
+ARCHIVES = {
+    'employee': (EmployeeAttendance, EmployeeAttendanceArchive, employee_row),
+    'student': (StudentAttendance, StudentAttendanceArchive, student_row),
+}
+
+
+def pack_statuses(codes):
+    """Pack per-day status codes into bytes, 3 bits per day"""
+    value = 0
+    for index, code in enumerate(codes):
+        value |= code << (index * BITS_PER_DAY)
+    return value.to_bytes(STATUS_BYTES, 'little')
+
+
+def unpack_statuses(data, days):
+    """Per-day status codes for the first `days` days of a packed month"""
+    value = int.from_bytes(bytes(data), 'little')
+    mask = (1 << BITS_PER_DAY) - 1
+    return [(value >> (index * BITS_PER_DAY)) & mask for index in range(days)]
+
+
+def next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _time(value):
+    return time.fromisoformat(value) if value else None
+
+
+def read_archive(archive):
+    """{day of month: (status code, time_in, time_out, remarks)} for the recorded days"""
+    days = calendar.monthrange(archive.month.year, archive.month.month)[1]
+    recorded = {}
+    for index, code in enumerate(unpack_statuses(archive.statuses, days)):
+        if not code:
+            continue
+        override = archive.overrides.get(str(index + 1), {})
+        time_in = _time(override['time_in']) if 'time_in' in override else archive.time_in
+        time_out = _time(override['time_out']) if 'time_out' in override else archive.time_out
+        recorded[index + 1] = (code, time_in, time_out, override.get('remarks'))
+    return recorded
+
+
+def build_archive(archive, recorded):
+    """Fill `archive` from {day of month: (status code, time_in, time_out, remarks)}"""
+    days = calendar.monthrange(archive.month.year, archive.month.month)[1]
+    codes = [0] * days
+    for day, (code, *rest) in recorded.items():
+        codes[day - 1] = code
+
+    times = Counter((time_in, time_out) for code, time_in, time_out, remarks in recorded.values())
+    archive.time_in, archive.time_out = times.most_common(1)[0][0]
+
+    overrides = {}
+    for day, (code, time_in, time_out, remarks) in recorded.items():
+        override = {}
+        if time_in != archive.time_in:
+            override['time_in'] = time_in.isoformat() if time_in else None
+        if time_out != archive.time_out:
+            override['time_out'] = time_out.isoformat() if time_out else None
+        if remarks:
+            override['remarks'] = remarks
+        if override:
+            overrides[str(day)] = override
+
+    archive.statuses = pack_statuses(codes)
+    archive.overrides = overrides
+    archive.updated_at = timezone.now()
+    return archive
+
+
+def archive_month(person_key, month, batch_size=500, dry_run=False):
+    """
+    Move the live rows of `month` into archive rows, return how many rows were moved.
+
+    Rows with a status outside ARCHIVE_STATUSES are left in place.
+    """
+    model, archive_model, row = ARCHIVES[person_key]
+    field = f'{person_key}_id'
+    rows = model.objects.filter(
+        date__gte=month, date__lt=next_month(month), status__in=list(STATUS_CODES)
+    )
+    if dry_run:
+        return rows.count()
+
+    with transaction.atomic():
+        recorded = defaultdict(dict)
+        values = rows.order_by().values_list(field, 'date', 'status', 'time_in', 'time_out', 'remarks')
+        for person_id, day, status, time_in, time_out, remarks in values.iterator():
+            recorded[person_id][day.day] = (STATUS_CODES[status], time_in, time_out, remarks)
+        if not recorded:
+            return 0
+
+        existing = {
+            getattr(archive, field): archive
+            for archive in archive_model.objects.filter(month=month, **{f'{field}__in': list(recorded)})
+        }
+        created, updated = [], []
+        moved = 0
+        for person_id, days in recorded.items():
+            moved += len(days)
+            archive = existing.get(person_id)
+            if archive is not None:
+                # Rows written after the month was archived win over the archived days
+                updated.append(build_archive(archive, {**read_archive(archive), **days}))
+            else:
+                created.append(build_archive(archive_model(month=month, **{field: person_id}), days))
+
+        archive_model.objects.bulk_create(created, batch_size=batch_size)
+        archive_model.objects.bulk_update(
+            updated, ['statuses', 'time_in', 'time_out', 'overrides', 'updated_at'], batch_size=batch_size
+        )
+        # The days are still served from the archive, clients have nothing to drop
+        delete_untracked(rows)
+    return moved
+
+
+def archived_records(person_key, people, start=None, end=None):
+    """Archived days of `people` between `start` and `end`, shaped like live values rows"""
+    model, archive_model, row = ARCHIVES[person_key]
+    people = {person['id']: person for person in people}
+    archives = archive_model.objects.filter(**{f'{person_key}_id__in': list(people)})
+    if start is not None:
+        archives = archives.filter(month__gte=date(start.year, start.month, 1))
+    if end is not None:
+        archives = archives.filter(month__lte=end)
+
+    rows = []
+    for archive in archives.order_by('-month'):
+        person = people[getattr(archive, f'{person_key}_id')]
+        for day, (code, time_in, time_out, remarks) in sorted(read_archive(archive).items(), reverse=True):
+            day = archive.month.replace(day=day)
+            if (start is None or day >= start) and (end is None or day <= end):
+                rows.append(row(person, day, ARCHIVE_STATUSES[code], time_in, time_out, remarks))
+    return rows
+
+
+def with_archived(records, person_key, people, start=None, end=None):
+    """Live `records` plus the archived days of `people`, newest first"""
+    archived = archived_records(person_key, people, start, end)
+    if not archived:
+        return records
+    live = {(record[person_key], record['date']) for record in records}
+    merged = records + [record for record in archived if (record[person_key], record['date']) not in live]
+    # Stable sort keeps the live name order within a day
+    merged.sort(key=lambda record: record['date'], reverse=True)
+    return merged
@@ -0,0 +1,173 @@
+"""
+Nightly attendance push: a default 'Present' record for everyone without one today.
+
+The push runs per branch. Every branch has its own local time zone and push
+time on its BranchCalendar (Asia/Kathmandu at 21:00 by default). The
+'attendance.dispatch' task runs every few minutes and queues an
+'attendance.push_branch' task for each branch whose push time has passed
+(see api.task_handlers). Worker pools run those concurrently, and the
+(branch, local date) run key queues each push only once.
+
+Each branch is pushed in short batch transactions, so a failing branch
+leaves the others alone and no transaction stays open for long.
+scripts/daily_attendance_push.py pushes every branch at once.
+"""
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    StudentAttendance, EmployeeAttendance, Employee, Student, User, Branch, BranchCalendar,
+)
+from .attendance import exceptions_mode
+from .locks import try_lock
+
+logger = logging.getLogger(__name__)
+
+PUSH_BATCH_SIZE = 500
+
+
+def get_push_user():
+    """User the default records are created by: a SuperAdmin, or any user as a fallback"""
+    admin_user = User.objects.filter(role='SuperAdmin').first()
+    if not admin_user:
+        logger.error("No SuperAdmin user found to create attendance records")
+        admin_user = User.objects.first()
+        if admin_user:
+            logger.info(f"Using {admin_user.email} as fallback for attendance creation")
+    return admin_user
+
+
+def get_calendar(branch_id):
+    """The branch's calendar, or an unsaved one with the defaults"""
+    return BranchCalendar.objects.filter(branch_id=branch_id).first() or BranchCalendar(branch_id=branch_id)
+
+
+def branch_local_now(calendar):
+    return datetime.now(ZoneInfo(calendar.timezone))
+
+
+def due_branches(now=None):
+    """(branch id, local date) of every branch whose push time has passed today"""
+    calendars = {calendar.branch_id: calendar for calendar in BranchCalendar.objects.all()}
+    due = []
+    for branch_id in Branch.objects.values_list('id', flat=True):
+        calendar = calendars.get(branch_id) or BranchCalendar(branch_id=branch_id)
+        try:
+            tz = ZoneInfo(calendar.timezone)
+        except (ValueError, LookupError):
+            logger.error(f"Branch {branch_id} has an unknown time zone '{calendar.timezone}'")
+            continue
+        local = (now or datetime.now(tz)).astimezone(tz)
+        if local.time() >= calendar.push_time:
+            due.append((branch_id, local.date()))
+    return due
+
+
+def push_branch_attendance(branch_id, day=None, admin_user=None):
+    """
+    Create the default records of one branch for `day` (today in the branch's time zone).
+
+    Returns the number of (employee, student) records created.
+    """
+    calendar = get_calendar(branch_id)
+    if day is None:
+        day = branch_local_now(calendar).date()
+    elif isinstance(day, str):
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+
+    # Days without a record already read as 'Present', nothing to push
+    if exceptions_mode():
+        logger.info(f"ATTENDANCE_STORAGE_MODE is 'exceptions', skipping branch {branch_id}")
+        return 0, 0
+
+    admin_user = admin_user or get_push_user()
+    if not admin_user:
+        logger.error("No users found in the database")
+        return 0, 0
+
+    # Another node or a manual run may be pushing this branch already
+    with try_lock(f'attendance-push:{branch_id}') as acquired:
+        if not acquired:
+            logger.warning(f"Another attendance push is running for branch {branch_id}, skipping {day}")
+            return 0, 0
+
+        employees = _push_records(
+            EmployeeAttendance, 'employee',
+            Employee.objects.filter(branch_id=branch_id).exclude(attendance_records__date=day),
+            day, calendar, admin_user,
+        )
+        students = _push_records(
+            StudentAttendance, 'student',
+            Student.objects.filter(branch_id=branch_id).exclude(attendance_records__date=day),
+            day, calendar, admin_user,
+        )
+
+    logger.info(
+        f"Branch {branch_id} attendance push for {day}: created {employees} employee "
+        f"and {students} student records"
+    )
+    return employees, students
+
+
+def _push_records(model, person_field, missing, day, calendar, admin_user):
+    """Bulk create default records for the people in `missing`, one short transaction per batch"""
+    # Records left without a status are completed first
+    model.objects.filter(
+        **{f'{person_field}__branch_id': calendar.branch_id}, date=day, status=''
+    ).update(status='Present', updated_by=admin_user, updated_at=timezone.now())
+
+    person_ids = list(missing.values_list('id', flat=True))
+    created = 0
+    for start in range(0, len(person_ids), PUSH_BATCH_SIZE):
+        batch = person_ids[start:start + PUSH_BATCH_SIZE]
+        with transaction.atomic():
+            # A record saved meanwhile wins, its row is skipped
+            model.objects.bulk_create([
+                model(**{
+                    f'{person_field}_id': person_id,
+                    'date': day,
+                    'status': 'Present',
+                    'time_in': calendar.default_time_in,
+                    'time_out': calendar.default_time_out,
+                    'created_by': admin_user,
+                    'field_clock': {'_push': True},
+                })
+                for person_id in batch
+            ], ignore_conflicts=True)
+            # Nobody wrote the defaults, so kiosk events recorded earlier still
+            # win over them (see api.kiosk_sync). This also counts the rows
+            # inserted, bulk_create() returns the skipped ones too.
+            pushed_at = timezone.now()
+            created += model.objects.filter(
+                **{f'{person_field}_id__in': batch}, date=day, field_clock={'_push': True}
+            ).update(field_clock={'_synced': pushed_at.isoformat()}, updated_at=pushed_at)
+    return created
+
+
+def push_attendance_data():
+    """Push every branch for its own local date, one branch failing does not stop the rest"""
+    admin_user = get_push_user()
+    if not admin_user:
+        logger.error("No users found in the database")
+        return
+
+    for branch_id in Branch.objects.values_list('id', flat=True):
+        try:
+            push_branch_attendance(branch_id, admin_user=admin_user)
+        except Exception as e:
+            logger.error(f"Error pushing attendance for branch {branch_id}: {str(e)}")
+
+
+def main():
+    """Main script function"""
+    logger.info("Starting attendance push process")
+
+    try:
+        push_attendance_data()
+        logger.info("Attendance push process completed successfully")
+    except Exception as e:
+        logger.error(f"Error during attendance push: {str(e)}")
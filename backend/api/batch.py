@@ -0,0 +1,170 @@
+"""
+Batched API reads (POST /api/batch/).
+
+A screen that needs several lists sends their paths in one request instead
+of one request each:
+
+    {"requests": ["employees/?fields=id,employee_id", "leads/", "/api/jobs/"]}
+
+and gets the response of each, keyed by the path as it was sent:
+
+    {"responses": {"leads/": {"status": 200, "body": [...]}, ...}}
+
+Paths are relative to the API root. Each one is resolved with the API's URL
+configuration and its view is called directly as a GET, with the user the
+batch request was authenticated as, so the view's own permission classes,
+scoping and filters apply as they do on a separate request. Middleware runs
+once for the whole batch, so the URL-level access checks of the configured
+middleware (those with a check_access() method, e.g.
+RoleBasedAccessMiddleware and BranchAccessMiddleware) are run on every read
+before its view: a read is refused exactly when the same GET on its own
+would be. Only the request-level work is shared: TLS, authentication, CORS
+and the rest of the middleware run once for the whole batch.
+
+Reads do not depend on each other, so they are dispatched concurrently on a
+small thread pool. Async views (the activity stream) and the batch endpoint
+itself cannot be batched. Responses that are not JSON, such as file
+downloads, are reported with their status and no body.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve, reverse
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+BATCH_WORKERS = getattr(settings, 'BATCH_WORKERS', 4)
+
+# Headers of the batch request that are not passed on to its reads
+DROPPED_META = (
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE',
+    'HTTP_ACCEPT_ENCODING', 'wsgi.input',
+)
+# Headers of a read's response that are returned with its body
+KEPT_HEADERS = ('ETag', 'Last-Modified')
+
+_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+
+class BatchError(Exception):
+    """A batch request that cannot be accepted"""
+
+
+class BatchSubRequest(HttpRequest):
+    """A GET made on behalf of `parent`, authenticated as the same user"""
+
+    def __init__(self, parent, path, query_string):
+        super().__init__()
+        self.parent = parent
+        self.method = 'GET'
+        self.path = self.path_info = path
+        self.META = {key: value for key, value in parent.META.items() if key not in DROPPED_META}
+        self.META.update({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query_string,
+            'HTTP_ACCEPT': 'application/json',
+        })
+        self.GET = QueryDict(query_string)
+        self.COOKIES = parent.COOKIES
+        # The user the middleware saw on the batch request, for check_access()
+        self.user = getattr(parent, '_request', parent).user
+        # Picked up by DRF's Request in place of its authenticators
+        self._force_auth_user = parent.user
+        self._force_auth_token = parent.auth
+
+    def _get_scheme(self):
+        return self.parent.scheme
+
+
+def api_root():
+    return reverse('batch')[:-len('batch/')]
+
+
+def parse_path(path, root):
+    """(path, query string) of a read, the path made absolute. Raises BatchError."""
+    if not isinstance(path, str) or not path:
+        raise BatchError("Every request must be a path.")
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc:
+        raise BatchError(f"'{path}' is not a relative path.")
+    relative = parts.path[len(root):] if parts.path.startswith(root) else parts.path.lstrip('/')
+    return root + relative, parts.query
+
+
+def access_checks():
+    """check_access() of every middleware in settings.MIDDLEWARE that has one"""
+    checks = []
+    for middleware_path in settings.MIDDLEWARE:
+        middleware_class = import_string(middleware_path)
+        if hasattr(middleware_class, 'check_access'):
+            checks.append(middleware_class(lambda request: None).check_access)
+    return checks
+
+
+def dispatch(request, path, query_string, checks=()):
+    """Status, body and validators of one read, after the middleware `checks`"""
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return {'status': 404, 'body': {"detail": "Not found."}}
+    if match.url_name == 'batch' or iscoroutinefunction(match.func):
+        return {'status': 400, 'body': {"detail": "This endpoint cannot be batched."}}
+
+    sub_request = BatchSubRequest(request, path, query_string)
+    try:
+        for check in checks:
+            refused = check(sub_request)
+            if refused is not None:
+                return {'status': refused.status_code, 'body': {"detail": refused.content.decode()}}
+        response = match.func(sub_request, *match.args, **match.kwargs)
+    except Http404:
+        return {'status': 404, 'body': {"detail": "Not found."}}
+    finally:
+        # Runs on a pool thread, its connections are not closed at the end of the request
+        connections.close_all()
+
+    result = {'status': response.status_code}
+    if hasattr(response, 'data'):
+        result['body'] = response.data
+    elif not response.streaming and response.get('Content-Type', '').startswith('application/json'):
+        result['body'] = json.loads(response.content)
+    else:
+        result['body'] = None
+        response.close()
+    headers = {header: response[header] for header in KEPT_HEADERS if response.has_header(header)}
+    if headers:
+        result['headers'] = headers
+    return result
+
+
+def run_batch(request, paths):
+    """Responses to `paths`, keyed by path, read concurrently. Raises BatchError."""
+    if not isinstance(paths, list) or not paths:
+        raise BatchError("'requests' must be a list of paths.")
+    if len(paths) > BATCH_MAX_REQUESTS:
+        raise BatchError(f"At most {BATCH_MAX_REQUESTS} requests per batch.")
+
+    root = api_root()
+    parsed = {path: parse_path(path, root) for path in paths}
+    checks = access_checks()
+    futures = {
+        path: _executor.submit(dispatch, request, full_path, query_string, checks)
+        for path, (full_path, query_string) in parsed.items()
+    }
+    responses = {}
+    for path, future in futures.items():
+        try:
+            responses[path] = future.result()
+        except Exception:
+            logger.exception("Batched read %s failed", path)
+            responses[path] = {'status': 500, 'body': {"detail": "Internal server error."}}
+    return responses
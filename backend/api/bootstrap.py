@@ -0,0 +1,76 @@
+"""
+Composite dashboard bootstrap (GET /api/bootstrap/).
+
+A dashboard used to open with a burst of requests: the current user, the
+stats of the role and the first page of two or three lists. The bootstrap
+endpoint returns all of them in one response. Its sections do not depend on
+each other, so they are built concurrently on a small thread pool, each with
+its own database connection.
+
+Every section is cached on its own for BOOTSTRAP_CACHE_TIMEOUT seconds, per
+user and under the version counters of the models it reads (see api.cache):
+saving a lead misses the cached lead list and stats, while the branch and
+job sections stay cached. A section without models is built every time. A
+section that fails is reported under "errors" and the others are still
+returned.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .cache import get_versions
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_CACHE_TIMEOUT = getattr(settings, 'BOOTSTRAP_CACHE_TIMEOUT', 60)
+BOOTSTRAP_WORKERS = getattr(settings, 'BOOTSTRAP_WORKERS', 4)
+# Rows in the first page of each list
+BOOTSTRAP_PAGE_SIZE = getattr(settings, 'BOOTSTRAP_PAGE_SIZE', 20)
+
+_executor = ThreadPoolExecutor(max_workers=BOOTSTRAP_WORKERS, thread_name_prefix='bootstrap')
+
+
+def section_cache_key(name, user, models):
+    versions = '|'.join(get_versions(models))
+    return f'bootstrap:{name}:{user.pk}:' + hashlib.md5(versions.encode()).hexdigest()
+
+
+def build_section(name, build, models, user):
+    """Data of one section, from the cache when its models have not changed since"""
+    try:
+        key = section_cache_key(name, user, models) if models else None
+        if key is not None:
+            data = cache.get(key)
+            if data is not None:
+                return data
+        data = build()
+        if key is not None:
+            cache.set(key, data, BOOTSTRAP_CACHE_TIMEOUT)
+        return data
+    finally:
+        # Runs on a pool thread, its connections are not closed at the end of the request
+        connections.close_all()
+
+
+def build_sections(sections, user):
+    """
+    Build `sections`, a {name: (build, models)} dict, concurrently. Returns
+    the {name: data} of the sections built and the {name: message} of the
+    ones that failed.
+    """
+    futures = {
+        name: _executor.submit(build_section, name, build, models, user)
+        for name, (build, models) in sections.items()
+    }
+    data, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            data[name] = future.result()
+        except Exception as e:
+            logger.exception("Bootstrap section %s failed", name)
+            errors[name] = str(e)
+    return data, errors
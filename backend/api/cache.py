@@ -0,0 +1,63 @@
+"""
+Shared cache for anonymous API responses and bootstrap sections.
+
+Cached entries are keyed on a version counter per model. Saving or deleting a
+model instance bumps its counter after the transaction commits, so every
+cached response built from that model is missed from then on and expires on
+its own. Counters start from the current time, so an evicted counter never
+comes back at a value that old entries were stored under.
+"""
+import time
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PUBLIC_CACHE_TIMEOUT = getattr(settings, 'PUBLIC_CACHE_TIMEOUT', 300)
+
+# Models whose changes invalidate cached responses: public ones and bootstrap sections
+CACHED_MODELS = (
+    ('api', 'Blog'),
+    ('api', 'Job'),
+    ('api', 'Branch'),
+    ('api', 'User'),
+    ('api', 'Employee'),
+    ('api', 'Student'),
+    ('api', 'Lead'),
+    ('api', 'JobResponse'),
+)
+
+
+def version_key(model):
+    return f'cache-version:{model._meta.label_lower}'
+
+
+def get_versions(models):
+    """Current version counters of `models`, creating missing ones"""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+def bump_version(sender, **kwargs):
+    """Signal handler that invalidates cached responses built from `sender`"""
+    key = version_key(sender)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+    transaction.on_commit(bump)
+
+
+def response_cache_key(request, models):
+    """Cache key for the response to an anonymous request"""
+    key = '|'.join([request.get_host(), request.get_full_path()] + get_versions(models))
+    return 'public-response:' + hashlib.md5(key.encode()).hexdigest()
@@ -0,0 +1,205 @@
+"""
+Incremental change feed for the list endpoints.
+
+`GET /api/<resource>/?updated_since=<token>` returns the rows of the list
+created or updated after the token was issued, the ids deleted since, and a
+token for the next request:
+
+    {"results": [...], "deleted": [4, 9], "token": "1792371283749585", "more": false}
+
+An empty `updated_since=` returns every row and starts the feed. Rows come
+in pages of CHANGE_FEED_PAGE_SIZE, oldest change first; while "more" is true
+the token is for the next page and the client asks again right away. Changed rows
+are found through the `updated_at` index of each model, deletes through
+DeletionLog, which a pre_delete signal fills for TRACKED_MODELS (see
+api.signals). Tombstones are kept for DELETION_LOG_RETENTION_DAYS; an older
+token gets 410 Gone and the client fetches the whole list again.
+
+A tombstone records the branch and the user the row was listed under, and a
+requester only gets the ids of their own scope (see
+ChangeFeedMixin.get_deletion_scope). Rows that leave a scope without being
+deleted, e.g. a student moving to another branch or a job being deactivated,
+get a tombstone under the scope they left, written by a pre_save signal.
+Ids the requester can still see are never reported as deleted.
+
+Maintenance that removes rows without changing what clients see, like
+archiving or compacting attendance, deletes with delete_untracked() and
+writes no tombstones.
+
+Tokens are opaque to clients. They hold the time the feed was read, less
+TOKEN_OVERLAP. updated_at is set when a row is saved, not when its
+transaction commits, so a row saved before a read and committed after it
+would be skipped by a token of the read time. The overlap, minutes by
+default, covers any transaction shorter than that; rows and deleted ids in
+it are sent again, and clients apply results by id, so a repeat only
+overwrites a row with itself.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DeletionLog
+
+DELETION_LOG_RETENTION_DAYS = getattr(settings, 'DELETION_LOG_RETENTION_DAYS', 30)
+
+# Longer than any transaction that saves tracked rows is expected to run
+TOKEN_OVERLAP = timedelta(seconds=getattr(settings, 'CHANGE_FEED_OVERLAP_SECONDS', 300))
+
+CHANGE_FEED_PAGE_SIZE = getattr(settings, 'CHANGE_FEED_PAGE_SIZE', 500)
+
+# Models whose deletes are recorded in DeletionLog, with the lookups of the
+# branch and the user a row is listed under (alternatives are coalesced)
+TRACKED_MODELS = {
+    ('api', 'User'): (('employee_profile__branch', 'student_profile__branch'), 'id'),
+    ('api', 'Branch'): ('id', None),
+    ('api', 'Employee'): ('branch', 'user'),
+    ('api', 'Student'): ('branch', 'user'),
+    ('api', 'Lead'): ('branch', None),
+    ('api', 'Job'): ('branch', None),
+    ('api', 'JobResponse'): ('job__branch', 'student__user'),
+    ('api', 'Blog'): ('branch', None),
+    ('api', 'EmployeeAttendance'): ('employee__branch', 'employee__user'),
+    ('api', 'StudentAttendance'): ('student__branch', 'student__user'),
+}
+
+# Fields whose change takes a row out of some lists, by model
+SCOPE_FIELDS = {
+    ('api', 'Employee'): ('branch_id',),
+    ('api', 'Student'): ('branch_id',),
+    ('api', 'Lead'): ('branch_id',),
+    ('api', 'Job'): ('branch_id', 'is_active'),
+    ('api', 'Blog'): ('branch_id', 'is_published'),
+}
+
+# Rows listed under a person's branch that move with them: (model, person field)
+PERSON_ROWS = {
+    ('api', 'Employee'): (('api', 'EmployeeAttendance', 'employee'),),
+    ('api', 'Student'): (('api', 'StudentAttendance', 'student'),),
+}
+
+
+class TokenExpired(Exception):
+    """The token is older than the deletion log, changes since then are unknown"""
+
+
+def make_token(moment=None):
+    """Token for the changes after `moment` (now less the overlap by default)"""
+    if moment is None:
+        moment = timezone.now() - TOKEN_OVERLAP
+    return str(int(moment.timestamp() * 1e6))
+
+
+def parse_token(token):
+    """Time a token was issued at, None for an empty token. Raises ValueError."""
+    if not token:
+        return None
+    try:
+        return datetime.fromtimestamp(int(token) / 1e6, tz=dt_timezone.utc)
+    except (TypeError, OverflowError, OSError):
+        raise ValueError("Invalid token")
+
+
+def make_page_token(started, updated_at, pk):
+    """Token for the rows after (updated_at, pk) of a feed read at `started`"""
+    return '.'.join(str(value) for value in (make_token(started), make_token(updated_at), pk))
+
+
+def parse_page_token(token):
+    """(feed read at, updated_at, pk) of a page token, None for other tokens. Raises ValueError."""
+    if not token or '.' not in token:
+        return None
+    try:
+        started, updated_at, pk = token.split('.')
+        return parse_token(started), parse_token(updated_at), int(pk)
+    except ValueError:
+        raise ValueError("Invalid token")
+
+
+def check_token(since):
+    """Raise TokenExpired if deletes after `since` may have been pruned"""
+    if since is not None and since < timezone.now() - timedelta(days=DELETION_LOG_RETENTION_DAYS):
+        raise TokenExpired()
+
+
+def _lookup(path):
+    if path is None:
+        return None
+    if isinstance(path, tuple):
+        return Coalesce(*(F(alternative) for alternative in path))
+    return F(path)
+
+
+def row_scope(model, pk, using='default'):
+    """(branch id, user id) the row `pk` of `model` is listed under"""
+    branch, owner = TRACKED_MODELS[(model._meta.app_label, model._meta.object_name)]
+    lookups = {'scope_branch': _lookup(branch), 'scope_owner': _lookup(owner)}
+    row = model._base_manager.using(using).filter(pk=pk).values(
+        **{name: lookup for name, lookup in lookups.items() if lookup is not None}
+    ).first() or {}
+    return row.get('scope_branch'), row.get('scope_owner')
+
+
+def log_deletion(sender, instance, **kwargs):
+    """pre_delete handler that records a tombstone, while the row and its relations still exist"""
+    using = kwargs.get('using') or 'default'
+    branch_id, owner_id = row_scope(sender, instance.pk, using)
+    DeletionLog.objects.using(using).create(
+        model=sender._meta.label_lower, object_id=instance.pk, branch_id=branch_id, owner_id=owner_id
+    )
+
+
+def log_scope_change(sender, instance, raw=False, **kwargs):
+    """
+    pre_save handler that records a tombstone under the old branch of a row
+    leaving some lists. A person's user and attendance rows leave with them.
+    """
+    if raw or instance.pk is None:
+        return
+    using = kwargs.get('using') or 'default'
+    key = (sender._meta.app_label, sender._meta.object_name)
+    fields = SCOPE_FIELDS[key]
+    old = sender._base_manager.using(using).filter(pk=instance.pk).values(*fields).first()
+    if old is None or all(old[field] == getattr(instance, field) for field in fields):
+        return
+
+    branch_id = old['branch_id']
+    tombstones = [DeletionLog(model=sender._meta.label_lower, object_id=instance.pk, branch_id=branch_id)]
+    if old['branch_id'] != instance.branch_id:
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            tombstones.append(DeletionLog(model='api.user', object_id=user_id, branch_id=branch_id))
+        for app_label, model_name, person_field in PERSON_ROWS.get(key, ()):
+            model = apps.get_model(app_label, model_name)
+            tombstones += [
+                DeletionLog(model=model._meta.label_lower, object_id=pk, branch_id=branch_id)
+                for pk in model.objects.using(using).filter(**{person_field: instance.pk})
+                .values_list('pk', flat=True).iterator()
+            ]
+    DeletionLog.objects.using(using).bulk_create(tombstones, batch_size=500)
+
+
+def delete_untracked(queryset):
+    """
+    Delete the rows of `queryset` in one query, without signals or tombstones.
+
+    For maintenance that does not change what clients see. The model must
+    have no rows depending on it, as nothing is cascaded.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+def deleted_ids(model, since, scope=None):
+    """Ids of `model` deleted after `since`, only the tombstones matching the Q `scope` if given"""
+    tombstones = DeletionLog.objects.filter(model=model._meta.label_lower, deleted_at__gt=since)
+    if scope is not None:
+        tombstones = tombstones.filter(scope)
+    return list(tombstones.order_by().values_list('object_id', flat=True).distinct())
+
+
+def prune_deletion_log(days=DELETION_LOG_RETENTION_DAYS):
+    cutoff = timezone.now() - timedelta(days=days)
+    return DeletionLog.objects.filter(deleted_at__lt=cutoff).delete()[0]
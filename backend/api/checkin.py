@@ -0,0 +1,106 @@
+"""
+Self-service attendance check-in and check-out.
+
+Every event is a single INSERT ... ON CONFLICT DO UPDATE on the (person, date)
+attendance row. The database merges concurrent events for the same person
+itself, keeping the earliest check-in and the latest check-out, so there is
+no read-modify-write and no explicit transaction. A check-in is one short
+statement, which keeps the morning rush cheap. Works on PostgreSQL and on
+SQLite 3.24+, including partitioned attendance tables, where (person, date)
+stays unique.
+"""
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.db import connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .models import Employee, Student, EmployeeAttendance, StudentAttendance
+from .attendance import ATTENDANCE_TIME_ZONE
+
+CHECK_EVENTS = ('in', 'out')
+
+# Existing row value kept over the new one: earliest check-in, latest check-out
+MERGE = {
+    'time_in': 'CASE WHEN {table}.time_in IS NULL OR EXCLUDED.time_in < {table}.time_in '
+               'THEN EXCLUDED.time_in ELSE {table}.time_in END',
+    'time_out': 'CASE WHEN {table}.time_out IS NULL OR EXCLUDED.time_out > {table}.time_out '
+                'THEN EXCLUDED.time_out ELSE {table}.time_out END',
+}
+
+
+def get_checkin_person(user):
+    """
+    (model, person field, person id, branch time zone) of the user's employee
+    or student profile, in one query. None if the user has neither.
+    """
+    if user.role == 'Student':
+        profiles, model, person_field = Student.objects, StudentAttendance, 'student'
+    else:
+        profiles, model, person_field = Employee.objects, EmployeeAttendance, 'employee'
+    person = profiles.filter(user=user).values_list('id', F('branch__calendar__timezone')).first()
+    if person is None:
+        return None
+    person_id, tz = person
+    return model, person_field, person_id, tz or ATTENDANCE_TIME_ZONE
+
+
+def branch_now(tz):
+    """Current local time of a branch, to the second"""
+    return datetime.now(ZoneInfo(tz)).replace(microsecond=0)
+
+
+def record_check(model, person_field, person_id, day, at, event, user, using='default'):
+    """
+    Upsert a check-in (event 'in') or check-out ('out') at time `at` on `day`.
+
+    A new row is 'Present'. Returns the row as a dict with id, date, time_in,
+    time_out and status.
+    """
+    if event not in CHECK_EVENTS:
+        raise ValueError(f"Unknown check event '{event}'")
+    connection = connections[using]
+    ops = connection.ops
+    qn = ops.quote_name
+    table = qn(model._meta.db_table)
+    person_column = model._meta.get_field(person_field).column
+    column = 'time_in' if event == 'in' else 'time_out'
+    now = ops.adapt_datetimefield_value(timezone.now())
+    at = ops.adapt_timefield_value(at)
+
+    columns = [person_column, 'date', 'time_in', 'time_out', 'status',
+               'created_by_id', 'updated_by_id', 'created_at', 'updated_at']
+    values = [person_id, ops.adapt_datefield_value(day),
+              at if event == 'in' else None, at if event == 'out' else None, 'Present',
+              user.pk, user.pk, now, now]
+    returning = ['id', 'date', 'time_in', 'time_out', 'status']
+    sql = (
+        f"INSERT INTO {table} ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({qn(person_column)}, {qn('date')}) DO UPDATE SET "
+        f"{qn(column)} = {MERGE[column].format(table=table)}, "
+        f"{qn('updated_by_id')} = EXCLUDED.updated_by_id, {qn('updated_at')} = EXCLUDED.updated_at"
+    )
+    with connection.cursor() as cursor:
+        if connection.features.can_return_columns_from_insert:
+            cursor.execute(f"{sql} RETURNING {', '.join(qn(c) for c in returning)}", values)
+            row = cursor.fetchone()
+        else:
+            # SQLite before 3.35 has no RETURNING
+            cursor.execute(sql, values)
+            cursor.execute(
+                f"SELECT {', '.join(qn(c) for c in returning)} FROM {table} "
+                f"WHERE {qn(person_column)} = %s AND {qn('date')} = %s",
+                [person_id, ops.adapt_datefield_value(day)],
+            )
+            row = cursor.fetchone()
+
+    record = dict(zip(returning, row))
+    record['date'] = day
+    for field in ('time_in', 'time_out'):
+        # SQLite returns times as text
+        if isinstance(record[field], str):
+            record[field] = parse_time(record[field])
+    return record
@@ -0,0 +1,133 @@
+"""
+Read-only serializers that work from .values() rows instead of model instances.
+
+Name and branch columns are annotated in SQL, so large list responses do not
+build model instances or call SerializerMethodFields per row. The output of
+each class matches the ModelSerializer it stands in for key for key.
+"""
+from django.db.models import CharField, F, Value
+from django.db.models.functions import Concat
+from rest_framework import serializers
+
+
+def full_name(prefix):
+    """SQL expression for '<first_name> <last_name>' of the user at `prefix`"""
+    return Concat(
+        F(f'{prefix}__first_name'), Value(' '), F(f'{prefix}__last_name'),
+        output_field=CharField(),
+    )
+
+
+class ValuesSerializer:
+    """
+    Serializes rows from a queryset prepared with `prepare()`.
+
+    Subclasses declare:
+    - `fields`: the output keys, in output order; keys that are not annotated
+      are read from the model column of the same name
+    - `annotations`: output key -> SQL expression, for computed keys
+    - `converters`: output key -> DRF field used to format the value
+    """
+    fields = ()
+    annotations = {}
+    converters = {}
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def annotation_name(cls, key):
+        # Annotations may not clash with model fields such as employee_id
+        return f'values_{key}'
+
+    @classmethod
+    def prepare(cls, queryset):
+        """Annotate the queryset and switch it to .values()"""
+        annotations = {
+            cls.annotation_name(key): expression
+            for key, expression in cls.annotations.items()
+        }
+        lookups = [
+            cls.annotation_name(key) if key in cls.annotations else key
+            for key in cls.fields
+        ]
+        return queryset.prefetch_related(None).annotate(**annotations).values(*lookups)
+
+    @classmethod
+    def to_representation(cls, row):
+        data = {}
+        for key in cls.fields:
+            value = row[cls.annotation_name(key) if key in cls.annotations else key]
+            converter = cls.converters.get(key)
+            if converter is not None and value is not None:
+                value = converter.to_representation(value)
+            data[key] = value
+        return data
+
+    @property
+    def data(self):
+        to_representation = self.to_representation
+        return [to_representation(row) for row in self.rows]
+
+
+_date = serializers.DateField()
+_time = serializers.TimeField()
+_datetime = serializers.DateTimeField()
+
+
+class EmployeeAttendanceValuesSerializer(ValuesSerializer):
+    """Values-based equivalent of EmployeeAttendanceSerializer"""
+    fields = (
+        'id', 'employee', 'employee_name', 'employee_role', 'employee_id',
+        'branch_name', 'date', 'time_in', 'time_out', 'status', 'remarks',
+        'created_by', 'updated_by', 'created_at', 'updated_at',
+    )
+    annotations = {
+        'employee_name': full_name('employee__user'),
+        'employee_role': F('employee__user__role'),
+        'employee_id': F('employee__employee_id'),
+        'branch_name': F('employee__branch__name'),
+    }
+    converters = {
+        'date': _date,
+        'time_in': _time,
+        'time_out': _time,
+        'created_at': _datetime,
+        'updated_at': _datetime,
+    }
+
+
+class StudentAttendanceValuesSerializer(ValuesSerializer):
+    """Values-based equivalent of StudentAttendanceSerializer"""
+    fields = (
+        'id', 'student', 'student_name', 'student_id', 'branch_name',
+        'date', 'time_in', 'time_out', 'status', 'remarks',
+        'created_by', 'updated_by', 'created_at', 'updated_at',
+    )
+    annotations = {
+        'student_name': full_name('student__user'),
+        'student_id': F('student__student_id'),
+        'branch_name': F('student__branch__name'),
+    }
+    converters = {
+        'date': _date,
+        'time_in': _time,
+        'time_out': _time,
+        'created_at': _datetime,
+        'updated_at': _datetime,
+    }
+
+
+class ActivityLogValuesSerializer(ValuesSerializer):
+    """Values-based equivalent of ActivityLogSerializer"""
+    fields = (
+        'id', 'user', 'user_name', 'user_role', 'action_type', 'action_model',
+        'action_details', 'ip_address', 'created_at',
+    )
+    annotations = {
+        'user_name': full_name('user'),
+        'user_role': F('user__role'),
+    }
+    converters = {
+        'created_at': _datetime,
+    }
@@ -0,0 +1,165 @@
+"""
+Derivative images for uploaded photos.
+
+Every processed image gets a thumbnail and a medium variant in WebP and JPEG,
+stored next to the original as `<name>_<variant>.<ext>`. Originals larger
+than IMAGE_MAX_DIMENSION are scaled down and saved in place of the upload.
+Processing is queued as an 'images.variants' task (see api.tasks) in the
+upload's transaction, so requests never wait for Pillow and queued work
+survives a restart.
+"""
+import io
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .cache import bump_version
+from .storage import blob_fields
+from .tasks import enqueue
+
+# Longest edge in pixels for each variant
+IMAGE_VARIANTS = getattr(settings, 'IMAGE_VARIANTS', {'thumb': 160, 'medium': 640})
+IMAGE_MAX_DIMENSION = getattr(settings, 'IMAGE_MAX_DIMENSION', 2048)
+
+# Output formats and their file extensions
+VARIANT_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+
+# Image fields that get variants, as (app label, model name, field name)
+IMAGE_FIELDS = (
+    ('api', 'Employee', 'profile_image'),
+    ('api', 'Student', 'profile_image'),
+    ('api', 'Blog', 'featured_image'),
+)
+
+def variant_name(name, variant, extension):
+    """Storage name of a variant of the file stored as `name`"""
+    root, _ = os.path.splitext(name)
+    return f'{root}_{variant}.{extension}'
+
+
+def variant_names(name):
+    """All variant storage names for `name`, as {variant: {extension: name}}"""
+    return {
+        variant: {extension: variant_name(name, variant, extension) for extension, _ in VARIANT_FORMATS}
+        for variant in IMAGE_VARIANTS
+    }
+
+
+def has_variants(field_file):
+    """Check if the largest variant of a stored image already exists"""
+    largest = max(IMAGE_VARIANTS, key=IMAGE_VARIANTS.get)
+    extension = VARIANT_FORMATS[0][0]
+    return field_file.storage.exists(variant_name(field_file.name, largest, extension))
+
+
+def _encode(image, image_format):
+    """Encode a PIL image, flattening transparency for JPEG"""
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.split()[-1])
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=82, optimize=True)
+    return buffer.getvalue()
+
+
+def _replace(storage, name, content):
+    """Write content under `name`, overwriting any existing file"""
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def is_referenced(model, field_name, name):
+    """Check if any record still refers to the stored file `name`"""
+    fields = {(model, field_name)}
+    # Content-addressed blobs are shared by every field in that storage
+    shared = blob_fields()
+    if (model, field_name) in shared:
+        fields.update(shared)
+    return any(other.objects.filter(**{field: name}).exists() for other, field in fields)
+
+
+def process_image(app_label, model_name, pk, field_name, force=False):
+    """
+    Cap the original and generate the variants for one image field.
+
+    Returns True if any file was written.
+    """
+    model = apps.get_model(app_label, model_name)
+    instance = model.objects.filter(pk=pk).only('pk', field_name).first()
+    if instance is None:
+        return False
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+    if not force and has_variants(field_file):
+        return False
+
+    storage = field_file.storage
+    with storage.open(field_file.name, 'rb') as source:
+        image = Image.open(source)
+        image_format = image.format or 'JPEG'
+        image.load()
+    image = ImageOps.exif_transpose(image)
+
+    # Cap the original's dimensions
+    if max(image.size) > IMAGE_MAX_DIMENSION:
+        image.thumbnail((IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION), Image.LANCZOS)
+        old_name = field_file.name
+        # Save as a fresh upload, so content-addressed storages hash the capped file
+        upload_name = field_file.field.generate_filename(instance, os.path.basename(old_name))
+        new_name = storage.save(upload_name, ContentFile(_encode(image, image_format)))
+        changes = {field_name: new_name}
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            changes['updated_at'] = timezone.now()
+        with transaction.atomic():
+            # update() does not send post_save, so this does not reschedule.
+            # Only written while the field still holds the processed file, a
+            # newer upload must not be replaced by the capped copy of this one.
+            # Validators, cached responses and the change feed must move to
+            # the new URL before the old file stops resolving.
+            updated = model.objects.filter(pk=pk, **{field_name: old_name}).update(**changes)
+            if updated:
+                bump_version(model)
+        if not updated:
+            # The newer upload has a task of its own
+            storage.delete(new_name)
+            return False
+        storage.delete(old_name)
+        field_file.name = new_name
+
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        for extension, variant_format in VARIANT_FORMATS:
+            _replace(storage, variant_name(field_file.name, variant, extension), _encode(resized, variant_format))
+
+    # The field may have been changed while the variants were written
+    if not is_referenced(model, field_name, field_file.name):
+        for names in variant_names(field_file.name).values():
+            for name in names.values():
+                if storage.exists(name):
+                    storage.delete(name)
+        return False
+
+    return True
+
+
+def schedule_variants(instance, field_name):
+    """Queue variant generation, committed together with the current transaction"""
+    meta = instance._meta
+    enqueue('images.variants', app_label=meta.app_label, model_name=meta.object_name,
+            pk=instance.pk, field_name=field_name)
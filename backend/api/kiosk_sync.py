@@ -0,0 +1,304 @@
+"""
+Offline kiosk attendance sync.
+
+A front desk kiosk keeps taking attendance without internet and syncs with
+POST /api/kiosk/sync/ once it is back online. A single round trip uploads
+its queued events and downloads what changed on the server.
+
+Upload. Every event carries a client sequence number that increases per
+kiosk. The server keeps the highest sequence it applied (Kiosk.last_seq) and
+skips anything at or below it, so a batch resent after a lost response is
+applied once. A batch is applied in bulk with a handful of queries whatever
+its size. Conflicts are resolved per field, last writer wins: events are
+stamped with the time they happened on the kiosk, corrected for its clock
+skew, and a field only takes an event's value if the event is newer than the
+field's last write. Synced writes record that time per field in the row's
+field_clock; when the row was saved outside the sync since (an admin edit, a
+self-service check-in), all its fields count as written at its updated_at.
+Rows created by the nightly push are stamped as synced with no field
+written, so events recorded offline before the push still win over its
+defaults.
+
+Download. Without a sync token the response holds the branch roster and
+today's attendance. With the token of the previous sync only people and
+attendance rows changed since are included, a person counting as changed
+when their user was (a rename), and roster.removed lists the people deleted
+or moved to another branch since. Both are compact column/row tables. A token
+older than the deletion log gets the full download again.
+
+Events look like:
+
+    {"seq": 41, "type": "student", "person": 12, "at": "2026-10-19T08:57:12+05:45", "check": "in"}
+    {"seq": 42, "type": "employee", "person": 3, "at": "...", "date": "2026-10-19",
+     "fields": {"status": "Late", "remarks": "Bus strike"}}
+
+A check event sets time_in or time_out to the local time of `at`, on the
+local date of `at` unless `date` is given.
+"""
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from .models import Employee, Student, EmployeeAttendance, StudentAttendance, Kiosk
+from .attendance_push import get_calendar
+from .changes import TOKEN_OVERLAP, TokenExpired, check_token, deleted_ids, make_token, parse_token
+
+KIOSK_SYNC_MAX_EVENTS = getattr(settings, 'KIOSK_SYNC_MAX_EVENTS', 5000)
+
+SYNC_FIELDS = ('time_in', 'time_out', 'status', 'remarks')
+
+ATTENDANCE = {
+    'employee': (Employee, EmployeeAttendance, 'employee_id'),
+    'student': (Student, StudentAttendance, 'student_id'),
+}
+
+PEOPLE_COLUMNS = ['id', 'code', 'first_name', 'last_name']
+ATTENDANCE_COLUMNS = ['type', 'person', 'date', 'time_in', 'time_out', 'status', 'remarks']
+
+
+class SyncError(Exception):
+    """A sync request that cannot be accepted"""
+
+
+def parse_client_time(value, tz):
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        raise ValueError("'at' must be an ISO 8601 date and time")
+    if timezone.is_naive(moment):
+        moment = moment.replace(tzinfo=tz)
+    return moment
+
+
+def parse_event(raw, tz, skew):
+    """Validated event: seq, kind, person, date, at (server time) and the field values it sets"""
+    kind = raw.get('type')
+    if kind not in ATTENDANCE:
+        raise ValueError("'type' must be 'employee' or 'student'")
+    try:
+        person = int(raw.get('person'))
+    except (TypeError, ValueError):
+        raise ValueError("'person' must be an id")
+    at = parse_client_time(raw.get('at'), tz) + skew
+    local = at.astimezone(tz)
+
+    values = {}
+    check = raw.get('check')
+    if check is not None:
+        if check not in ('in', 'out'):
+            raise ValueError("'check' must be 'in' or 'out'")
+        values['time_in' if check == 'in' else 'time_out'] = local.time().replace(microsecond=0)
+
+    status_choices = dict(EmployeeAttendance.ATTENDANCE_STATUS_CHOICES)
+    for field, value in (raw.get('fields') or {}).items():
+        if field not in SYNC_FIELDS:
+            raise ValueError(f"Unknown field '{field}'")
+        if field in ('time_in', 'time_out') and value is not None:
+            value = parse_time(value) if isinstance(value, str) else None
+            if value is None:
+                raise ValueError(f"'{field}' must be a time")
+        elif field == 'status' and value not in status_choices:
+            raise ValueError(f"Invalid status '{value}'")
+        elif field == 'remarks' and value is not None and not isinstance(value, str):
+            raise ValueError("'remarks' must be text")
+        values[field] = value
+    if not values:
+        raise ValueError("Event has no 'check' or 'fields'")
+
+    day = raw.get('date')
+    if day is None:
+        day = local.date()
+    else:
+        day = parse_date(day) if isinstance(day, str) else None
+        if day is None:
+            raise ValueError("'date' must be YYYY-MM-DD")
+    return {'seq': raw['seq'], 'kind': kind, 'person': person, 'date': day, 'at': at, 'values': values}
+
+
+def field_written_at(row, field):
+    """When `field` of `row` was last written, None if never"""
+    clock = row.field_clock or {}
+    if clock.get('_new'):
+        # Created by this sync
+        return None
+    times = [datetime.fromisoformat(clock[field])] if field in clock else []
+    synced = clock.get('_synced')
+    if synced is None or row.updated_at > datetime.fromisoformat(synced):
+        # Saved outside the sync after its last synced write
+        times.append(row.updated_at)
+    return max(times) if times else None
+
+
+def apply_events(kiosk, raw_events, user, sent_at=None):
+    """
+    Apply a batch of kiosk events. Returns the number of events applied, the
+    number skipped as already seen, and the errors as {"seq", "detail"} dicts.
+    Invalid events are reported and passed over, sending them again will not
+    make them valid.
+    """
+    if not isinstance(raw_events, list):
+        raise SyncError("'events' must be a list.")
+    if len(raw_events) > KIOSK_SYNC_MAX_EVENTS:
+        raise SyncError(f"At most {KIOSK_SYNC_MAX_EVENTS} events per sync.")
+
+    now = timezone.now()
+    tz = ZoneInfo(get_calendar(kiosk.branch_id).timezone)
+    skew = timedelta(0)
+    if sent_at:
+        try:
+            skew = now - parse_client_time(sent_at, tz)
+        except ValueError:
+            raise SyncError("'sent_at' must be an ISO 8601 date and time.")
+
+    with transaction.atomic():
+        # One sync per kiosk at a time
+        kiosk = Kiosk.objects.select_for_update().get(pk=kiosk.pk)
+        errors, events, skipped = [], [], 0
+        last_seq = kiosk.last_seq
+        for raw in raw_events:
+            seq = raw.get('seq') if isinstance(raw, dict) else None
+            if not isinstance(seq, int) or isinstance(seq, bool):
+                errors.append({'seq': seq, 'detail': "'seq' must be an integer"})
+                continue
+            if seq <= kiosk.last_seq:
+                skipped += 1
+                continue
+            last_seq = max(last_seq, seq)
+            try:
+                events.append(parse_event(raw, tz, skew))
+            except ValueError as e:
+                errors.append({'seq': seq, 'detail': str(e)})
+        events.sort(key=lambda event: event['seq'])
+
+        applied = 0
+        for kind, (person_model, attendance_model, _) in ATTENDANCE.items():
+            kind_events = [event for event in events if event['kind'] == kind]
+            if kind_events:
+                applied += _apply(kiosk, person_model, attendance_model, kind, kind_events, user, now, errors)
+
+        kiosk.last_seq = last_seq
+        kiosk.last_synced_at = now
+        kiosk.save(update_fields=['last_seq', 'last_synced_at', 'updated_at'])
+    return applied, skipped, errors
+
+
+def _apply(kiosk, person_model, model, kind, events, user, now, errors):
+    person_field = f'{kind}_id'
+    branch_people = set(person_model.objects.filter(
+        branch_id=kiosk.branch_id, pk__in={event['person'] for event in events}
+    ).values_list('pk', flat=True))
+
+    # Newest (time, value) per row and field
+    winners = {}
+    applied = 0
+    for event in events:
+        if event['person'] not in branch_people:
+            errors.append({'seq': event['seq'], 'detail': f"No {kind} {event['person']} in this branch"})
+            continue
+        applied += 1
+        fields = winners.setdefault((event['person'], event['date']), {})
+        for field, value in event['values'].items():
+            if field not in fields or event['at'] >= fields[field][0]:
+                fields[field] = (event['at'], value)
+    if not winners:
+        return 0
+
+    # Rows missing so far, marked so every synced field wins on them
+    model.objects.bulk_create([
+        model(**{person_field: person, 'date': day, 'status': 'Present',
+                 'created_by': user, 'field_clock': {'_new': True}})
+        for person, day in winners
+    ], ignore_conflicts=True, batch_size=500)
+    rows = model.objects.select_for_update().filter(**{
+        f'{person_field}__in': {person for person, _ in winners},
+        'date__in': {day for _, day in winners},
+    })
+
+    changed = []
+    for row in rows:
+        fields = winners.get((getattr(row, person_field), row.date))
+        if fields is None:
+            continue
+        clock = {key: value for key, value in (row.field_clock or {}).items() if not key.startswith('_')}
+        updated = False
+        for field, (at, value) in fields.items():
+            written_at = field_written_at(row, field)
+            if written_at is None or at > written_at:
+                setattr(row, field, value)
+                clock[field] = at.isoformat()
+                updated = True
+        if updated or (row.field_clock or {}).get('_new'):
+            clock['_synced'] = now.isoformat()
+            row.field_clock = clock
+            row.updated_at = now
+            row.updated_by = user
+            changed.append(row)
+    model.objects.bulk_update(
+        changed, list(SYNC_FIELDS) + ['field_clock', 'updated_at', 'updated_by'], batch_size=500
+    )
+    return applied
+
+
+def sync_snapshot(kiosk, since=None):
+    """Roster and today's attendance of the kiosk's branch, only what changed after `since` if given"""
+    calendar = get_calendar(kiosk.branch_id)
+    today = datetime.now(ZoneInfo(calendar.timezone)).date()
+    roster = {'columns': PEOPLE_COLUMNS, 'removed': {}}
+    attendance = []
+    for kind, (person_model, model, code_field) in ATTENDANCE.items():
+        people = person_model.objects.filter(branch_id=kiosk.branch_id)
+        records = model.objects.filter(**{f'{kind}__branch_id': kiosk.branch_id}, date=today)
+        removed = []
+        if since is not None:
+            removed = set(deleted_ids(person_model, since, Q(branch_id=kiosk.branch_id)))
+            # Moved away and back again
+            removed -= set(people.filter(pk__in=removed).values_list('pk', flat=True))
+            removed = sorted(removed)
+            people = people.filter(Q(updated_at__gt=since) | Q(user__updated_at__gt=since))
+            records = records.filter(updated_at__gt=since)
+        roster['removed'][f'{kind}s'] = removed
+        roster[f'{kind}s'] = [list(row) for row in people.order_by('pk').values_list(
+            'pk', code_field, F('user__first_name'), F('user__last_name')
+        )]
+        attendance.extend(
+            [kind, person, day.isoformat(), time_in and time_in.isoformat(),
+             time_out and time_out.isoformat(), status, remarks]
+            for person, day, time_in, time_out, status, remarks in records.order_by(f'{kind}_id').values_list(
+                f'{kind}_id', 'date', 'time_in', 'time_out', 'status', 'remarks'
+            )
+        )
+    return {
+        'date': today.isoformat(),
+        'roster': roster,
+        'attendance': {'columns': ATTENDANCE_COLUMNS, 'rows': attendance},
+    }
+
+
+def sync(kiosk, data, user):
+    """Apply the uploaded events, then build the download part. The response body of a sync."""
+    started = timezone.now()
+    try:
+        since = parse_token(data.get('token'))
+    except ValueError:
+        raise SyncError("Invalid sync token.")
+    try:
+        check_token(since)
+    except TokenExpired:
+        since = None
+    applied, skipped, errors = apply_events(kiosk, data.get('events') or [], user, data.get('sent_at'))
+    kiosk.refresh_from_db(fields=['last_seq'])
+    return {
+        'kiosk': kiosk.name,
+        'last_seq': kiosk.last_seq,
+        'applied': applied,
+        'skipped': skipped,
+        'errors': errors,
+        'server_time': started.isoformat(),
+        'full': since is None,
+        'token': make_token(started - TOKEN_OVERLAP),
+        **sync_snapshot(kiosk, since),
+    }
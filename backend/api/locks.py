@@ -0,0 +1,67 @@
+"""
+Cross-process locks for work that must not run twice at once.
+
+On PostgreSQL the lock is a session-level advisory lock, so it holds across
+every app node sharing the database and is dropped if the holder's
+connection dies. Other databases fall back to an flock() on a file in
+LOCK_DIR, which only covers processes on the same host.
+"""
+import os
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+LOCK_DIR = getattr(settings, 'LOCK_DIR', tempfile.gettempdir())
+
+
+def lock_key(name):
+    """Signed 64-bit advisory lock key for `name`"""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def try_lock(name, using='default'):
+    """
+    Try to take the lock `name` without waiting.
+
+    Yields True if this process holds the lock for the block, False if
+    another process holds it.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        key = lock_key(name)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [key])
+            acquired = cursor.fetchone()[0]
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_unlock(%s)', [key])
+        return
+
+    if fcntl is None:
+        # No way to coordinate, assume a single process
+        yield True
+        return
+
+    os.makedirs(LOCK_DIR, exist_ok=True)
+    with open(os.path.join(LOCK_DIR, f'adminbridge-{name}.lock'), 'a') as handle:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
@@ -0,0 +1,40 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+
+from api.attendance_archive import ARCHIVES, archive_month, next_month
+
+
+class Command(BaseCommand):
+    help = 'Move closed months of employee and student attendance into the compact archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', metavar='YYYY-MM',
+                            help='Archive the months before this one (default: the previous month)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--before must look like YYYY-MM')
+        else:
+            # The last month stays live for late corrections
+            today = date.today()
+            before = date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        for person_key, (model, archive_model, row) in ARCHIVES.items():
+            first = model.objects.filter(date__lt=before).aggregate(first=Min('date'))['first']
+            total = 0
+            month = date(first.year, first.month, 1) if first else before
+            while month < before:
+                moved = archive_month(person_key, month, dry_run=options['dry_run'])
+                if moved:
+                    self.stdout.write(f'{verb} {moved} {person_key} rows for {month:%Y-%m}')
+                total += moved
+                month = next_month(month)
+            self.stdout.write(self.style.SUCCESS(f'{verb} {total} {person_key} attendance rows'))
@@ -0,0 +1,44 @@
+from datetime import datetime, date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api import partitions
+
+
+class Command(BaseCommand):
+    help = 'Create upcoming monthly attendance partitions, convert or detach old months (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Create partitions up to this many months ahead (default: 3)')
+        parser.add_argument('--convert', action='store_true',
+                            help='Partition the attendance tables if they are not partitioned yet')
+        parser.add_argument('--detach-before', metavar='YYYY-MM',
+                            help='Detach month partitions older than this month for archiving')
+
+    def handle(self, *args, **options):
+        if not partitions.supports_partitioning(connection):
+            raise CommandError('Attendance partitioning needs PostgreSQL')
+
+        detach_before = None
+        if options['detach_before']:
+            try:
+                detach_before = datetime.strptime(options['detach_before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--detach-before must look like YYYY-MM')
+
+        last_month = partitions.add_months(partitions.month_start(date.today()), options['months_ahead'])
+        for table in partitions.ATTENDANCE_TABLES:
+            if options['convert'] and partitions.partition_table(table, options['months_ahead']):
+                self.stdout.write(self.style.SUCCESS(f'Partitioned {table} by month'))
+
+            with transaction.atomic(), connection.cursor() as cursor:
+                if not partitions.is_partitioned(cursor, table):
+                    raise CommandError(f'{table} is not partitioned, run with --convert first')
+                created = partitions.ensure_partitions(cursor, table, date.today(), last_month)
+            self.stdout.write(self.style.SUCCESS(f'Created {created} new partitions for {table}'))
+
+            if detach_before is not None:
+                for name in partitions.detach_partitions(table, detach_before):
+                    self.stdout.write(self.style.SUCCESS(f'Detached {name}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from api.uploads import remove_stale_uploads
+
+class Command(BaseCommand):
+    help = 'Remove chunked uploads that were abandoned or never attached to a record'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='Remove uploads not touched for this many hours (default: 24)')
+
+    def handle(self, *args, **options):
+        removed = remove_stale_uploads(options['hours'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully removed {removed} stale uploads')
+        )
@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min, Q
+from api.attendance import (
+    BranchCalendars, exceptions_mode, local_today, employee_people, student_people,
+)
+from api.changes import delete_untracked
+from api.models import Employee, EmployeeAttendance, Student, StudentAttendance
+
+class Command(BaseCommand):
+    help = ("Delete stored attendance rows that match the implicit 'Present' default, "
+            "for ATTENDANCE_STORAGE_MODE = 'exceptions'")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the rows that would be deleted')
+        parser.add_argument('--force', action='store_true',
+                            help="Run even though ATTENDANCE_STORAGE_MODE is not 'exceptions'")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows read and deleted per query (default: 1000)')
+
+    def handle(self, *args, **options):
+        if not exceptions_mode() and not options['force']:
+            raise CommandError(
+                "ATTENDANCE_STORAGE_MODE is not 'exceptions', the deleted rows would read as "
+                "missing. Use --force to compact anyway."
+            )
+
+        targets = (
+            ('employee', EmployeeAttendance, employee_people(Employee.objects.all())),
+            ('student', StudentAttendance, student_people(Student.objects.all())),
+        )
+        for name, model, people in targets:
+            count = 0
+            for ids in self.default_row_batches(model, name, people, options['batch_size']):
+                count += len(ids)
+                if not options['dry_run']:
+                    # The rows are synthesized identically, clients have nothing to drop
+                    delete_untracked(model.objects.filter(pk__in=ids))
+            verb = 'Would delete' if options['dry_run'] else 'Deleted'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {count} default {name} attendance rows'))
+
+    def default_row_batches(self, model, person_key, people, batch_size):
+        """
+        Ids of rows that expand_rows() would synthesize identically, in lists
+        of at most `batch_size`. Rows are read in primary key order one batch
+        at a time, so memory use does not grow with the table.
+        """
+        people = {person['id']: person for person in people}
+        today = local_today()
+        rows = (
+            model.objects.filter(status='Present')
+            .filter(Q(remarks__isnull=True) | Q(remarks=''))
+            .filter(date__lte=today)
+        )
+        first_day = rows.aggregate(first_day=Min('date'))['first_day']
+        if first_day is None:
+            return
+
+        branch_ids = {person['branch_id'] for person in people.values()}
+        calendars = BranchCalendars(branch_ids, first_day, today)
+        defaults = {}
+        for branch_id in branch_ids:
+            calendar = calendars.get(branch_id)
+            defaults[branch_id] = (calendar.default_time_in, calendar.default_time_out)
+
+        last_pk = 0
+        while True:
+            batch = list(
+                rows.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('id', person_key, 'date', 'time_in', 'time_out')[:batch_size]
+            )
+            if not batch:
+                return
+            last_pk = batch[-1][0]
+
+            ids = []
+            for pk, person_id, date, time_in, time_out in batch:
+                person = people.get(person_id)
+                if person is None or date < person['since']:
+                    continue
+                branch_id = person['branch_id']
+                # Rows without times would come back with the default hours
+                if (time_in, time_out) != defaults[branch_id]:
+                    continue
+                if calendars.is_working_day(branch_id, date):
+                    ids.append(pk)
+            if ids:
+                yield ids
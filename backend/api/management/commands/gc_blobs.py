@@ -0,0 +1,73 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import StoredBlob
+from api.storage import BLOB_DIRECTORY, get_blob_storage, blob_fields
+
+
+class Command(BaseCommand):
+    help = 'Recount references to content-addressed blobs and delete the ones nothing refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24,
+                            help='Keep unreferenced blobs touched within this many hours (default: 24)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be deleted without deleting anything')
+
+    def handle(self, *args, **options):
+        storage = get_blob_storage()
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        dry_run = options['dry_run']
+
+        # Count the references from every field that uses the blob storage
+        references = {}
+        for model, field_name in blob_fields():
+            names = model.objects.filter(**{f'{field_name}__startswith': BLOB_DIRECTORY + '/'}) \
+                .values_list(field_name, flat=True)
+            for name in names.iterator():
+                references[name] = references.get(name, 0) + 1
+
+        # Correct stored counts, e.g. after records were deleted without touching storage
+        updated = 0
+        for blob in StoredBlob.objects.all().iterator():
+            refcount = references.get(blob.name, 0)
+            if blob.refcount != refcount:
+                updated += 1
+                if not dry_run:
+                    StoredBlob.objects.filter(pk=blob.pk).update(refcount=refcount)
+
+        # Unreferenced blobs past the grace period, together with their derived files
+        orphans = StoredBlob.objects.filter(updated_at__lt=cutoff).exclude(name__in=list(references))
+        orphan_digests = set()
+        freed = 0
+        for blob in orphans.iterator():
+            # A save of the same content since the scan touches updated_at and keeps the blob
+            if dry_run or StoredBlob.objects.filter(pk=blob.pk, updated_at__lt=cutoff).delete()[0]:
+                orphan_digests.add(blob.sha256)
+                freed += blob.size
+                self.stdout.write(f'Unreferenced: {blob.name} ({blob.size} bytes)')
+
+        known_digests = set(StoredBlob.objects.values_list('sha256', flat=True)) - orphan_digests
+        deleted_files = 0
+        for directory, _, filenames in os.walk(storage.path(BLOB_DIRECTORY)):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                digest = os.path.splitext(filename)[0].split('_')[0]
+                if digest in known_digests:
+                    continue
+                # Leftover temporary files and files without a blob row are
+                # removed too, once they are older than the grace period
+                if digest not in orphan_digests and os.path.getmtime(path) >= cutoff.timestamp():
+                    continue
+                deleted_files += 1
+                if not dry_run:
+                    os.remove(path)
+
+        prefix = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {len(orphan_digests)} unreferenced blobs ({freed} bytes) and {deleted_files} files; '
+            f'corrected {updated} reference counts'
+        ))
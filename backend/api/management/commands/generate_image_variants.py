@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from api.images import IMAGE_FIELDS, process_image
+
+
+class Command(BaseCommand):
+    help = 'Generates thumbnail and medium variants for existing uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            choices=[model_name for _, model_name, _ in IMAGE_FIELDS],
+            help='Only process images of this model',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that already exist',
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        failed = 0
+
+        for app_label, model_name, field_name in IMAGE_FIELDS:
+            if options['model'] and options['model'] != model_name:
+                continue
+
+            model = apps.get_model(app_label, model_name)
+            pks = list(
+                model.objects.exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}__isnull': True})
+                .values_list('pk', flat=True)
+            )
+            self.stdout.write(f'Processing {len(pks)} {model_name}.{field_name} images')
+
+            for pk in pks:
+                try:
+                    if process_image(app_label, model_name, pk, field_name, force=options['force']):
+                        processed += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'{model_name} {pk}: {str(e)}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {processed} images ({failed} failed)'))
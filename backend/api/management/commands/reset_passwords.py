@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.db.models import Q, Count
+
+from api.passwords import DEFAULT_PASSWORD, reset_passwords, ProgressPrinter
 
 User = get_user_model()
 
@@ -10,7 +12,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             '--password',
-            default='Nepal@123',
+            default=DEFAULT_PASSWORD,
             help='Default password to set for users'
         )
         
@@ -19,6 +21,39 @@ class Command(BaseCommand):
             action='store_true',
             help='Reset passwords for all users including SuperAdmin'
         )
+        
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many users would be reset without changing anything'
+        )
+        
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used for hashing (default: one per CPU)'
+        )
+        
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users written per bulk update'
+        )
+        
+        parser.add_argument(
+            '--salt-batch-size',
+            type=int,
+            default=1,
+            help='Users sharing one salted hash (default: 1, a unique salt per user)'
+        )
+        
+        parser.add_argument(
+            '--shared-hash',
+            action='store_true',
+            help='Use a single hash for every user; only for throwaway default passwords'
+        )
 
     def handle(self, *args, **options):
         default_password = options['password']
@@ -32,12 +67,23 @@ class Command(BaseCommand):
             users = User.objects.filter(~Q(role="SuperAdmin"))
             self.stdout.write('Resetting passwords for all non-SuperAdmin users')
         
-        count = 0
-        for user in users:
-            user.set_password(default_password)
-            user.save()
-            count += 1
-            self.stdout.write(f'Reset password for {user.email} ({user.role})')
+        if options['dry_run']:
+            for row in users.values('role').annotate(count=Count('pk')).order_by('role'):
+                self.stdout.write(f"  {row['role']}: {row['count']}")
+        
+        count = reset_passwords(
+            users,
+            password=default_password,
+            salt_batch_size=None if options['shared_hash'] else max(1, options['salt_batch_size']),
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            progress=ProgressPrinter(self.stdout.write),
+        )
+        
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Dry run: would reset passwords for {count} users'))
+            return
         
         self.stdout.write(self.style.SUCCESS(f'Successfully reset passwords for {count} users'))
-        self.stdout.write(self.style.SUCCESS(f'Default password: {default_password}')) 
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f'Default password: {default_password}'))
@@ -0,0 +1,75 @@
+import os
+import time
+import signal
+import socket
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.tasks import claim_tasks, requeue_stale, run_task, schedule_due, sync_schedules
+
+
+def _init_process():
+    # Spawned workers (macOS, Windows) start without the app registry
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Run queued and scheduled background tasks on a thread or process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=getattr(settings, 'TASK_WORKERS', 4),
+                            help='Tasks run at the same time (default: TASK_WORKERS)')
+        parser.add_argument('--processes', action='store_true',
+                            help='Run tasks in worker processes instead of threads')
+        parser.add_argument('--poll-interval', type=float,
+                            default=getattr(settings, 'TASK_POLL_INTERVAL', 5),
+                            help='Seconds to wait when there is nothing to do (default: TASK_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no task is due instead of waiting for more')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        sync_schedules()
+        if options['processes']:
+            # Children must not share the parent's database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task')
+        self.stdout.write(self.style.SUCCESS(f'Worker {name} started with {workers} workers'))
+
+        running = set()
+        last_stale_check = 0
+        try:
+            while not self.stopping:
+                if time.monotonic() - last_stale_check > 60:
+                    requeue_stale()
+                    last_stale_check = time.monotonic()
+                schedule_due()
+
+                running = {future for future in running if not future.done()}
+                claimed = claim_tasks(name, workers - len(running))
+                for task in claimed:
+                    self.stdout.write(f'Running {task.task} #{task.pk}')
+                    running.add(pool.submit(run_task, task.pk, name))
+
+                if options['once'] and not claimed and not running:
+                    break
+                if not claimed:
+                    time.sleep(options['poll_interval'] if not options['once'] else 0.1)
+        finally:
+            self.stdout.write('Waiting for running tasks to finish...')
+            pool.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f'Worker {name} stopped'))
+
+    def stop(self, signum, frame):
+        self.stopping = True
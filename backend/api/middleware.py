@@ -1,10 +1,19 @@
+from django.conf import settings
 from django.http import HttpResponseForbidden
+from django.middleware.gzip import GZipMiddleware
 from django.urls import resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
 import re
 import json
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .models import User, ActivityLog, Branch
 
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
 
 class RoleBasedAccessMiddleware:
     """
@@ -32,18 +41,22 @@ class RoleBasedAccessMiddleware:
         ]
 
     def __call__(self, request):
+        return self.check_access(request) or self.get_response(request)
+
+    def check_access(self, request):
+        """A 403 response if the request is refused, None to let it through (also used by api.batch)"""
         # Skip middleware for non-API requests or OPTIONS requests
         if not request.path.startswith('/api/') or request.method == 'OPTIONS':
-            return self.get_response(request)
+            return None
             
         # Skip middleware for authentication endpoints
         if request.path.startswith('/api/token/'):
-            return self.get_response(request)
+            return None
             
         # Check if user is authenticated
         if not request.user.is_authenticated:
             # Let the view handle authentication errors
-            return self.get_response(request)
+            return None
             
         # Check SuperAdmin-restricted URLs
         for pattern in self.superadmin_urls:
@@ -56,7 +69,7 @@ class RoleBasedAccessMiddleware:
                 return HttpResponseForbidden("Access denied: BranchManager role or higher required")
         
         # If all checks pass, continue to view
-        return self.get_response(request)
+        return None
 
 
 class BranchAccessMiddleware:
@@ -77,22 +90,26 @@ class BranchAccessMiddleware:
         ]
 
     def __call__(self, request):
+        return self.check_access(request) or self.get_response(request)
+
+    def check_access(self, request):
+        """A 403 response if the request is refused, None to let it through (also used by api.batch)"""
         # Skip middleware for non-API requests or OPTIONS requests
         if not request.path.startswith('/api/') or request.method == 'OPTIONS':
-            return self.get_response(request)
+            return None
             
         # Skip middleware for authentication endpoints
         if request.path.startswith('/api/token/'):
-            return self.get_response(request)
+            return None
             
         # Skip if user is SuperAdmin (they have access to all branches)
         if request.user.is_authenticated and request.user.role == 'SuperAdmin':
-            return self.get_response(request)
+            return None
             
         # Check if user is authenticated and has an employee profile
         if not request.user.is_authenticated or not hasattr(request.user, 'employee_profile'):
             # Let the view handle authentication errors
-            return self.get_response(request)
+            return None
             
         # Get the user's branch
         user_branch_id = request.user.employee_profile.branch.id
@@ -107,7 +124,7 @@ class BranchAccessMiddleware:
                     return HttpResponseForbidden("Access denied: You don't have permission to access this branch")
         
         # If all checks pass, continue to view
-        return self.get_response(request)
+        return None
 
 
 class DefaultPasswordFlagMiddleware:
@@ -232,7 +249,7 @@ class ActivityLogMiddleware:
                 
                 # Only log POST, PUT, PATCH, and DELETE actions
                 if request.method not in ['POST', 'PUT', 'PATCH', 'DELETE']:
-                    return self.get_response(request)
+                    return response
                 
                 # Extract entity type from path
                 path_parts = request.path.split('/')
@@ -289,4 +306,86 @@ class ActivityLogMiddleware:
                 )
                 break
         
-        return response
\ No newline at end of file
+        return response
+
+
+def accepted_encodings(header):
+    """Map of the content codings in an Accept-Encoding header to their q-values"""
+    encodings = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        encodings[coding] = quality
+    return encodings
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Django's GZipMiddleware with brotli on top.
+
+    Brotli is used when the package is installed and the client accepts it
+    at least as much as gzip. Otherwise gzip is used, with Django's random
+    filename padding against BREACH. Codings refused with q=0 are never
+    used. Responses smaller than RESPONSE_COMPRESSION_MIN_SIZE bytes,
+    streaming responses (file downloads, event streams) and already encoded
+    responses are passed through untouched.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'RESPONSE_COMPRESSION_MIN_SIZE', 1024)
+
+    def choose_encoding(self, request):
+        """'br', 'gzip' or None for the request's Accept-Encoding header"""
+        encodings = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        default = encodings.get('*', 0.0)
+        gzip_quality = encodings.get('gzip', default)
+        brotli_quality = encodings.get('br', default) if brotli is not None else 0.0
+        if brotli_quality > 0 and brotli_quality >= gzip_quality:
+            return 'br'
+        if gzip_quality > 0:
+            return 'gzip'
+        return None
+
+    def process_response(self, request, response):
+        # Streaming bodies (file downloads, event streams) are left alone
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        if len(response.content) < self.min_size:
+            return response
+
+        encoding = self.choose_encoding(request)
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=5)
+        elif encoding == 'gzip':
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        else:
+            return response
+
+        # Return the original content if compression does not help
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+
+        # The compressed body is no longer byte-identical, so weaken the ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.9 on 2026-10-19 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_remove_lead_assigned_to_lead_assigned_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(default='application/pdf', max_length=100)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('received_size', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('Uploading', 'Uploading'), ('Complete', 'Complete'), ('Used', 'Used')], default='Uploading', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.9 on 2026-10-19 11:05
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='citizenship_document',
+            field=models.FileField(blank=True, help_text='Upload citizenship document (PDF only)', null=True, storage=api.storage.get_blob_storage, upload_to='employee_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.get_blob_storage, upload_to='employee_profiles/'),
+        ),
+        migrations.AlterField(
+            model_name='jobresponse',
+            name='resume',
+            field=models.FileField(storage=api.storage.get_blob_storage, upload_to='resumes/'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=api.storage.get_blob_storage, upload_to='student_profiles/'),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='resume',
+            field=models.FileField(blank=True, help_text='Upload CV/Resume (PDF only)', null=True, storage=api.storage.get_blob_storage, upload_to='student_resumes/'),
+        ),
+    ]
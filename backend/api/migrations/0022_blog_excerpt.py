@@ -0,0 +1,30 @@
+# Generated by Django 4.2.9 on 2026-10-19 11:40
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+
+def fill_excerpts(apps, schema_editor):
+    Blog = apps.get_model('api', 'Blog')
+    blogs = list(Blog.objects.only('id', 'content'))
+    for blog in blogs:
+        text = ' '.join(strip_tags(blog.content or '').split())
+        blog.excerpt = Truncator(text).chars(200)
+    Blog.objects.bulk_update(blogs, ['excerpt'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_storedblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
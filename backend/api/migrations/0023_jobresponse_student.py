@@ -0,0 +1,56 @@
+# Generated by Django 4.2.9 on 2026-10-19 12:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def link_students_by_email(apps, schema_editor):
+    """Point existing applications at the student with the same email, in batches"""
+    JobResponse = apps.get_model('api', 'JobResponse')
+    Student = apps.get_model('api', 'Student')
+    students = {
+        email.lower(): student_id
+        for student_id, email in Student.objects.values_list('id', 'user__email')
+        if email
+    }
+    if not students:
+        return
+
+    last_pk = 0
+    while True:
+        batch = list(
+            JobResponse.objects.filter(pk__gt=last_pk, student__isnull=True)
+            .order_by('pk').only('pk', 'email')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        linked = []
+        for response in batch:
+            student_id = students.get((response.email or '').lower())
+            if student_id is not None:
+                response.student_id = student_id
+                linked.append(response)
+        JobResponse.objects.bulk_update(linked, ['student'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_blog_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobresponse',
+            name='student',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job_responses', to='api.student'),
+        ),
+        migrations.RunPython(link_students_by_email, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='jobresponse',
+            index=models.Index(fields=['student', '-created_at'], name='jobresponse_student_created'),
+        ),
+    ]
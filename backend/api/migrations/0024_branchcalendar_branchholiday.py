@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-19 12:10
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_jobresponse_student'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BranchCalendar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('working_days', models.CharField(default='6,0,1,2,3,4', help_text='Comma separated weekday numbers, Monday is 0', max_length=20)),
+                ('default_time_in', models.TimeField(default=datetime.time(9, 0))),
+                ('default_time_out', models.TimeField(default=datetime.time(17, 0))),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar', to='api.branch')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BranchHoliday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(blank=True, default='', max_length=100)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='api.branch')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('branch', 'date')},
+            },
+        ),
+    ]
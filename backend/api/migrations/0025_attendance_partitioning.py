@@ -0,0 +1,160 @@
+# Generated by Django 4.2.9 on 2026-10-19 12:40
+
+from datetime import date
+
+from django.conf import settings
+from django.db import migrations
+
+# A frozen copy of the conversion in api.partitions as of this migration, so
+# later changes to that module do not change what this migration does.
+
+ATTENDANCE_TABLES = ('api_employeeattendance', 'api_studentattendance')
+PARTITION_KEY = 'date'
+MONTHS_AHEAD = 3
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(%s)", [table]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def table_definition(cursor, table):
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f') ORDER BY contype DESC",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes i WHERE i.tablename = %s AND NOT EXISTS ("
+        "SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname "
+        "AND c.conrelid = to_regclass(%s))",
+        [table, table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    return constraints, indexes
+
+
+def restore_definition(cursor, qn, table, constraints, indexes, primary_key):
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            definition = 'PRIMARY KEY (%s)' % ', '.join(qn(column) for column in primary_key)
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def swap_sequence(cursor, qn, old_table, table):
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [old_table, 'id'])
+    old_sequence = cursor.fetchone()[0]
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {qn(table)}')
+    last_id = cursor.fetchone()[0]
+    if old_sequence:
+        cursor.execute(f'SELECT last_value FROM {old_sequence}')
+        last_id = max(last_id, cursor.fetchone()[0])
+
+    sequence = f'{table}_id_seq'
+    cursor.execute(
+        "SELECT attidentity <> '' FROM pg_attribute "
+        "WHERE attrelid = to_regclass(%s) AND attname = 'id'",
+        [old_table],
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute(f'ALTER TABLE {qn(old_table)} ALTER COLUMN id DROP IDENTITY')
+    elif old_sequence:
+        cursor.execute(f'ALTER TABLE {qn(old_table)} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE {old_sequence}')
+    cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+    cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max(last_id, 1), last_id > 0])
+    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+
+def create_month_partitions(cursor, qn, table, first_month, last_month):
+    month = month_start(first_month)
+    while month <= last_month:
+        name = f'{table}_p{month:%Y%m}'
+        cursor.execute(
+            f'CREATE TABLE {qn(name)} PARTITION OF {qn(table)} FOR VALUES FROM (%s) TO (%s)',
+            [month, add_months(month, 1)],
+        )
+        month = add_months(month, 1)
+
+
+def partition_table(cursor, qn, table):
+    old_table = f'{table}_unpartitioned'
+    if is_partitioned(cursor, table):
+        return
+    cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+    constraints, indexes = table_definition(cursor, table)
+    cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}')
+
+    cursor.execute(
+        f'CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING DEFAULTS) '
+        f'PARTITION BY RANGE ({qn(PARTITION_KEY)})'
+    )
+    cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+    cursor.execute(f'SELECT MIN({qn(PARTITION_KEY)}) FROM {qn(old_table)}')
+    first_month = cursor.fetchone()[0] or date.today()
+    # The default partition is still empty, so partitions can be created in place
+    create_month_partitions(cursor, qn, table, first_month, add_months(month_start(date.today()), MONTHS_AHEAD))
+
+    cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}')
+    swap_sequence(cursor, qn, old_table, table)
+    cursor.execute(f'DROP TABLE {qn(old_table)}')
+    restore_definition(cursor, qn, table, constraints, indexes, ('id', PARTITION_KEY))
+
+
+def unpartition_table(cursor, qn, table):
+    old_table = f'{table}_partitioned'
+    if not is_partitioned(cursor, table):
+        return
+    cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+    constraints, indexes = table_definition(cursor, table)
+    cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}')
+
+    cursor.execute(f'CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING DEFAULTS)')
+    cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}')
+    cursor.execute(f'ALTER SEQUENCE {qn(table + "_id_seq")} OWNED BY {qn(table)}.id')
+    cursor.execute(f'DROP TABLE {qn(old_table)} CASCADE')
+    restore_definition(cursor, qn, table, constraints, indexes, ('id',))
+
+
+def partition_attendance(apps, schema_editor):
+    connection = schema_editor.connection
+    if not getattr(settings, 'ATTENDANCE_PARTITIONING', False) or connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for table in ATTENDANCE_TABLES:
+            partition_table(cursor, connection.ops.quote_name, table)
+
+
+def unpartition_attendance(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for table in ATTENDANCE_TABLES:
+            unpartition_table(cursor, connection.ops.quote_name, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_branchcalendar_branchholiday'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_attendance, unpartition_attendance),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.9 on 2026-10-19 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_attendance_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentAttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('statuses', models.BinaryField()),
+                ('time_in', models.TimeField(blank=True, null=True)),
+                ('time_out', models.TimeField(blank=True, null=True)),
+                ('overrides', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to='api.student')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeAttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('statuses', models.BinaryField()),
+                ('time_in', models.TimeField(blank=True, null=True)),
+                ('time_out', models.TimeField(blank=True, null=True)),
+                ('overrides', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to='api.employee')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'unique_together': {('employee', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_task_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedtask',
+            name='run_key',
+            field=models.CharField(blank=True, max_length=200, null=True, unique=True),
+        ),
+    ]
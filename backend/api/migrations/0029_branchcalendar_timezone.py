@@ -0,0 +1,24 @@
+# Generated by Django 4.2.9 on 2026-10-19 14:20
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0028_queuedtask_run_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branchcalendar',
+            name='push_time',
+            field=models.TimeField(default=datetime.time(21, 0)),
+        ),
+        migrations.AddField(
+            model_name='branchcalendar',
+            name='timezone',
+            field=models.CharField(default='Asia/Kathmandu', max_length=50),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.9 on 2026-10-19 09:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_branchcalendar_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employeeattendance',
+            name='field_clock',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='studentattendance',
+            name='field_clock',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='Kiosk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kiosks', to='api.branch')),
+            ],
+            options={
+                'unique_together': {('branch', 'name')},
+            },
+        ),
+    ]
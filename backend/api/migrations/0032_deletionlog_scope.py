@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_change_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletionlog',
+            name='branch_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deletionlog',
+            name='owner_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_deletionlog_scope'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('Uploading', 'Uploading'), ('Complete', 'Complete'), ('Attached', 'Attached'), ('Used', 'Used')], default='Uploading', max_length=20),
+        ),
+    ]
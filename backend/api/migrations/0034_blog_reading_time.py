@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-19 14:40
+
+import math
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+def fill_reading_times(apps, schema_editor):
+    Blog = apps.get_model('api', 'Blog')
+    blogs = list(Blog.objects.only('id', 'content'))
+    for blog in blogs:
+        words = len(strip_tags(blog.content or '').split())
+        blog.reading_time = max(1, math.ceil(words / 200))
+    Blog.objects.bulk_update(blogs, ['reading_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_uploadsession_attached'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blog',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1, help_text='Minutes'),
+        ),
+        migrations.RunPython(fill_reading_times, migrations.RunPython.noop),
+    ]
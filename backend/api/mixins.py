@@ -0,0 +1,442 @@
+"""
+Reusable viewset mixins shared by the API viewsets.
+"""
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max, Q
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from .cache import PUBLIC_CACHE_TIMEOUT, response_cache_key
+from .changes import (
+    CHANGE_FEED_PAGE_SIZE, TOKEN_OVERLAP, TokenExpired, make_token, make_page_token, parse_token,
+    parse_page_token, check_token, deleted_ids,
+)
+
+
+class SparseFieldsetMixin:
+    """
+    Adds ?fields= and ?exclude= support to read actions.
+
+    The requested fields trim the serializer output and the columns that are
+    not needed are deferred on the queryset, so they are never loaded from the
+    database. Long text columns listed in `list_deferred_fields` are left out
+    of list responses unless they are asked for explicitly with ?fields= or
+    ?include=.
+    """
+    list_deferred_fields = ()
+
+    def get_sparse_fields(self):
+        """Return a (fields, exclude) pair for the current request"""
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None, set()
+
+        params = self.request.query_params
+        fields = None
+        if params.get('fields'):
+            fields = {name.strip() for name in params['fields'].split(',') if name.strip()}
+        exclude = set()
+        if params.get('exclude'):
+            exclude = {name.strip() for name in params['exclude'].split(',') if name.strip()}
+
+        # Heavy columns are skipped on list views unless requested explicitly
+        if self.action == 'list' and fields is None:
+            include = set()
+            if params.get('include'):
+                include = {name.strip() for name in params['include'].split(',') if name.strip()}
+            exclude |= set(self.list_deferred_fields) - include
+
+        return fields, exclude
+
+    def get_serializer(self, *args, **kwargs):
+        fields, exclude = self.get_sparse_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        if exclude:
+            kwargs.setdefault('exclude', exclude)
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, exclude = self.get_sparse_fields()
+        if fields is None and not exclude:
+            return queryset
+
+        serializer_fields = self.get_serializer_class()().fields
+        if fields is not None:
+            dropped = set(serializer_fields) - fields
+        else:
+            dropped = set(exclude)
+        dropped |= set(exclude)
+
+        # Only plain columns are deferred, relations may still be traversed
+        # by select_related or by other serializer fields
+        model_fields = {
+            field.name: field for field in queryset.model._meta.concrete_fields
+            if not field.is_relation and not field.primary_key
+        }
+        deferred = []
+        for name in dropped:
+            field = serializer_fields.get(name)
+            source = field.source if field is not None else name
+            if source in model_fields and not self._source_is_used(source, serializer_fields, dropped):
+                deferred.append(source)
+
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    @staticmethod
+    def _source_is_used(source, serializer_fields, dropped):
+        """Check if a kept serializer field still reads the given column"""
+        for name, field in serializer_fields.items():
+            if name not in dropped and field.source == source:
+                return True
+        return False
+
+
+class ConditionalGetMixin:
+    """
+    Adds ETag / Last-Modified validators to list and retrieve actions.
+
+    List validators are computed from a single Max/Count aggregate over the
+    scoped queryset, so a poll that has not changed returns 304 Not Modified
+    without loading or serializing any rows. Changes to related rows (for
+    example a renamed branch) do not change the validator.
+    """
+    timestamp_field = 'updated_at'
+
+    def get_list_etag(self, queryset):
+        aggregate = queryset.order_by().aggregate(
+            last_modified=Max(self.timestamp_field),
+            count=Count('pk'),
+        )
+        last_modified = aggregate['last_modified']
+        # The full path keeps ?fields=, filters and paging apart
+        key = '|'.join([
+            self.request.get_full_path(),
+            str(self.request.user.pk),
+            str(aggregate['count']),
+            last_modified.isoformat() if last_modified else '',
+        ])
+        return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    def get_object_etag(self, instance):
+        last_modified = getattr(instance, self.timestamp_field)
+        key = '|'.join([
+            self.request.get_full_path(),
+            str(self.request.user.pk),
+            str(instance.pk),
+            last_modified.isoformat() if last_modified else '',
+        ])
+        return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_list_etag(self.filter_queryset(self.get_queryset()))
+        # Last-Modified is not sent for lists, a delete does not move Max()
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            patch_vary_headers(not_modified, ['Authorization'])
+            return not_modified
+
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_object_etag(instance)
+        last_modified = getattr(instance, self.timestamp_field)
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            patch_vary_headers(not_modified, ['Authorization'])
+            return not_modified
+
+        serializer = self.get_serializer(instance)
+        response = Response(serializer.data)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Authorization'])
+        return response
+
+
+class ChangeFeedMixin:
+    """
+    Serves `?updated_since=<token>` list requests from the change feed: the
+    rows changed since the token, the ids deleted since and a new token
+    (see api.changes). Filters and ?fields= apply as usual, rows come in
+    pages of `change_page_size` in the order they changed instead of the
+    list pagination. Place first so it runs before the caching and
+    conditional GET mixins.
+
+    Deleted ids are limited to get_deletion_scope() and exclude the rows the
+    requester can still see. They are sent with the first page.
+    """
+    timestamp_field = 'updated_at'
+    change_page_size = CHANGE_FEED_PAGE_SIZE
+
+    def list(self, request, *args, **kwargs):
+        if 'updated_since' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        value = request.query_params['updated_since']
+        try:
+            page = parse_page_token(value)
+            since = parse_token(value) if page is None else None
+            check_token(since if page is None else page[0])
+        except ValueError:
+            return Response({"detail": "Invalid updated_since token."}, status=status.HTTP_400_BAD_REQUEST)
+        except TokenExpired:
+            return Response(
+                {"detail": "The updated_since token has expired, fetch the full list again."},
+                status=status.HTTP_410_GONE
+            )
+
+        # Taken before reading and kept across pages, so nothing committed meanwhile is skipped
+        started = timezone.now() if page is None else page[0]
+        queryset = self.filter_queryset(self.get_queryset())
+        deleted = []
+        if page is not None:
+            _, updated_at, pk = page
+            queryset = queryset.filter(
+                Q(**{f'{self.timestamp_field}__gt': updated_at})
+                | Q(**{self.timestamp_field: updated_at, 'pk__gt': pk})
+            )
+        elif since is not None:
+            deleted = deleted_ids(queryset.model, since, self.get_deletion_scope())
+            if deleted:
+                # A row that moved within the requester's scope is still listed
+                visible = set(queryset.filter(pk__in=deleted).values_list('pk', flat=True))
+                deleted = [pk for pk in deleted if pk not in visible]
+            queryset = queryset.filter(**{f'{self.timestamp_field}__gt': since})
+
+        keys = list(queryset.order_by(self.timestamp_field, 'pk')
+                    .values_list(self.timestamp_field, 'pk')[:self.change_page_size + 1])
+        more = len(keys) > self.change_page_size
+        keys = keys[:self.change_page_size]
+        if more:
+            token = make_page_token(started, *keys[-1])
+        else:
+            token = make_token(started - TOKEN_OVERLAP)
+        rows = queryset.filter(pk__in=[pk for _, pk in keys]).order_by(self.timestamp_field, 'pk')
+        return Response({
+            'results': self.get_change_data(rows), 'deleted': deleted, 'token': token, 'more': more,
+        })
+
+    def get_deletion_scope(self):
+        """
+        Q on DeletionLog for the tombstones the requester may see, None for
+        all: their own rows and the rows of their branch.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return Q(pk__in=[])
+        if user.role == 'SuperAdmin':
+            return None
+        scope = Q(owner_id=user.pk)
+        employee = getattr(user, 'employee_profile', None)
+        if employee is not None:
+            scope |= Q(branch_id=employee.branch_id)
+        return scope
+
+    def get_change_data(self, queryset):
+        if getattr(self, 'values_serializer_class', None) is not None:
+            return self.get_values_data(queryset)
+        return self.get_serializer(queryset, many=True).data
+
+
+class AnonymousCacheMixin:
+    """
+    Serves anonymous list and retrieve responses from the shared cache.
+
+    Entries are invalidated when the viewset's model or any model in
+    `cache_models` is saved or deleted (see api.cache). Anonymous responses
+    are marked public so a CDN or reverse proxy can keep them for
+    `cache_timeout` seconds; responses to signed in users are marked private.
+    Place before ConditionalGetMixin so cached entries keep their ETag.
+    """
+    cache_models = ()
+    cache_timeout = PUBLIC_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated or 'HTTP_AUTHORIZATION' in request.META:
+            response = handler(request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+            return response
+
+        key = response_cache_key(request, [self.queryset.model, *self.cache_models])
+        cached = cache.get(key)
+        if cached is not None:
+            data, headers = cached
+            etag = headers.get('ETag')
+            response = get_conditional_response(request, etag=etag) if etag else None
+            if response is None:
+                response = Response(data)
+            for header, value in headers.items():
+                response[header] = value
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                headers = {
+                    header: response[header]
+                    for header in ('ETag', 'Last-Modified') if response.has_header(header)
+                }
+                cache.set(key, (response.data, headers), self.cache_timeout)
+
+        patch_cache_control(response, public=True, max_age=self.cache_timeout)
+        patch_vary_headers(response, ['Authorization', 'Accept'])
+        return response
+
+
+def get_related_paths(serializer, model, prefix=''):
+    """
+    Work out the select_related and prefetch_related paths a serializer needs.
+
+    Dotted `source=` paths and nested serializers are followed through the
+    model relations. SerializerMethodFields are opaque, so serializers list
+    the relations those use in `Meta.related_hints`, a mapping of field name
+    to ORM paths.
+    """
+    select, prefetch = set(), set()
+    hints = getattr(getattr(serializer, 'Meta', None), 'related_hints', {})
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+
+        for path in hints.get(name, ()):
+            _add_path(model, path.split('__'), prefix, select, prefetch, include_last=True)
+
+        if field.source == '*':
+            continue
+
+        nested = field.child if isinstance(field, serializers.ListSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer):
+            related_model, prefetched = _add_path(model, field.source_attrs, prefix, select, prefetch, include_last=True)
+            if related_model is not None:
+                nested_select, nested_prefetch = get_related_paths(
+                    nested, related_model, prefix + '__'.join(field.source_attrs) + '__'
+                )
+                # Anything below a prefetched relation has to be prefetched too
+                if prefetched:
+                    prefetch |= nested_select | nested_prefetch
+                else:
+                    select |= nested_select
+                    prefetch |= nested_prefetch
+        else:
+            # A bare foreign key is rendered from its *_id column
+            _add_path(model, field.source_attrs, prefix, select, prefetch, include_last=False)
+
+    return select, prefetch
+
+
+def get_related_models(serializer, model):
+    """The models a serializer reads: `model` and the ones at the end of its related paths"""
+    select, prefetch = get_related_paths(serializer, model)
+    models = {model}
+    for path in select | prefetch:
+        related = model
+        for attr in path.split('__'):
+            related = related._meta.get_field(attr).related_model
+        models.add(related)
+    return models
+
+
+def _add_path(model, attrs, prefix, select, prefetch, include_last):
+    """
+    Add the relational part of `attrs` to select/prefetch.
+
+    Returns the model at the end of the path (None if the path leaves the
+    relations early) and whether the path had to be prefetched.
+    """
+    attrs = list(attrs) if include_last else list(attrs)[:-1]
+    relations = []
+    prefetched = False
+    for attr in attrs:
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not model_field.is_relation:
+            break
+        relations.append(attr)
+        if model_field.one_to_many or model_field.many_to_many:
+            prefetched = True
+        model = model_field.related_model
+
+    if not relations:
+        return None, False
+    path = prefix + '__'.join(relations)
+    (prefetch if prefetched else select).add(path)
+    return (model if len(relations) == len(attrs) else None), prefetched
+
+
+class AutoRelatedMixin:
+    """
+    Applies select_related/prefetch_related based on the serializer fields.
+
+    New serializer fields that walk a relation are picked up automatically,
+    so they cannot silently add N+1 queries to list endpoints.
+    """
+    _related_paths_cache = {}
+
+    def get_related_paths(self):
+        serializer = self.get_serializer()
+        model = self.get_serializer_class().Meta.model
+        key = (type(serializer), tuple(sorted(serializer.fields)))
+        if key not in self._related_paths_cache:
+            self._related_paths_cache[key] = get_related_paths(serializer, model)
+        return self._related_paths_cache[key]
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select, prefetch = self.get_related_paths()
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+
+class ValuesListMixin:
+    """
+    Serves the list action through `values_serializer_class`.
+
+    The values serializer renders rows straight from .values(), which skips
+    building model instances for large list responses. Other actions keep
+    using the regular serializer.
+    """
+    values_serializer_class = None
+
+    def get_values_data(self, queryset):
+        """Serialize a queryset through the values serializer"""
+        serializer_class = self.values_serializer_class
+        return serializer_class(serializer_class.prepare(queryset)).data
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+
+        serializer_class = self.values_serializer_class
+        queryset = serializer_class.prepare(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page).data)
+        return Response(serializer_class(queryset).data)
@@ -1,8 +1,18 @@
+import os
+import uuid
+import datetime
+import math
+
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
+from .storage import get_blob_storage
+
 
 class UserManager(BaseUserManager):
     """Define a model manager for User model with no username field."""
@@ -52,6 +62,7 @@ class User(AbstractUser):
     username = None  # Remove username field
     email = models.EmailField(_('email address'), unique=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # Add related_name to avoid clashes with auth.User
     groups = models.ManyToManyField(
@@ -101,7 +112,7 @@ class Branch(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     address = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         if self.city and self.country:
@@ -109,6 +120,44 @@ class Branch(models.Model):
         return self.name
 
 
+
+class BranchCalendar(models.Model):
+    """Working days and default hours of a branch, used for implicit attendance"""
+    # Python weekday numbers (Monday is 0); Sunday to Friday by default
+    DEFAULT_WORKING_DAYS = '6,0,1,2,3,4'
+
+    branch = models.OneToOneField(Branch, on_delete=models.CASCADE, related_name='calendar')
+    working_days = models.CharField(max_length=20, default=DEFAULT_WORKING_DAYS,
+                                    help_text="Comma separated weekday numbers, Monday is 0")
+    default_time_in = models.TimeField(default=datetime.time(9, 0))
+    default_time_out = models.TimeField(default=datetime.time(17, 0))
+    # Local time zone of the branch and the local time its nightly attendance push runs
+    timezone = models.CharField(max_length=50, default='Asia/Kathmandu')
+    push_time = models.TimeField(default=datetime.time(21, 0))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def working_weekdays(self):
+        return {int(day) for day in self.working_days.split(',') if day.strip() != ''}
+
+    def __str__(self):
+        return f"{self.branch.name} calendar"
+
+
+class BranchHoliday(models.Model):
+    """A non-working day for one branch"""
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='holidays')
+    date = models.DateField()
+    name = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        unique_together = ('branch', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.branch.name} - {self.date} {self.name}"
+
 class Employee(models.Model):
     """Employee model connected to User"""
     GENDER_CHOICES = (
@@ -151,14 +200,14 @@ class Employee(models.Model):
     address = models.TextField()
     
     # Optional Fields
-    profile_image = models.ImageField(upload_to='employee_profiles/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='employee_profiles/', storage=get_blob_storage, blank=True, null=True)
     emergency_contact = models.CharField(max_length=20, blank=True, null=True)
-    citizenship_document = models.FileField(upload_to='employee_documents/', blank=True, null=True, 
+    citizenship_document = models.FileField(upload_to='employee_documents/', storage=get_blob_storage, blank=True, null=True,
                                           help_text="Upload citizenship document (PDF only)")
     
     # System Fields
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - {self.user.role}"
@@ -197,17 +246,17 @@ class Student(models.Model):
     language_test = models.CharField(max_length=10, choices=LANGUAGE_TEST_CHOICES, default='None')
     
     # Optional Fields
-    profile_image = models.ImageField(upload_to='student_profiles/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='student_profiles/', storage=get_blob_storage, blank=True, null=True)
     emergency_contact = models.CharField(max_length=20, blank=True, null=True)
     mother_name = models.CharField(max_length=100, blank=True, null=True)
     father_name = models.CharField(max_length=100, blank=True, null=True)
     parent_number = models.CharField(max_length=20, blank=True, null=True)
-    resume = models.FileField(upload_to='student_resumes/', blank=True, null=True,
+    resume = models.FileField(upload_to='student_resumes/', storage=get_blob_storage, blank=True, null=True,
                             help_text="Upload CV/Resume (PDF only)")
     
     # System Fields
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - {self.institution_name}"
@@ -278,7 +327,7 @@ class Lead(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_leads')
     assigned_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_leads_by')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.name} - {self.interested_course or 'No course specified'}"
@@ -303,7 +352,7 @@ class Job(models.Model):
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='created_jobs')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     location = models.CharField(max_length=255, default='Not specified')
     required_experience = models.CharField(max_length=255, default='Not specified')
     
@@ -314,14 +363,22 @@ class Job(models.Model):
 class JobResponse(models.Model):
     """Job application responses"""
     job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='responses')
+    # Set when the applicant is a registered student
+    student = models.ForeignKey(Student, on_delete=models.SET_NULL, null=True, blank=True, related_name='job_responses')
     name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.CharField(max_length=20)
-    resume = models.FileField(upload_to='resumes/')
+    resume = models.FileField(upload_to='resumes/', storage=get_blob_storage)
     cover_letter = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=50, default='New')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    class Meta:
+        indexes = [
+            # A student's applications, newest first
+            models.Index(fields=['student', '-created_at'], name='jobresponse_student_created'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.job.title}"
@@ -334,10 +391,34 @@ class Blog(models.Model):
     branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='blogs')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='blogs')
     featured_image = models.ImageField(upload_to='blog_images/', blank=True, null=True)
+    # Plain text teaser and reading time for list cards, kept in sync with content on save
+    excerpt = models.CharField(max_length=300, blank=True, default='')
+    reading_time = models.PositiveSmallIntegerField(default=1, help_text='Minutes')
     is_published = models.BooleanField(default=False)
     published_date = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    
+    EXCERPT_LENGTH = 200
+    WORDS_PER_MINUTE = 200
+    
+    @classmethod
+    def make_excerpt(cls, content):
+        text = ' '.join(strip_tags(content or '').split())
+        return Truncator(text).chars(cls.EXCERPT_LENGTH)
+    
+    @classmethod
+    def make_reading_time(cls, content):
+        words = len(strip_tags(content or '').split())
+        return max(1, math.ceil(words / cls.WORDS_PER_MINUTE))
+    
+    def save(self, *args, **kwargs):
+        self.excerpt = self.make_excerpt(self.content)
+        self.reading_time = self.make_reading_time(self.content)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'content' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'excerpt', 'reading_time'}
+        super().save(*args, **kwargs)
     
     def __str__(self):
         return self.title
@@ -364,7 +445,9 @@ class EmployeeAttendance(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='employee_attendance_created')
     updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='employee_attendance_updated')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Time of the last kiosk-synced write of each field, see api.kiosk_sync
+    field_clock = models.JSONField(null=True, blank=True)
     
     class Meta:
         unique_together = ('employee', 'date')
@@ -395,7 +478,9 @@ class StudentAttendance(models.Model):
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='student_attendance_created')
     updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='student_attendance_updated')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Time of the last kiosk-synced write of each field, see api.kiosk_sync
+    field_clock = models.JSONField(null=True, blank=True)
     
     class Meta:
         unique_together = ('student', 'date')
@@ -405,6 +490,65 @@ class StudentAttendance(models.Model):
         return f"{self.student.user.first_name} {self.student.user.last_name} - {self.date} - {self.status}"
 
 
+class EmployeeAttendanceArchive(models.Model):
+    """One employee's attendance for a closed month, see api.attendance_archive"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_archives')
+    month = models.DateField(help_text="First day of the month")
+    # 3 bits per day of the month, status codes from ARCHIVE_STATUSES
+    statuses = models.BinaryField()
+    # Most common times of the month, days with other times are in overrides
+    time_in = models.TimeField(null=True, blank=True)
+    time_out = models.TimeField(null=True, blank=True)
+    overrides = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('employee', 'month')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.month:%Y-%m}"
+
+
+class StudentAttendanceArchive(models.Model):
+    """One student's attendance for a closed month, see api.attendance_archive"""
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_archives')
+    month = models.DateField(help_text="First day of the month")
+    # 3 bits per day of the month, status codes from ARCHIVE_STATUSES
+    statuses = models.BinaryField()
+    # Most common times of the month, days with other times are in overrides
+    time_in = models.TimeField(null=True, blank=True)
+    time_out = models.TimeField(null=True, blank=True)
+    overrides = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'month')
+        ordering = ['-month']
+
+    def __str__(self):
+        return f"{self.student_id} - {self.month:%Y-%m}"
+
+
+class Kiosk(models.Model):
+    """A front desk device that records attendance offline and syncs it, see api.kiosk_sync"""
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name='kiosks')
+    name = models.CharField(max_length=100)
+    # Highest client sequence number applied, older events are skipped
+    last_seq = models.BigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('branch', 'name')
+
+    def __str__(self):
+        return f"{self.name} ({self.branch.name})"
+
+
 class ActivityLog(models.Model):
     """Activity log model to track user actions"""
     ACTION_TYPES = (
@@ -422,10 +566,150 @@ class ActivityLog(models.Model):
     action_model = models.CharField(max_length=50, help_text='The model/table being acted upon')
     action_details = models.TextField(help_text='Details of the action performed')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} - {self.action_type} - {self.created_at}"
+
+
+class DeletionLog(models.Model):
+    """Tombstone of a deleted record for the ?updated_since= change feed, see api.changes"""
+    model = models.CharField(max_length=100, help_text="Model label, e.g. 'api.lead'")
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+    # Scope the row was listed under, to report it only to users who could see it
+    branch_id = models.BigIntegerField(null=True, blank=True)
+    owner_id = models.BigIntegerField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-deleted_at']
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='deletionlog_model_deleted_at'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+
+class UploadSession(models.Model):
+    """Chunked, resumable upload of a document"""
+    STATUS_CHOICES = (
+        ('Uploading', 'Uploading'),
+        ('Complete', 'Complete'),
+        ('Attached', 'Attached'),
+        ('Used', 'Used'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, default='application/pdf')
+    total_size = models.PositiveBigIntegerField()
+    received_size = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def part_path(self):
+        """Local staging file the chunks are appended to"""
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.id}.part')
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_size}/{self.total_size}) - {self.status}"
+
+
+class StoredBlob(models.Model):
+    """A file in the content-addressed storage and how many records refer to it"""
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} references)"
+
+
+
+class ScheduledTask(models.Model):
+    """A recurring task, queued by the worker whenever its cron schedule comes due"""
+    name = models.CharField(max_length=100, unique=True)
+    task = models.CharField(max_length=100, help_text="Registered task name, see api.tasks")
+    cron = models.CharField(max_length=100, help_text="Crontab expression, e.g. '0 21 * * *'")
+    timezone = models.CharField(max_length=50, default='Asia/Kathmandu')
+    kwargs = models.JSONField(default=dict, blank=True)
+    enabled = models.BooleanField(default=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.cron})"
+
+
+class QueuedTask(models.Model):
+    """One execution of a registered task, claimed by run_worker"""
+    STATUS_CHOICES = (
+        ('Pending', 'Pending'),
+        ('Running', 'Running'),
+        ('Succeeded', 'Succeeded'),
+        ('Failed', 'Failed'),
+    )
+
+    task = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    scheduled_task = models.ForeignKey(ScheduledTask, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='queued_tasks')
+    # Tasks with the same run key are queued only once, e.g. one push per schedule and day
+    run_key = models.CharField(max_length=200, null=True, blank=True, unique=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='queuedtask_status_run_after'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} - {self.status}"
+
+
+class TaskRun(models.Model):
+    """History of one attempt at a queued task"""
+    STATUS_CHOICES = (
+        ('Running', 'Running'),
+        ('Succeeded', 'Succeeded'),
+        ('Failed', 'Failed'),
+    )
+
+    queued_task = models.ForeignKey(QueuedTask, on_delete=models.CASCADE, related_name='runs')
+    attempt = models.PositiveIntegerField()
+    worker = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Running')
+    result = models.TextField(blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.queued_task.task} attempt {self.attempt} - {self.status}"
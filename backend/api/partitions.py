@@ -0,0 +1,226 @@
+"""
+Monthly range partitioning of the attendance tables on PostgreSQL.
+
+A partitioned table is split into one partition per month on its `date`
+column (`<table>_pYYYYMM`) plus a default partition that catches dates
+without a month partition, so inserts never fail. Queries bounded by date
+only scan the matching partitions, and old months can be detached into
+standalone tables for archiving without rewriting the rest.
+
+PostgreSQL requires unique constraints on a partitioned table to include
+the partition key, so the primary key becomes (id, date). The ORM keeps
+treating `id` as the primary key, ids still come from a single sequence
+and (employee, date) / (student, date) stay unique.
+
+Partitioning is opt-in with ATTENDANCE_PARTITIONING = True, applied by
+migration 0025 or later by `manage.py attendance_partitions --convert`.
+Other databases are left alone.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import connection as default_connection, transaction
+
+ATTENDANCE_PARTITIONING = getattr(settings, 'ATTENDANCE_PARTITIONING', False)
+
+ATTENDANCE_TABLES = ('api_employeeattendance', 'api_studentattendance')
+PARTITION_KEY = 'date'
+
+
+def supports_partitioning(connection=default_connection):
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT c.relkind = 'p' FROM pg_class c WHERE c.oid = to_regclass(%s)", [table]
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def list_partitions(cursor, table):
+    """Names of the partitions attached to `table`"""
+    cursor.execute(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname",
+        [table],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _table_definition(cursor, table):
+    """Constraints and standalone indexes of `table`, to recreate them on its replacement"""
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f') ORDER BY contype DESC",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes i WHERE i.tablename = %s AND NOT EXISTS ("
+        "SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname "
+        "AND c.conrelid = to_regclass(%s))",
+        [table, table],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    return constraints, indexes
+
+
+def _restore_definition(cursor, table, constraints, indexes, primary_key):
+    qn = cursor.db.ops.quote_name
+    for name, kind, definition in constraints:
+        if kind == 'p':
+            definition = 'PRIMARY KEY (%s)' % ', '.join(qn(column) for column in primary_key)
+        cursor.execute(f'ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}')
+    for definition in indexes:
+        cursor.execute(definition)
+
+
+def _swap_sequence(cursor, old_table, table):
+    """Give the id column of `table` a sequence continuing from `old_table`"""
+    qn = cursor.db.ops.quote_name
+    cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [old_table, 'id'])
+    old_sequence = cursor.fetchone()[0]
+    cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {qn(table)}')
+    last_id = cursor.fetchone()[0]
+    if old_sequence:
+        cursor.execute(f'SELECT last_value FROM {old_sequence}')
+        last_id = max(last_id, cursor.fetchone()[0])
+
+    # The old column's sequence goes away with the old table
+    sequence = f'{table}_id_seq'
+    cursor.execute(
+        "SELECT attidentity <> '' FROM pg_attribute "
+        "WHERE attrelid = to_regclass(%s) AND attname = 'id'",
+        [old_table],
+    )
+    if cursor.fetchone()[0]:
+        cursor.execute(f'ALTER TABLE {qn(old_table)} ALTER COLUMN id DROP IDENTITY')
+    elif old_sequence:
+        cursor.execute(f'ALTER TABLE {qn(old_table)} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE {old_sequence}')
+    cursor.execute(f'CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id')
+    cursor.execute('SELECT setval(%s, %s, %s)', [sequence, max(last_id, 1), last_id > 0])
+    cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+
+
+def create_partition(cursor, table, month):
+    """
+    Create the partition of `table` for `month` if it does not exist yet.
+
+    Rows for that month that landed in the default partition are moved into
+    the new partition before it is attached.
+    """
+    qn = cursor.db.ops.quote_name
+    name = partition_name(table, month)
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    if cursor.fetchone()[0]:
+        return False
+
+    start, end = month, add_months(month, 1)
+    default = f'{table}_default'
+    key = qn(PARTITION_KEY)
+    cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS)')
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [default])
+    if cursor.fetchone()[0]:
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(default)} WHERE {key} >= %s AND {key} < %s RETURNING *) '
+            f'INSERT INTO {qn(name)} SELECT * FROM moved',
+            [start, end],
+        )
+    cursor.execute(
+        f'ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    return True
+
+
+def ensure_partitions(cursor, table, first_month, last_month):
+    """Create the month partitions from `first_month` to `last_month`, return how many were new"""
+    created = 0
+    month = month_start(first_month)
+    while month <= last_month:
+        created += create_partition(cursor, table, month)
+        month = add_months(month, 1)
+    return created
+
+
+def partition_table(table, months_ahead=3, connection=default_connection):
+    """Convert `table` into a table partitioned by month, keeping its rows"""
+    qn = connection.ops.quote_name
+    old_table = f'{table}_unpartitioned'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if is_partitioned(cursor, table):
+            return False
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        # Constraint and index names are reused once the old table is gone
+        constraints, indexes = _table_definition(cursor, table)
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}')
+
+        cursor.execute(
+            f'CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ({qn(PARTITION_KEY)})'
+        )
+        cursor.execute(f'CREATE TABLE {qn(table + "_default")} PARTITION OF {qn(table)} DEFAULT')
+        cursor.execute(f'SELECT MIN({qn(PARTITION_KEY)}) FROM {qn(old_table)}')
+        first_month = cursor.fetchone()[0] or date.today()
+        ensure_partitions(cursor, table, first_month, add_months(month_start(date.today()), months_ahead))
+
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}')
+        _swap_sequence(cursor, old_table, table)
+        cursor.execute(f'DROP TABLE {qn(old_table)}')
+        _restore_definition(cursor, table, constraints, indexes, ('id', PARTITION_KEY))
+    return True
+
+
+def unpartition_table(table, connection=default_connection):
+    """Convert a partitioned `table` back into a single table, keeping the attached rows"""
+    qn = connection.ops.quote_name
+    old_table = f'{table}_partitioned'
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        if not is_partitioned(cursor, table):
+            return False
+        cursor.execute(f'LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE')
+        constraints, indexes = _table_definition(cursor, table)
+        cursor.execute(f'ALTER TABLE {qn(table)} RENAME TO {qn(old_table)}')
+
+        cursor.execute(f'CREATE TABLE {qn(table)} (LIKE {qn(old_table)} INCLUDING DEFAULTS)')
+        cursor.execute(f'INSERT INTO {qn(table)} SELECT * FROM {qn(old_table)}')
+        cursor.execute(f'ALTER SEQUENCE {qn(table + "_id_seq")} OWNED BY {qn(table)}.id')
+        # Drops the partitions along with the parent
+        cursor.execute(f'DROP TABLE {qn(old_table)} CASCADE')
+        _restore_definition(cursor, table, constraints, indexes, ('id',))
+    return True
+
+
+def detach_partitions(table, before, connection=default_connection):
+    """
+    Detach the month partitions of `table` older than `before`.
+
+    Detached partitions stay behind as standalone tables, ready to be dumped
+    and dropped. Returns their names.
+    """
+    qn = connection.ops.quote_name
+    cutoff = partition_name(table, month_start(before))
+    prefix = f'{table}_p'
+    detached = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for name in list_partitions(cursor, table):
+            if name.startswith(prefix) and name < cutoff:
+                cursor.execute(f'ALTER TABLE {qn(table)} DETACH PARTITION {qn(name)}')
+                detached.append(name)
+    return detached
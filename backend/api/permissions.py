@@ -54,9 +54,9 @@ class IsStudent(permissions.BasePermission):
         if hasattr(obj, 'user'):
             return obj.user == request.user
         
-        # If the object has a student field
+        # If the object has a student field (job applications may have none)
         if hasattr(obj, 'student'):
-            return obj.student.user == request.user
+            return obj.student is not None and obj.student.user == request.user
         
         return False
 
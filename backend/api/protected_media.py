@@ -0,0 +1,166 @@
+"""
+Serving of sensitive uploads (resumes, citizenship documents) after the
+API's permission checks.
+
+With PROTECTED_MEDIA_SERVER set, Django only checks permissions and then
+hands the transfer to the web server in a response header. The web server
+also handles range requests and keeps the worker free while the file
+downloads.
+
+- 'nginx': `X-Accel-Redirect: <PROTECTED_MEDIA_INTERNAL_URL><name>`, with a
+  matching internal location, e.g.
+
+      location /protected-media/ {
+          internal;
+          alias /srv/admin_bridge/backend/media/;
+      }
+
+- 'apache' (mod_xsendfile) or 'lighttpd': `X-Sendfile: <absolute path>`
+
+With no server configured (local development) the file is streamed by
+Django, with single-range support for resumable downloads. In production
+the web server should not serve MEDIA_ROOT publicly for these files.
+
+Links opened by the browser (an <a href>, window.open) cannot send the
+Authorization header. The client first POSTs to the document's URL and gets
+back a link with a signed ?token= for that one document, valid for
+PROTECTED_MEDIA_TOKEN_MAX_AGE seconds. The access token itself never
+appears in a URL.
+"""
+import os
+import re
+import mimetypes
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+PROTECTED_MEDIA_SERVER = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+PROTECTED_MEDIA_INTERNAL_URL = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+# Seconds a signed document link stays valid, long enough for a PDF viewer's range requests
+PROTECTED_MEDIA_TOKEN_MAX_AGE = getattr(settings, 'PROTECTED_MEDIA_TOKEN_MAX_AGE', 300)
+
+MEDIA_TOKEN_SALT = 'api.protected_media'
+
+# Bytes read per iteration when Django streams a range itself
+STREAM_CHUNK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def media_path(kind, pk, field):
+    return f'{kind}/{pk}/{field}'
+
+
+def make_media_token(user, kind, pk, field):
+    """Signed token that lets `user` open one document for PROTECTED_MEDIA_TOKEN_MAX_AGE seconds"""
+    return signing.dumps({'user': user.pk, 'path': media_path(kind, pk, field)}, salt=MEDIA_TOKEN_SALT)
+
+
+class MediaTokenAuthentication(BaseAuthentication):
+    """Authenticates a ?token= from make_media_token(), only on GET of the document it was made for"""
+
+    def authenticate(self, request):
+        token = request.query_params.get('token')
+        if not token or request.method not in ('GET', 'HEAD'):
+            return None
+        try:
+            data = signing.loads(token, salt=MEDIA_TOKEN_SALT, max_age=PROTECTED_MEDIA_TOKEN_MAX_AGE)
+        except signing.BadSignature:
+            raise AuthenticationFailed("This link is invalid or has expired.")
+        kwargs = request.parser_context['kwargs']
+        if data.get('path') != media_path(kwargs['kind'], kwargs['pk'], kwargs['field']):
+            raise AuthenticationFailed("This link is for another document.")
+        user = get_user_model().objects.filter(pk=data.get('user'), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("User not found.")
+        return user, None
+
+    def authenticate_header(self, request):
+        # Answer 401 rather than 403, like the JWT authentication
+        return 'Bearer realm="api"'
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) for a single byte range, end exclusive.
+
+    Returns None when the header is missing or not a single byte range (the
+    whole file is sent), and raises ValueError when it cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or end <= start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+def _read_range(file, start, end):
+    try:
+        file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = file.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve_file(request, field_file, download_name):
+    """Response that delivers `field_file`, through the web server when configured"""
+    content_type = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    disposition = f"inline; filename*=UTF-8''{quote(download_name)}"
+
+    if PROTECTED_MEDIA_SERVER in ('nginx', 'apache', 'lighttpd'):
+        response = HttpResponse(content_type=content_type)
+        if PROTECTED_MEDIA_SERVER == 'nginx':
+            response['X-Accel-Redirect'] = PROTECTED_MEDIA_INTERNAL_URL + quote(field_file.name)
+        else:
+            response['X-Sendfile'] = field_file.path
+        response['Content-Disposition'] = disposition
+        return response
+
+    size = field_file.size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file = field_file.storage.open(field_file.name, 'rb')
+    if byte_range is None:
+        response = FileResponse(file, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(file, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+        response['Content-Length'] = str(end - start)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = disposition
+    return response
+
+
+def download_name(instance, field_name):
+    """Readable file name for a download, since stored names may be content hashes"""
+    _, extension = os.path.splitext(getattr(instance, field_name).name)
+    return f'{instance._meta.model_name}-{instance.pk}-{field_name}{extension}'
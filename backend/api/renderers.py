@@ -0,0 +1,99 @@
+"""
+Fast renderers and parsers for the REST API.
+
+orjson is used when it is installed and the stdlib based DRF classes are
+used otherwise. MessagePack support needs the optional msgpack package.
+"""
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+
+_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    """Encode everything orjson does not handle the way DRF's encoder does"""
+    return _encoder.default(obj)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer that serializes with orjson when available.
+
+    Dates, times and datetimes are passed to DRF's encoder so the output is
+    byte-for-byte the same as the stdlib renderer. Indented output (browsable
+    API, `; indent=` media type parameter) falls back to the stdlib renderer.
+    """
+    if orjson is not None:
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.options)
+        except (orjson.JSONEncodeError, TypeError):
+            # e.g. integers wider than 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Keep the output a strict javascript subset, like JSONRenderer
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSONParser that parses with orjson when available"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """
+    Renders data as MessagePack, negotiated with `Accept: application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+class MessagePackParser(parsers.BaseParser):
+    """Parses MessagePack request bodies"""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
@@ -1,11 +1,78 @@
 from rest_framework import serializers
+from django.urls import reverse
+from django.utils import timezone
 from .models import (
     User, Branch, Employee, Student, Lead, 
-    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance, ActivityLog
+    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance, ActivityLog,
+    UploadSession
 )
 from django.contrib.auth.password_validation import validate_password
 import uuid
 from datetime import date
+from .cache import bump_version
+from .images import variant_names
+from .protected_media import download_name
+from .uploads import CHUNKED_UPLOAD_MAX_SIZE
+
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that takes optional `fields` and `exclude` arguments
+    to control which fields are rendered.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        exclude = kwargs.pop('exclude', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+        if exclude:
+            for field_name in set(exclude) & set(self.fields):
+                self.fields.pop(field_name)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Read-only field with the URLs of the generated variants of an image,
+    e.g. {"thumb": {"webp": url, "jpg": url}, "medium": {...}}.
+    """
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request', None)
+        urls = {}
+        for variant, names in variant_names(value.name).items():
+            urls[variant] = {}
+            for extension, name in names.items():
+                url = value.storage.url(name)
+                urls[variant][extension] = request.build_absolute_uri(url) if request is not None else url
+        return urls
+
+
+class ProtectedFileField(serializers.FileField):
+    """
+    FileField whose URL points at the permission-checked media view
+    instead of MEDIA_URL. The URL ends with a readable file name, as stored
+    names may be content hashes.
+    """
+
+    def __init__(self, kind, **kwargs):
+        self.kind = kind
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = reverse('protected-media-file', kwargs={
+            'kind': self.kind, 'pk': value.instance.pk, 'field': value.field.name,
+            'filename': download_name(value.instance, value.field.name),
+        })
+        request = self.context.get('request', None)
+        return request.build_absolute_uri(url) if request is not None else url
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -27,6 +94,10 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email', 'first_name', 'last_name', 'role', 'password', 'branch', 'branch_name']
+        related_hints = {
+            'branch': ['employee_profile__branch'],
+            'branch_name': ['employee_profile__branch'],
+        }
         extra_kwargs = {
             'password': {'write_only': True},
             'email': {'validators': []}
@@ -49,13 +120,14 @@ class BranchSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(DynamicFieldsModelSerializer):
     user = UserSerializer()
     branch_name = serializers.CharField(source='branch.name', read_only=True)
     employee_id = serializers.CharField(read_only=True)
     joining_date = serializers.DateField(read_only=True)
     profile_image = serializers.ImageField(required=False, allow_null=True)
-    citizenship_document = serializers.FileField(required=False, allow_null=True)
+    profile_image_variants = ImageVariantsField(source='profile_image')
+    citizenship_document = ProtectedFileField(kind='employees', required=False, allow_null=True)
     nationality = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     gender = serializers.CharField(required=False, allow_blank=True, allow_null=True)
     dob = serializers.DateField(required=False, allow_null=True)
@@ -103,8 +175,8 @@ class EmployeeSerializer(serializers.ModelSerializer):
         model = Employee
         fields = ['id', 'user', 'branch', 'branch_name', 'employee_id', 
                   'joining_date', 'salary', 'contact_number', 'address', 
-                  'profile_image', 'citizenship_document', 'emergency_contact',
-                  'nationality', 'gender', 'dob',
+                  'profile_image', 'profile_image_variants', 'citizenship_document',
+                  'emergency_contact', 'nationality', 'gender', 'dob',
                   'created_at', 'updated_at']
         
     def create(self, validated_data):
@@ -135,8 +207,11 @@ class EmployeeSerializer(serializers.ModelSerializer):
                 first_name=user_data.get('first_name', user.first_name),
                 last_name=user_data.get('last_name', user.last_name),
                 email=user_data.get('email', user.email),
-                role=user_data.get('role', user.role)
+                role=user_data.get('role', user.role),
+                # update() skips auto_now and post_save, keep the change feed and caches current
+                updated_at=timezone.now(),
             )
+            bump_version(User)
             
             if 'password' in user_data:
                 user.set_password(user_data['password'])
@@ -145,21 +220,22 @@ class EmployeeSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(DynamicFieldsModelSerializer):
     user = UserSerializer()
     branch_name = serializers.CharField(source='branch.name', read_only=True)
     student_id = serializers.CharField(read_only=True)
     enrollment_date = serializers.DateField(read_only=True)
     profile_image = serializers.ImageField(required=False, allow_null=True)
-    resume = serializers.FileField(required=False, allow_null=True)
+    profile_image_variants = ImageVariantsField(source='profile_image')
+    resume = ProtectedFileField(kind='students', required=False, allow_null=True)
     
     class Meta:
         model = Student
         fields = ['id', 'user', 'branch', 'branch_name', 'student_id', 
                   'enrollment_date', 'age', 'gender', 'nationality',
                   'contact_number', 'address', 'institution_name', 'language_test',
-                  'profile_image', 'emergency_contact', 'mother_name',
-                  'father_name', 'parent_number', 'resume',
+                  'profile_image', 'profile_image_variants', 'emergency_contact',
+                  'mother_name', 'father_name', 'parent_number', 'resume',
                   'created_at', 'updated_at']
         
     def create(self, validated_data):
@@ -225,7 +301,7 @@ class StudentUpdateSerializer(serializers.ModelSerializer):
         ]
 
 
-class LeadSerializer(serializers.ModelSerializer):
+class LeadSerializer(DynamicFieldsModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     assigned_by_email = serializers.EmailField(source='assigned_by.email', read_only=True)
     branch_name = serializers.CharField(source='branch.name', read_only=True)
@@ -254,7 +330,7 @@ class LeadSerializer(serializers.ModelSerializer):
         return representation
 
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(DynamicFieldsModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     branch_name = serializers.CharField(source='branch.name', read_only=True)
     branch_location = serializers.SerializerMethodField()
@@ -266,6 +342,7 @@ class JobSerializer(serializers.ModelSerializer):
                   'salary_range', 'is_active', 'created_by', 'created_by_name', 
                   'created_at', 'updated_at', 'location', 'required_experience']
         read_only_fields = ['created_by']
+        related_hints = {'branch_location': ['branch']}
         
     def get_branch_location(self, obj):
         if obj.branch:
@@ -282,25 +359,38 @@ class JobSerializer(serializers.ModelSerializer):
 
 class JobResponseSerializer(serializers.ModelSerializer):
     job_title = serializers.CharField(source='job.title', read_only=True)
+    resume = ProtectedFileField(kind='job-responses')
     
     class Meta:
         model = JobResponse
-        fields = ['id', 'job', 'job_title', 'name', 'email', 'phone', 
+        fields = ['id', 'job', 'job_title', 'student', 'name', 'email', 'phone', 
                   'resume', 'cover_letter', 'status', 
                   'created_at', 'updated_at']
+        read_only_fields = ['student']
+    
+    def create(self, validated_data):
+        # Link the application to the applying student, or to the student
+        # registered with the same email
+        request = self.context.get('request')
+        student = getattr(request.user, 'student_profile', None) if request is not None else None
+        if student is None:
+            student = Student.objects.filter(user__email__iexact=validated_data['email']).first()
+        validated_data['student'] = student
+        return super().create(validated_data)
 
 
-class BlogSerializer(serializers.ModelSerializer):
+class BlogSerializer(DynamicFieldsModelSerializer):
     author_name = serializers.CharField(source='author.get_full_name', read_only=True)
     branch_name = serializers.CharField(source='branch.name', read_only=True)
+    featured_image_variants = ImageVariantsField(source='featured_image')
     
     class Meta:
         model = Blog
-        fields = ['id', 'title', 'content', 'branch', 'branch_name', 
-                  'author', 'author_name', 'featured_image', 
+        fields = ['id', 'title', 'excerpt', 'reading_time', 'content', 'branch', 'branch_name', 
+                  'author', 'author_name', 'featured_image', 'featured_image_variants',
                   'is_published', 'published_date', 
                   'created_at', 'updated_at']
-        read_only_fields = ['author']
+        read_only_fields = ['author', 'excerpt', 'reading_time']
         
     def create(self, validated_data):
         user = self.context['request'].user
@@ -321,6 +411,12 @@ class EmployeeAttendanceSerializer(serializers.ModelSerializer):
             'branch_name', 'date', 'time_in', 'time_out', 'status', 'remarks',
             'created_by', 'updated_by', 'created_at', 'updated_at'
         ]
+        related_hints = {
+            'employee_name': ['employee__user'],
+            'employee_role': ['employee__user'],
+            'employee_id': ['employee'],
+            'branch_name': ['employee__branch'],
+        }
     
     def get_employee_name(self, obj):
         return f"{obj.employee.user.first_name} {obj.employee.user.last_name}"
@@ -363,6 +459,11 @@ class StudentAttendanceSerializer(serializers.ModelSerializer):
             'date', 'time_in', 'time_out', 'status', 'remarks',
             'created_by', 'updated_by', 'created_at', 'updated_at'
         ]
+        related_hints = {
+            'student_name': ['student__user'],
+            'student_id': ['student'],
+            'branch_name': ['student__branch'],
+        }
     
     def get_student_name(self, obj):
         return f"{obj.student.user.first_name} {obj.student.user.last_name}"
@@ -398,9 +499,34 @@ class ActivityLogSerializer(serializers.ModelSerializer):
         model = ActivityLog
         fields = ['id', 'user', 'user_name', 'user_role', 'action_type', 'action_model', 
                 'action_details', 'ip_address', 'created_at']
+        related_hints = {
+            'user_name': ['user'],
+            'user_role': ['user'],
+        }
     
     def get_user_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}"
     
     def get_user_role(self, obj):
-        return obj.user.role
\ No newline at end of file
+        return obj.user.role
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'content_type', 'total_size', 'received_size',
+                  'status', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'content_type', 'received_size', 'status', 'created_at', 'updated_at']
+
+    def validate_filename(self, value):
+        if not value.lower().endswith('.pdf'):
+            raise serializers.ValidationError("Only PDF documents can be uploaded.")
+        return value
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("File size must be greater than zero.")
+        if value > CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files may be at most {CHUNKED_UPLOAD_MAX_SIZE} bytes.")
+        return value
+
@@ -0,0 +1,47 @@
+"""
+Model signal handlers for the api app.
+"""
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+
+from .cache import CACHED_MODELS, bump_version
+from .changes import SCOPE_FIELDS, TRACKED_MODELS, log_deletion, log_scope_change
+from .activity_stream import publish_activity
+from .images import IMAGE_FIELDS, has_variants, schedule_variants
+
+
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    """Queue variant generation for image fields that do not have variants yet"""
+    if raw:
+        return
+    for app_label, model_name, field_name in IMAGE_FIELDS:
+        if sender._meta.app_label == app_label and sender._meta.object_name == model_name:
+            field_file = getattr(instance, field_name)
+            if field_file and not has_variants(field_file):
+                schedule_variants(instance, field_name)
+
+
+def connect_signals():
+    for app_label, model_name, _ in IMAGE_FIELDS:
+        post_save.connect(
+            generate_image_variants,
+            sender=apps.get_model(app_label, model_name),
+            dispatch_uid=f'image_variants_{app_label}_{model_name}',
+        )
+    for app_label, model_name in CACHED_MODELS:
+        model = apps.get_model(app_label, model_name)
+        post_save.connect(bump_version, sender=model, dispatch_uid=f'cache_version_save_{app_label}_{model_name}')
+        post_delete.connect(bump_version, sender=model, dispatch_uid=f'cache_version_delete_{app_label}_{model_name}')
+    for app_label, model_name in TRACKED_MODELS:
+        pre_delete.connect(
+            log_deletion,
+            sender=apps.get_model(app_label, model_name),
+            dispatch_uid=f'deletion_log_{app_label}_{model_name}',
+        )
+    for app_label, model_name in SCOPE_FIELDS:
+        pre_save.connect(
+            log_scope_change,
+            sender=apps.get_model(app_label, model_name),
+            dispatch_uid=f'scope_change_log_{app_label}_{model_name}',
+        )
+    post_save.connect(publish_activity, sender=apps.get_model('api', 'ActivityLog'), dispatch_uid='activity_stream')
@@ -0,0 +1,115 @@
+"""
+Content-addressed storage for uploaded documents and photos.
+
+Uploads are stored once per distinct content, as
+`blobs/<sha256[:2]>/<sha256><ext>`. Saving a file whose content is already
+stored costs one hash pass and no write. A StoredBlob row tracks each blob's
+reference count; deleting through the storage only decrements it, and the
+gc_blobs command removes blobs that nothing refers to any more.
+
+Files saved under a name already inside the blob directory, such as the
+image variants from api.images, are derived files. They are written under
+that name as-is and are not counted.
+"""
+import os
+import hashlib
+import tempfile
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIRECTORY = 'blobs'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that stores each distinct upload once, named by its SHA-256"""
+
+    def is_derived(self, name):
+        """Check if `name` is inside the blob directory (a blob or a file derived from one)"""
+        return name.replace('\\', '/').startswith(BLOB_DIRECTORY + '/')
+
+    def blob_name(self, digest, name):
+        _, extension = os.path.splitext(name)
+        return f'{BLOB_DIRECTORY}/{digest[:2]}/{digest}{extension.lower()}'
+
+    def get_available_name(self, name, max_length=None):
+        # Uploads are renamed to their hash in _save(), so they never collide
+        if self.is_derived(name):
+            return super().get_available_name(name, max_length=max_length)
+        return name
+
+    def _save(self, name, content):
+        if self.is_derived(name):
+            return super()._save(name, content)
+
+        hasher = hashlib.sha256()
+        size = 0
+        for chunk in content.chunks():
+            hasher.update(chunk)
+            size += len(chunk)
+        digest = hasher.hexdigest()
+        name = self.blob_name(digest, name)
+
+        full_path = self.path(name)
+        if not os.path.exists(full_path):
+            directory = os.path.dirname(full_path)
+            os.makedirs(directory, exist_ok=True)
+            # Write to a temporary file and rename, so a concurrent save of the
+            # same content never sees a partial blob
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+            try:
+                with os.fdopen(fd, 'wb') as destination:
+                    for chunk in content.chunks():
+                        destination.write(chunk)
+                if self.file_permissions_mode is not None:
+                    os.chmod(temp_path, self.file_permissions_mode)
+                os.replace(temp_path, full_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        StoredBlob = apps.get_model('api', 'StoredBlob')
+        blob, created = StoredBlob.objects.get_or_create(
+            sha256=digest, defaults={'name': name, 'size': size, 'refcount': 1}
+        )
+        if not created:
+            StoredBlob.objects.filter(pk=digest).update(refcount=F('refcount') + 1, updated_at=timezone.now())
+        return name
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        StoredBlob = apps.get_model('api', 'StoredBlob')
+        blobs = StoredBlob.objects.filter(name=name)
+        if blobs.filter(refcount__gt=0).update(refcount=F('refcount') - 1, updated_at=timezone.now()):
+            return
+        if blobs.exists():
+            # The file itself is removed by gc_blobs once nothing refers to it
+            return
+        super().delete(name)
+
+
+_blob_storage = None
+
+
+def get_blob_storage():
+    """Shared storage instance for FileFields, used as `storage=get_blob_storage`"""
+    global _blob_storage
+    if _blob_storage is None:
+        _blob_storage = ContentAddressedStorage()
+    return _blob_storage
+
+
+def blob_fields():
+    """All (model, field name) pairs stored in the content-addressed storage"""
+    fields = []
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if getattr(field, 'storage', None) is get_blob_storage():
+                fields.append((model, field.name))
+    return fields
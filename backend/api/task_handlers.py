@@ -0,0 +1,86 @@
+"""
+Tasks run by `manage.py run_worker`. Imported from ApiConfig.ready() so the
+registry is filled in every process.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import ActivityLog, QueuedTask
+from .tasks import enqueue, register
+
+
+@register('attendance.push', retry_delay=300)
+def push_attendance():
+    """Default 'Present' records for every branch at once"""
+    from .attendance_push import push_attendance_data
+    push_attendance_data()
+
+
+@register('attendance.dispatch')
+def dispatch_attendance_pushes():
+    """Queue the push of every branch whose local push time has passed, once per local date"""
+    from .attendance_push import due_branches
+    queued = 0
+    for branch_id, day in due_branches():
+        if enqueue('attendance.push_branch', run_key=f'attendance-push:{branch_id}:{day}',
+                   branch_id=branch_id, day=day.isoformat()):
+            queued += 1
+    return f'Queued {queued} branch pushes'
+
+
+@register('attendance.push_branch', retry_delay=300)
+def push_branch(branch_id, day):
+    """Default 'Present' records of one branch for its local date"""
+    from .attendance_push import push_branch_attendance
+    employees, students = push_branch_attendance(branch_id, day)
+    return f'Created {employees} employee and {students} student records'
+
+
+@register('logs.clean')
+def clean_activity_logs(days=1):
+    """Activity log retention"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = ActivityLog.objects.filter(created_at__lt=cutoff).delete()[0]
+    return f'Deleted {deleted} activity logs'
+
+
+@register('tasks.prune')
+def prune_task_history(days=30):
+    """Drop finished tasks and their run history"""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted = QueuedTask.objects.filter(
+        status__in=['Succeeded', 'Failed'], updated_at__lt=cutoff
+    ).delete()[0]
+    return f'Deleted {deleted} task records'
+
+
+@register('changes.prune')
+def prune_tombstones():
+    """Drop change feed tombstones past their retention"""
+    from .changes import prune_deletion_log
+    return f'Deleted {prune_deletion_log()} deletion log entries'
+
+
+@register('uploads.clean')
+def clean_uploads(hours=24):
+    """Abandoned chunked uploads and their staging files"""
+    from .uploads import remove_stale_uploads
+    return f'Removed {remove_stale_uploads(hours)} stale uploads'
+
+
+@register('images.variants')
+def generate_image_variants(app_label, model_name, pk, field_name):
+    """Capped original and resized variants of an uploaded image"""
+    from .images import process_image
+    if process_image(app_label, model_name, pk, field_name):
+        return f'Processed {model_name} {pk}.{field_name}'
+    return 'Nothing to do'
+
+
+@register('email.credentials', max_attempts=5)
+def send_credentials_email(user_data, extra_data=None):
+    """Welcome email with login details for a new employee or student"""
+    from utils.email_sender import send_employee_credentials_email
+    if not send_employee_credentials_email(user_data, extra_data):
+        raise RuntimeError(f"Could not send the credentials email to {user_data.get('email')}")
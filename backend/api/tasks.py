@@ -0,0 +1,203 @@
+"""
+Database-backed task queue.
+
+Tasks are plain functions registered under a name with @register (see
+api.task_handlers). `enqueue()` stores a QueuedTask row, and
+`manage.py run_worker` claims due rows with SELECT ... FOR UPDATE SKIP
+LOCKED, so any number of workers on any number of nodes can share the
+queue. Every attempt is
+recorded as a TaskRun. A failed task is retried with exponential backoff
+until it runs out of attempts.
+
+Recurring work is described by ScheduledTask rows with a crontab expression
+in a time zone. Workers bring them in line with TASK_SCHEDULES in settings
+when they start, and they can be disabled from the admin. A schedule that
+came due while no worker was running is queued once, not once per missed
+run.
+"""
+import logging
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from apscheduler.triggers.cron import CronTrigger
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .locks import try_lock
+from .models import QueuedTask, ScheduledTask, TaskRun
+
+logger = logging.getLogger(__name__)
+
+TASK_LOCK_TIMEOUT = getattr(settings, 'TASK_LOCK_TIMEOUT', 3600)
+
+RegisteredTask = namedtuple('RegisteredTask', ['name', 'func', 'max_attempts', 'retry_delay'])
+
+# Task name -> RegisteredTask
+TASKS = {}
+
+
+def register(name, max_attempts=3, retry_delay=60):
+    """Register a function as a task, `retry_delay` seconds doubles on every retry"""
+    def decorator(func):
+        TASKS[name] = RegisteredTask(name, func, max_attempts, retry_delay)
+        return func
+    return decorator
+
+
+def enqueue(name, run_after=None, scheduled_task=None, run_key=None, **kwargs):
+    """
+    Queue a run of the registered task `name` with JSON serializable `kwargs`.
+
+    Returns None if a task with the same `run_key` was queued before.
+    """
+    if name not in TASKS:
+        raise ValueError(f"Task '{name}' is not registered")
+    try:
+        with transaction.atomic():
+            return QueuedTask.objects.create(
+                task=name,
+                kwargs=kwargs,
+                run_after=run_after or timezone.now(),
+                max_attempts=TASKS[name].max_attempts,
+                scheduled_task=scheduled_task,
+                run_key=run_key,
+            )
+    except IntegrityError:
+        if run_key is None:
+            raise
+        return None
+
+
+def schedule_run_key(schedule, run_at):
+    """Run key of one firing of `schedule`, in the schedule's time zone"""
+    local = timezone.localtime(run_at, ZoneInfo(schedule.timezone))
+    return f'{schedule.name}:{local:%Y-%m-%d %H:%M}'
+
+
+def next_run(schedule, after):
+    """Next time the crontab of `schedule` fires after `after`"""
+    trigger = CronTrigger.from_crontab(schedule.cron, timezone=schedule.timezone)
+    return trigger.get_next_fire_time(None, after + timedelta(microseconds=1))
+
+
+def sync_schedules(schedules=None):
+    """Create or update the ScheduledTask rows described in TASK_SCHEDULES"""
+    if schedules is None:
+        schedules = getattr(settings, 'TASK_SCHEDULES', {})
+    now = timezone.now()
+    for name, options in schedules.items():
+        schedule, created = ScheduledTask.objects.get_or_create(name=name, defaults=options)
+        changed = [field for field, value in options.items() if getattr(schedule, field) != value]
+        if changed:
+            for field in changed:
+                setattr(schedule, field, options[field])
+        if created or changed or schedule.next_run_at is None:
+            schedule.next_run_at = next_run(schedule, now)
+            schedule.save()
+
+
+def schedule_due(now=None):
+    """
+    Queue the scheduled tasks that have come due, return how many were queued.
+
+    Only one worker at a time does this, the others skip the tick. The run
+    key makes a firing that is seen twice (for example by a worker reading
+    a stale next_run_at) queue a single task.
+    """
+    now = now or timezone.now()
+    queued = 0
+    with try_lock('task-scheduler') as acquired:
+        if not acquired:
+            return 0
+        with transaction.atomic():
+            due = ScheduledTask.objects.select_for_update(skip_locked=True).filter(
+                enabled=True, next_run_at__lte=now
+            )
+            for schedule in due:
+                run_key = schedule_run_key(schedule, schedule.next_run_at)
+                if enqueue(schedule.task, run_after=schedule.next_run_at, scheduled_task=schedule,
+                           run_key=run_key, **schedule.kwargs):
+                    queued += 1
+                schedule.last_run_at = schedule.next_run_at
+                # Computed from now, so runs missed while no worker was up collapse into one
+                schedule.next_run_at = next_run(schedule, now)
+                schedule.save(update_fields=['last_run_at', 'next_run_at', 'updated_at'])
+    return queued
+
+
+def claim_tasks(worker, limit):
+    """Mark up to `limit` due tasks as running for `worker` and return them"""
+    if limit <= 0:
+        return []
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            QueuedTask.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', run_after__lte=now)
+            .order_by('run_after', 'pk')[:limit]
+        )
+        if tasks:
+            QueuedTask.objects.filter(pk__in=[task.pk for task in tasks]).update(
+                status='Running', locked_by=worker, locked_at=now,
+                attempts=F('attempts') + 1, updated_at=now,
+            )
+    return tasks
+
+
+def requeue_stale(timeout=TASK_LOCK_TIMEOUT):
+    """Give tasks held by a worker that died another attempt, return how many were found"""
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = QueuedTask.objects.filter(status='Running', locked_at__lt=cutoff)
+    error = 'Worker stopped responding while running the task'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='Failed', last_error=error, locked_by='', locked_at=None, updated_at=timezone.now()
+    )
+    retried = stale.update(
+        status='Pending', last_error=error, locked_by='', locked_at=None, updated_at=timezone.now()
+    )
+    return failed + retried
+
+
+def run_task(pk, worker):
+    """Run one claimed task and record the attempt, returns True on success"""
+    close_old_connections()
+    try:
+        return _run_task(QueuedTask.objects.get(pk=pk), worker)
+    finally:
+        close_old_connections()
+
+
+def _run_task(queued, worker):
+    run = TaskRun.objects.create(queued_task=queued, attempt=queued.attempts, worker=worker)
+    registered = TASKS.get(queued.task)
+    try:
+        if registered is None:
+            raise LookupError(f"Task '{queued.task}' is not registered")
+        result = registered.func(**queued.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        finished = timezone.now()
+        logger.error(f"Task {queued.task} #{queued.pk} failed (attempt {queued.attempts}):\n{error}")
+        TaskRun.objects.filter(pk=run.pk).update(status='Failed', error=error, finished_at=finished)
+
+        updates = {'last_error': error, 'locked_by': '', 'locked_at': None, 'updated_at': finished}
+        if registered is not None and queued.attempts < queued.max_attempts:
+            delay = registered.retry_delay * 2 ** (queued.attempts - 1)
+            updates.update(status='Pending', run_after=finished + timedelta(seconds=delay))
+        else:
+            updates['status'] = 'Failed'
+        QueuedTask.objects.filter(pk=queued.pk).update(**updates)
+        return False
+
+    finished = timezone.now()
+    TaskRun.objects.filter(pk=run.pk).update(
+        status='Succeeded', result='' if result is None else str(result), finished_at=finished
+    )
+    QueuedTask.objects.filter(pk=queued.pk).update(
+        status='Succeeded', locked_by='', locked_at=None, updated_at=finished
+    )
+    return True
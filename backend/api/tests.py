@@ -1,3 +1,873 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .attendance import BranchCalendars, local_today
+from .attendance_archive import pack_statuses, unpack_statuses
+from .attendance_push import push_branch_attendance
+from .changes import make_token
+from .images import process_image, variant_name
+from .locks import try_lock
+from .models import (
+    ActivityLog, Blog, Branch, DeletionLog, Employee, EmployeeAttendance, Job, JobResponse, Lead, QueuedTask,
+    Student, StudentAttendance, UploadSession, User,
+)
+from .tasks import claim_tasks, enqueue, run_task
+from .uploads import get_completed_upload
+
+PDF = b'%PDF-1.4\n' + b'x' * 2000 + b'\n%%EOF\n'
+
+
+def client_for(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+def results(response):
+    data = response.json()
+    return data['results'] if isinstance(data, dict) and 'results' in data else data
+
+
+class ApiFixtures:
+    """A branch with a manager, a student, leads, a job and a published blog"""
+
+    def create_fixtures(self):
+        self.branch = Branch.objects.create(name='Kathmandu', address='Putalisadak')
+        self.other_branch = Branch.objects.create(name='Pokhara', address='Lakeside')
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', password='pass', first_name='Ada', last_name='Admin'
+        )
+        self.manager_user = User.objects.create_user(
+            email='manager@example.com', password='pass', first_name='Mina', last_name='Manager',
+            role='BranchManager'
+        )
+        self.manager = Employee.objects.create(
+            user=self.manager_user, branch=self.branch, employee_id='E1', contact_number='1', address='a'
+        )
+        self.other_manager_user = User.objects.create_user(
+            email='manager2@example.com', password='pass', first_name='Om', last_name='Other',
+            role='BranchManager'
+        )
+        self.other_manager = Employee.objects.create(
+            user=self.other_manager_user, branch=self.other_branch, employee_id='E2', contact_number='1',
+            address='a'
+        )
+        self.student_user = User.objects.create_user(
+            email='student@example.com', password='pass', first_name='Sita', last_name='Student',
+            role='Student'
+        )
+        self.student = Student.objects.create(
+            user=self.student_user, branch=self.branch, student_id='S1', contact_number='1', address='a'
+        )
+        for i in range(3):
+            Lead.objects.create(
+                name=f'Lead {i}', email='lead@example.com', phone='1', nationality='NP', branch=self.branch,
+                notes='Called twice', created_by=self.admin
+            )
+        self.job = Job.objects.create(
+            title='Barista', description='Make coffee', requirements='None', branch=self.branch,
+            created_by=self.manager_user
+        )
+        self.blog = Blog.objects.create(
+            title='Study in Japan', content='Long content', branch=self.branch, author=self.admin,
+            is_published=True
+        )
+        self.admin_client = client_for(self.admin)
+        self.manager_client = client_for(self.manager_user)
+        self.other_manager_client = client_for(self.other_manager_user)
+        self.student_client = client_for(self.student_user)
+        self.anonymous_client = client_for()
+
+
+class ApiTestCase(ApiFixtures, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+
+
+class MediaTestCase(ApiTestCase):
+    """Stores uploads in a temporary MEDIA_ROOT and CHUNKED_UPLOAD_DIR"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(
+            MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'upload_tmp')
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        super().setUp()
+
+
+class SparseFieldsetTests(ApiTestCase):
+    def test_heavy_columns_are_left_out_of_lists(self):
+        lead = results(self.admin_client.get('/api/leads/'))[0]
+        self.assertNotIn('notes', lead)
+        self.assertIn('name', lead)
+        lead = self.admin_client.get(f"/api/leads/{lead['id']}/").json()
+        self.assertEqual(lead['notes'], 'Called twice')
+
+    def test_include_and_fields_ask_for_heavy_columns(self):
+        lead = results(self.admin_client.get('/api/leads/?include=notes'))[0]
+        self.assertEqual(lead['notes'], 'Called twice')
+        lead = results(self.admin_client.get('/api/leads/?fields=id,notes'))[0]
+        self.assertEqual(set(lead), {'id', 'notes'})
+
+    def test_fields_and_exclude(self):
+        leads = results(self.admin_client.get('/api/leads/?fields=id,name'))
+        self.assertEqual(set(leads[0]), {'id', 'name'})
+        leads = results(self.admin_client.get('/api/leads/?exclude=notes'))
+        self.assertNotIn('notes', leads[0])
+        self.assertIn('name', leads[0])
+
+
+class ConditionalGetTests(ApiTestCase):
+    def test_list_etag_changes_after_an_edit(self):
+        response = self.admin_client.get('/api/leads/')
+        etag = response['ETag']
+        self.assertEqual(self.admin_client.get('/api/leads/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        lead = Lead.objects.first()
+        lead.notes = 'Visited the office'
+        lead.save()
+        response = self.admin_client.get('/api/leads/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_after_a_delete(self):
+        etag = self.admin_client.get('/api/leads/')['ETag']
+        Lead.objects.first().delete()
+        self.assertEqual(self.admin_client.get('/api/leads/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detail_last_modified(self):
+        response = self.admin_client.get(f'/api/jobs/{self.job.pk}/')
+        self.assertEqual(self.admin_client.get(
+            f'/api/jobs/{self.job.pk}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code, 304)
+
+    def test_attendance_bulk_update_changes_etag(self):
+        record = EmployeeAttendance.objects.create(employee=self.manager, date=date(2026, 1, 5), status='Present')
+        etag = self.admin_client.get('/api/employee-attendance/')['ETag']
+        time.sleep(0.01)
+        response = self.admin_client.post('/api/employee-attendance/bulk_update/', [
+            {'employee': self.manager.pk, 'date': '2026-01-05', 'status': 'Absent'}
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(EmployeeAttendance.objects.get(pk=record.pk).status, 'Absent')
+        self.assertEqual(
+            self.admin_client.get('/api/employee-attendance/', HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+    def test_etag_is_per_user(self):
+        etag = self.admin_client.get('/api/leads/')['ETag']
+        self.assertEqual(self.manager_client.get('/api/leads/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CompressionTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(30):
+            Lead.objects.create(name=f'Bulk {i}', email='b@example.com', phone='1', nationality='NP',
+                                branch=self.branch, notes='n' * 200, created_by=self.admin)
+
+    def test_large_responses_are_gzipped(self):
+        response = self.admin_client.get('/api/leads/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), results(self.admin_client.get('/api/leads/')))
+
+    def test_gzip_output_is_padded(self):
+        bodies = {self.admin_client.get('/api/leads/', HTTP_ACCEPT_ENCODING='gzip').content for i in range(5)}
+        self.assertGreater(len(bodies), 1)
+
+    def test_refused_codings_are_not_used(self):
+        for header in ('gzip;q=0', 'br;q=0, gzip;q=0', 'identity, *;q=0'):
+            response = self.admin_client.get('/api/leads/', HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(response.has_header('Content-Encoding'), header)
+        response = self.admin_client.get('/api/leads/', HTTP_ACCEPT_ENCODING='identity;q=0.5, *')
+        self.assertIn(response['Content-Encoding'], ('br', 'gzip'))
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.admin_client.get(f'/api/branches/{self.branch.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class AutoRelatedTests(ApiTestCase):
+    def test_list_queries_do_not_grow_with_rows(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.admin_client.get('/api/students/').status_code, 200)
+            return len(queries)
+
+        before = count_queries()
+        for i in range(5):
+            user = User.objects.create_user(email=f's{i}@example.com', password='pass', first_name='S',
+                                            last_name=str(i), role='Student')
+            Student.objects.create(user=user, branch=self.branch, student_id=f'SX{i}', contact_number='1',
+                                   address='a')
+        self.assertEqual(count_queries(), before)
+
+
+class AttendanceValuesListTests(ApiTestCase):
+    def test_values_rows_match_the_serializer(self):
+        record = StudentAttendance.objects.create(student=self.student, date=date(2026, 1, 5), status='Late')
+        row = results(self.admin_client.get('/api/student-attendance/'))[0]
+        self.assertEqual(row['id'], record.pk)
+        self.assertEqual(row['status'], 'Late')
+        self.assertEqual(row['date'], '2026-01-05')
+
+
+def jpeg(size, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return ContentFile(buffer.getvalue())
+
+
+class ImageVariantTests(MediaTestCase):
+    def upload_large_image(self):
+        self.student.profile_image.save('photo.jpg', jpeg((3000, 1500)))
+
+    def process_with_upload_meanwhile(self):
+        """Process the stored image while a newer one is uploaded, returns the newer name"""
+        newer = []
+
+        def upload_meanwhile(image):
+            student = Student.objects.get(pk=self.student.pk)
+            student.profile_image.save('newer.jpg', jpeg((300, 300), (30, 30, 200)))
+            newer.append(student.profile_image.name)
+            return image
+
+        with mock.patch('api.images.ImageOps.exif_transpose', side_effect=upload_meanwhile):
+            self.assertFalse(process_image('api', 'Student', self.student.pk, 'profile_image'))
+        self.assertEqual(Student.objects.get(pk=self.student.pk).profile_image.name, newer[0])
+
+    def test_upload_queues_a_task(self):
+        self.upload_large_image()
+        self.assertTrue(QueuedTask.objects.filter(task='images.variants').exists())
+
+    def test_task_caps_the_original_and_bumps_updated_at(self):
+        self.upload_large_image()
+        before = Student.objects.get(pk=self.student.pk).updated_at
+        old_name = self.student.profile_image.name
+        time.sleep(0.01)
+        for task in claim_tasks('test', 10):
+            run_task(task.pk, 'test')
+
+        student = Student.objects.get(pk=self.student.pk)
+        self.assertNotEqual(student.profile_image.name, old_name)
+        self.assertEqual(Image.open(student.profile_image.path).size, (2048, 1024))
+        self.assertGreater(student.updated_at, before)
+        variants = self.student_client.get(f'/api/students/{self.student.pk}/').json()['profile_image_variants']
+        self.assertIn('thumb', variants)
+
+    def test_newer_upload_is_not_replaced_by_the_capped_original(self):
+        self.upload_large_image()
+        self.process_with_upload_meanwhile()
+
+    def test_variants_of_a_replaced_image_are_removed(self):
+        self.student.profile_image.save('photo.jpg', jpeg((400, 300)))
+        old_name = self.student.profile_image.name
+        self.process_with_upload_meanwhile()
+        storage = self.student.profile_image.storage
+        self.assertFalse(storage.exists(variant_name(old_name, 'thumb', 'webp')))
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def upload(self, client):
+        upload_id = client.post('/api/uploads/', {'filename': 'cv.pdf', 'total_size': len(PDF)},
+                                format='json').json()['id']
+        half = len(PDF) // 2
+        for start, end in ((0, half), (half, len(PDF))):
+            response = client.put(f'/api/uploads/{upload_id}/', data=PDF[start:end],
+                                  content_type='application/octet-stream',
+                                  HTTP_CONTENT_RANGE=f'bytes {start}-{end - 1}/{len(PDF)}')
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.post(f'/api/uploads/{upload_id}/finalize/').json()['status'], 'Complete')
+        return upload_id
+
+    def test_out_of_order_chunk_is_rejected(self):
+        upload_id = self.student_client.post('/api/uploads/', {'filename': 'cv.pdf', 'total_size': len(PDF)},
+                                             format='json').json()['id']
+        response = self.student_client.put(f'/api/uploads/{upload_id}/', data=PDF[100:200],
+                                           content_type='application/octet-stream',
+                                           HTTP_CONTENT_RANGE=f'bytes 100-199/{len(PDF)}')
+        self.assertEqual(response.status_code, 409)
+
+    def test_failed_application_keeps_the_upload(self):
+        upload_id = self.upload(self.student_client)
+        response = self.student_client.post('/api/job-responses/', {
+            'job': self.job.pk, 'name': 'Sita', 'email': 'not an email', 'phone': '1',
+            'resume_upload_id': upload_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'Complete')
+
+        response = self.student_client.post('/api/job-responses/', {
+            'job': self.job.pk, 'name': 'Sita', 'email': 'sita@example.com', 'phone': '1',
+            'resume_upload_id': upload_id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'Used')
+        with JobResponse.objects.get().resume.open('rb') as resume:
+            self.assertEqual(resume.read(), PDF)
+
+
+    def test_an_upload_is_attached_once(self):
+        upload_id = self.upload(self.student_client)
+        with transaction.atomic():
+            self.assertEqual(get_completed_upload(self.student_user, upload_id, 'resume_upload_id').status,
+                             'Attached')
+            # A concurrent request no longer finds a complete upload
+            with self.assertRaises(ValidationError):
+                get_completed_upload(self.student_user, upload_id, 'resume_upload_id')
+
+    def test_staging_file_is_removed_after_commit(self):
+        upload_id = self.upload(self.student_client)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.student_client.post('/api/job-responses/', {
+                'job': self.job.pk, 'name': 'Sita', 'email': 'sita@example.com', 'phone': '1',
+                'resume_upload_id': upload_id,
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(os.path.exists(UploadSession.objects.get(pk=upload_id).part_path))
+
+    def test_stale_uploads_are_cleaned_on_schedule(self):
+        self.assertIn('uploads.clean', [entry['task'] for entry in settings.TASK_SCHEDULES.values()])
+        upload_id = self.upload(self.student_client)
+        UploadSession.objects.filter(pk=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        enqueue('uploads.clean')
+        for task in claim_tasks('test', 10):
+            run_task(task.pk, 'test')
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def test_identical_uploads_are_stored_once(self):
+        self.student.resume.save('one.pdf', ContentFile(PDF))
+        self.manager.citizenship_document.save('two.pdf', ContentFile(PDF))
+        self.assertEqual(self.student.resume.name, self.manager.citizenship_document.name)
+
+
+class ProtectedMediaTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.student.resume.save('cv.pdf', ContentFile(PDF))
+        url = self.student_client.get(f'/api/students/{self.student.pk}/').json()['resume']
+        self.path = url.replace('http://testserver', '')
+
+    def test_url_ends_with_a_readable_name(self):
+        self.assertTrue(self.path.endswith(f'/student-{self.student.pk}-resume.pdf'))
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.anonymous_client.get(self.path).status_code, 401)
+
+    def test_signed_link(self):
+        response = self.student_client.post(self.path)
+        self.assertEqual(response.status_code, 200)
+        link = response.json()['url'].replace('http://testserver', '')
+        response = self.anonymous_client.get(link)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), PDF)
+        self.assertEqual(response['Referrer-Policy'], 'no-referrer')
+        # A link cannot mint another one
+        self.assertEqual(self.anonymous_client.post(link).status_code, 401)
+
+    def test_signed_link_is_short_lived_and_bound_to_the_document(self):
+        link = self.student_client.post(self.path).json()['url'].replace('http://testserver', '')
+        token = link.split('?token=')[1]
+        other = f'/api/media/students/{self.student.pk}/citizenship_document/?token={token}'
+        self.assertEqual(self.anonymous_client.get(other).status_code, 401)
+        with mock.patch('api.protected_media.PROTECTED_MEDIA_TOKEN_MAX_AGE', 0):
+            time.sleep(1)
+            self.assertEqual(self.anonymous_client.get(link).status_code, 401)
+
+    def test_access_token_is_not_accepted_in_the_url(self):
+        token = AccessToken.for_user(self.student_user)
+        self.assertEqual(self.anonymous_client.get(f'{self.path}?token={token}').status_code, 401)
+        self.assertEqual(self.anonymous_client.get(f'{self.path}?token=invalid').status_code, 401)
+
+    def test_link_for_a_refused_document_is_refused(self):
+        self.assertEqual(self.other_manager_client.post(self.path).status_code, 403)
+
+    def test_branch_and_owner_checks(self):
+        self.assertEqual(self.manager_client.get(self.path).status_code, 200)
+        self.assertEqual(self.other_manager_client.get(self.path).status_code, 403)
+        other = User.objects.create_user(email='other@example.com', password='pass', role='Student')
+        self.assertEqual(client_for(other).get(self.path).status_code, 403)
+
+    def test_range_request(self):
+        response = self.student_client.get(self.path, HTTP_RANGE='bytes=0-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-')
+
+
+class JobApplicationResumeTests(MediaTestCase):
+    def test_applicant_can_download_their_resume(self):
+        response = self.student_client.post('/api/job-responses/', {
+            'job': self.job.pk, 'name': 'Sita', 'email': 'sita@example.com', 'phone': '1',
+            'resume': ContentFile(PDF, name='cv.pdf'),
+        }, format='multipart')
+        path = f"/api/media/job-responses/{response.json()['id']}/resume/"
+        self.assertEqual(self.student_client.get(path).status_code, 200)
+        other = User.objects.create_user(email='other@example.com', password='pass', role='Student')
+        self.assertEqual(client_for(other).get(path).status_code, 403)
+
+
+class AnonymousCacheTests(ApiTestCase):
+    def test_anonymous_list_is_public_and_invalidated_on_save(self):
+        response = self.anonymous_client.get('/api/blogs/')
+        self.assertIn('public', response['Cache-Control'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.blog.title = 'Study in Korea'
+            self.blog.save()
+        self.assertIn('Study in Korea', self.anonymous_client.get('/api/blogs/').content.decode())
+
+    def test_blog_list_sends_excerpts_not_content(self):
+        blog = self.anonymous_client.get('/api/blogs/').json()[0]
+        self.assertNotIn('content', blog)
+        self.assertEqual((blog['excerpt'], blog['reading_time']), ('Long content', 1))
+        blog = self.anonymous_client.get(f'/api/blogs/{self.blog.pk}/').json()
+        self.assertEqual(blog['content'], 'Long content')
+
+    def test_signed_in_responses_are_private(self):
+        self.assertIn('private', self.admin_client.get('/api/jobs/')['Cache-Control'])
+
+
+class JobApplicationTests(ApiTestCase):
+    def test_application_is_linked_to_the_student(self):
+        response = self.student_client.post('/api/job-responses/', {
+            'job': self.job.pk, 'name': 'Sita', 'email': 'sita@example.com', 'phone': '1',
+            'resume': ContentFile(PDF, name='cv.pdf'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(JobResponse.objects.get().student, self.student)
+        self.assertEqual(len(self.student_client.get('/api/my-job-applications/').json()), 1)
+
+
+class PasswordResetTests(ApiTestCase):
+    def test_resets_everyone_but_superadmins(self):
+        call_command('reset_passwords', '--password', 'Welcome123', '--workers', '2', stdout=io.StringIO())
+        self.student_user.refresh_from_db()
+        self.admin.refresh_from_db()
+        self.assertTrue(self.student_user.check_password('Welcome123'))
+        self.assertTrue(self.admin.check_password('pass'))
+
+
+class CompactAttendanceTests(ApiTestCase):
+    def working_days(self, count):
+        today = local_today()
+        calendars = BranchCalendars([self.branch.pk], today - timedelta(days=30), today)
+        days = [today - timedelta(days=offset) for offset in range(1, 30)]
+        return [day for day in days if calendars.is_working_day(self.branch.pk, day)][:count]
+
+    @mock.patch('api.attendance.ATTENDANCE_STORAGE_MODE', 'exceptions')
+    def test_only_rows_equal_to_the_default_are_compacted(self):
+        Employee.objects.filter(pk=self.manager.pk).update(joining_date=local_today() - timedelta(days=60))
+
+        default_day, untimed_day, late_day = self.working_days(3)
+        nine, five = datetime.strptime('09:00', '%H:%M').time(), datetime.strptime('17:00', '%H:%M').time()
+        default = EmployeeAttendance.objects.create(employee=self.manager, date=default_day, status='Present',
+                                                    time_in=nine, time_out=five)
+        untimed = EmployeeAttendance.objects.create(employee=self.manager, date=untimed_day, status='Present')
+        late = EmployeeAttendance.objects.create(employee=self.manager, date=late_day, status='Late', time_in=nine)
+        call_command('compact_attendance', stdout=io.StringIO())
+
+        remaining = set(EmployeeAttendance.objects.values_list('pk', flat=True))
+        self.assertEqual(remaining, {untimed.pk, late.pk})
+        self.assertNotIn(default.pk, DeletionLog.objects.values_list('object_id', flat=True))
+
+    @mock.patch('api.attendance.ATTENDANCE_STORAGE_MODE', 'exceptions')
+    def test_rows_are_compacted_in_batches(self):
+        Employee.objects.filter(pk=self.manager.pk).update(joining_date=local_today() - timedelta(days=60))
+
+        *days, absent_day = self.working_days(6)
+        nine, five = datetime.strptime('09:00', '%H:%M').time(), datetime.strptime('17:00', '%H:%M').time()
+        for day in days:
+            EmployeeAttendance.objects.create(employee=self.manager, date=day, status='Present',
+                                              time_in=nine, time_out=five)
+        kept = EmployeeAttendance.objects.create(employee=self.manager, date=absent_day, status='Absent')
+        out = io.StringIO()
+        call_command('compact_attendance', batch_size=2, stdout=out)
+
+        self.assertIn(f'Deleted {len(days)} default employee', out.getvalue())
+        self.assertEqual(list(EmployeeAttendance.objects.values_list('pk', flat=True)), [kept.pk])
+
+
+class AttendanceArchiveTests(TestCase):
+    def test_statuses_round_trip(self):
+        codes = [1, 2, 3, 4, 5, 0] * 5 + [1]
+        packed = pack_statuses(codes)
+        self.assertEqual(len(packed), 12)
+        self.assertEqual(unpack_statuses(packed, 31), codes)
+
+
+class TaskQueueTests(ApiTestCase):
+    def test_worker_runs_due_tasks(self):
+        enqueue('logs.clean')
+        enqueue('logs.clean', run_after=timezone.now() + timedelta(hours=1))
+        for task in claim_tasks('test', 10):
+            run_task(task.pk, 'test')
+        self.assertEqual(
+            sorted(QueuedTask.objects.values_list('status', flat=True)), ['Pending', 'Succeeded']
+        )
+
+
+class SchedulingLockTests(ApiTestCase):
+    def test_run_key_deduplicates(self):
+        self.assertIsNotNone(enqueue('logs.clean', run_key='clean:1'))
+        self.assertIsNone(enqueue('logs.clean', run_key='clean:1'))
+
+    def test_lock_is_held_once(self):
+        with try_lock('test-lock') as first:
+            with try_lock('test-lock') as second:
+                self.assertEqual((first, second), (True, False))
+        with try_lock('test-lock') as again:
+            self.assertTrue(again)
+
+
+class AttendancePushTests(ApiTestCase):
+    def test_counts_only_inserted_rows(self):
+        day = date(2026, 10, 19)
+        EmployeeAttendance.objects.create(employee=self.manager, date=day, status='Late')
+        self.assertEqual(push_branch_attendance(self.branch.pk, day.isoformat()), (0, 1))
+        self.assertEqual(push_branch_attendance(self.branch.pk, day.isoformat()), (0, 0))
+        self.assertEqual(EmployeeAttendance.objects.get(employee=self.manager, date=day).status, 'Late')
+
+
+class CheckInTests(ApiTestCase):
+    def test_earliest_check_in_and_latest_check_out_are_kept(self):
+        first = self.student_client.post('/api/attendance/check-in/').json()
+        again = self.student_client.post('/api/attendance/check-in/').json()
+        self.assertEqual(first['time_in'], again['time_in'])
+        out = self.student_client.post('/api/attendance/check-out/').json()
+        self.assertIsNotNone(out['time_out'])
+        self.assertEqual(StudentAttendance.objects.count(), 1)
+
+    def test_requires_a_profile(self):
+        self.assertEqual(self.admin_client.post('/api/attendance/check-in/').status_code, 404)
+        self.assertEqual(self.anonymous_client.post('/api/attendance/check-in/').status_code, 401)
+
+
+class KioskSyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        receptionist = User.objects.create_user(email='desk@example.com', password='pass', first_name='R',
+                                                last_name='Desk', role='Receptionist')
+        Employee.objects.create(user=receptionist, branch=self.branch, employee_id='E3', contact_number='1',
+                                address='a')
+        self.kiosk_client = client_for(receptionist)
+        self.day = local_today()
+        self.seq = 0
+
+    def sync(self, *events):
+        batch = []
+        for event in events:
+            self.seq += 1
+            batch.append({'seq': self.seq, 'type': 'student', 'person': self.student.pk,
+                          'date': self.day.isoformat(), **event})
+        response = self.kiosk_client.post('/api/kiosk/sync/', {'kiosk': 'front-desk', 'events': batch},
+                                          format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def record(self):
+        return StudentAttendance.objects.get(student=self.student, date=self.day)
+
+    def test_latest_write_wins_per_field(self):
+        now = timezone.now()
+        self.sync({'at': (now - timedelta(minutes=5)).isoformat(), 'fields': {'status': 'Late'}},
+                  {'at': (now - timedelta(minutes=10)).isoformat(), 'fields': {'status': 'Absent'}})
+        self.assertEqual(self.record().status, 'Late')
+
+    def test_admin_edit_beats_older_events_but_not_newer_ones(self):
+        self.sync({'at': timezone.now().isoformat(), 'fields': {'status': 'Late'}})
+        record = self.record()
+        time.sleep(0.01)
+        record.status = 'Absent'
+        record.save()
+
+        self.sync({'at': (timezone.now() - timedelta(minutes=1)).isoformat(), 'fields': {'status': 'Present'}})
+        self.assertEqual(self.record().status, 'Absent')
+        self.sync({'at': (timezone.now() + timedelta(seconds=1)).isoformat(), 'fields': {'status': 'Half Day'}})
+        self.assertEqual(self.record().status, 'Half Day')
+
+    def test_offline_events_beat_the_nightly_push(self):
+        recorded_at = timezone.now() - timedelta(hours=2)
+        push_branch_attendance(self.branch.pk, self.day.isoformat())
+        self.sync({'at': recorded_at.isoformat(), 'fields': {'status': 'Late', 'remarks': 'Bus strike'}})
+        record = self.record()
+        self.assertEqual((record.status, record.remarks), ('Late', 'Bus strike'))
+
+    def test_resent_batch_is_applied_once(self):
+        at = timezone.now().isoformat()
+        self.sync({'at': at, 'fields': {'status': 'Late'}})
+        self.seq -= 1
+        self.assertEqual(self.sync({'at': at, 'fields': {'status': 'Absent'}})['skipped'], 1)
+        self.assertEqual(self.record().status, 'Late')
+
+    def test_delta_roster_lists_people_who_left(self):
+        user = User.objects.create_user(email='moved@example.com', password='pass', role='Student')
+        moved = Student.objects.create(user=user, branch=self.branch, student_id='S2', contact_number='1',
+                                       address='a')
+        token = self.sync()['token']
+        moved.branch = self.other_branch
+        moved.save()
+
+        response = self.kiosk_client.post('/api/kiosk/sync/', {'kiosk': 'front-desk', 'token': token},
+                                          format='json')
+        roster = response.json()['roster']
+        self.assertEqual(roster['removed'], {'employees': [], 'students': [moved.pk]})
+        self.assertNotIn(moved.pk, [row[0] for row in roster['students']])
+
+    def test_renamed_person_is_in_the_delta(self):
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        User.objects.update(updated_at=an_hour_ago)
+        Student.objects.update(updated_at=an_hour_ago)
+        token = self.sync()['token']
+        self.student_user.last_name = 'Renamed'
+        self.student_user.save()
+        response = self.kiosk_client.post('/api/kiosk/sync/', {'kiosk': 'front-desk', 'token': token},
+                                          format='json')
+        self.assertEqual([row[0] for row in response.json()['roster']['students']], [self.student.pk])
+
+
+class ChangeFeedTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = make_token(timezone.now())
+        time.sleep(0.01)
+
+    def feed(self, client, resource):
+        response = client.get(f'/api/{resource}/?updated_since={self.token}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changed_and_deleted_rows(self):
+        lead = Lead.objects.first()
+        lead.notes = 'Changed'
+        lead.save()
+        deleted = Lead.objects.last()
+        deleted_id = deleted.pk
+        deleted.delete()
+        data = self.feed(self.admin_client, 'leads')
+        self.assertEqual([row['id'] for row in data['results']], [lead.pk])
+        self.assertEqual(data['deleted'], [deleted_id])
+
+    def test_deleted_ids_are_scoped_to_the_requester(self):
+        other_lead = Lead.objects.create(name='Other', email='o@example.com', phone='1', nationality='NP',
+                                         branch=self.other_branch, created_by=self.admin)
+        other_lead_id = other_lead.pk
+        other_lead.delete()
+        self.assertEqual(self.feed(self.manager_client, 'leads')['deleted'], [])
+        self.assertEqual(self.feed(self.other_manager_client, 'leads')['deleted'], [other_lead_id])
+        self.assertEqual(self.feed(self.admin_client, 'leads')['deleted'], [other_lead_id])
+
+    def test_rows_leaving_a_branch_are_reported_to_it(self):
+        record = StudentAttendance.objects.create(student=self.student, date=date(2026, 1, 5), status='Present')
+        self.student.branch = self.other_branch
+        self.student.save()
+
+        old = self.feed(self.manager_client, 'students')
+        self.assertEqual(old['deleted'], [self.student.pk])
+        self.assertEqual(self.feed(self.manager_client, 'student-attendance')['deleted'], [record.pk])
+        self.assertEqual(self.feed(self.manager_client, 'users')['deleted'], [self.student_user.pk])
+        new = self.feed(self.other_manager_client, 'students')
+        self.assertEqual(([row['id'] for row in new['results']], new['deleted']), ([self.student.pk], []))
+        # Still visible to SuperAdmin, so not reported as deleted
+        self.assertEqual(self.feed(self.admin_client, 'students')['deleted'], [])
+
+    def test_deactivated_job_is_reported(self):
+        self.job.is_active = False
+        self.job.save()
+        self.assertEqual(self.feed(self.student_client, 'jobs')['deleted'], [self.job.pk])
+        self.assertEqual(self.feed(self.admin_client, 'jobs')['deleted'], [])
+
+    def test_user_rename_through_employee_edit_is_fed(self):
+        from .serializers import EmployeeSerializer
+        EmployeeSerializer().update(self.manager, {'user': {'first_name': 'Renamed'}})
+        ids = [row['id'] for row in self.feed(self.admin_client, 'users')['results']]
+        self.assertIn(self.manager_user.pk, ids)
+
+    def test_invalid_and_expired_tokens(self):
+        self.assertEqual(self.admin_client.get('/api/leads/?updated_since=abc').status_code, 400)
+        self.assertEqual(self.admin_client.get('/api/leads/?updated_since=1000').status_code, 410)
+
+    def test_feed_is_paged(self):
+        ids, token, pages = [], '', 0
+        with mock.patch('api.views.LeadViewSet.change_page_size', 2):
+            while True:
+                data = self.admin_client.get(f'/api/leads/?updated_since={token}').json()
+                ids += [row['id'] for row in data['results']]
+                token, pages = data['token'], pages + 1
+                if not data['more']:
+                    break
+        self.assertEqual(pages, 2)
+        self.assertEqual(sorted(ids), sorted(Lead.objects.values_list('pk', flat=True)))
+        self.assertEqual(self.feed(self.admin_client, 'leads')['more'], False)
+
+    def test_row_committed_after_its_save_time_is_sent(self):
+        token = self.admin_client.get('/api/leads/?updated_since=').json()['token']
+        # Saved a minute ago by a transaction that only just committed
+        lead = Lead.objects.first()
+        Lead.objects.filter(pk=lead.pk).update(notes='Late', updated_at=timezone.now() - timedelta(minutes=1))
+        data = self.admin_client.get(f'/api/leads/?updated_since={token}').json()
+        self.assertIn(lead.pk, [row['id'] for row in data['results']])
+
+
+class ActivityStreamTests(ApiTestCase):
+    def bearer_client(self, user):
+        # The stream is a plain async view, force_authenticate() does not reach it
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        return client
+
+    def test_stream_requires_an_admin_token(self):
+        self.assertEqual(self.anonymous_client.get('/api/activity-logs/stream/').status_code, 401)
+        self.assertEqual(self.bearer_client(self.student_user).post('/api/activity-logs/stream/').status_code, 403)
+
+    def test_stream_opens_through_a_signed_link(self):
+        link = self.bearer_client(self.admin).post('/api/activity-logs/stream/').json()['url']
+        response = self.anonymous_client.get(link)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        # A link cannot be traded for another one
+        self.assertEqual(self.anonymous_client.post(link).status_code, 401)
+        with mock.patch('api.activity_stream.ACTIVITY_STREAM_TOKEN_MAX_AGE', -1):
+            self.assertEqual(self.anonymous_client.get(link).status_code, 401)
+
+    def test_access_token_is_refused_in_the_url(self):
+        token = AccessToken.for_user(self.admin)
+        self.assertEqual(
+            self.anonymous_client.get(f'/api/activity-logs/stream/?token={token}').status_code, 401
+        )
+
+    def test_entries_are_not_serialized_without_streams(self):
+        with mock.patch('api.activity_stream.serialize_entry') as serialize:
+            ActivityLog.objects.create(user=self.admin, action_type='OTHER', action_model='Test',
+                                       action_details='Nobody listening')
+        serialize.assert_not_called()
+
+
+class ThreadedApiTestCase(ApiFixtures, TransactionTestCase):
+    """The batch and bootstrap endpoints read on pool threads, which need committed rows"""
+
+    def setUp(self):
+        cache.clear()
+        self.create_fixtures()
+
+
+class BootstrapTests(ThreadedApiTestCase):
+    def test_sections_per_role(self):
+        data = self.manager_client.get('/api/bootstrap/').json()
+        self.assertEqual(data['errors'], {})
+        self.assertEqual(data['branch']['name'], 'Kathmandu')
+        self.assertEqual(data['lists']['leads']['count'], 3)
+        self.assertEqual(self.anonymous_client.get('/api/bootstrap/').status_code, 401)
+
+    def test_cached_section_is_missed_after_a_change(self):
+        self.manager_client.get('/api/bootstrap/?sections=leads')
+        Lead.objects.create(name='New', email='n@example.com', phone='1', nationality='NP', branch=self.branch,
+                            created_by=self.admin)
+        data = self.manager_client.get('/api/bootstrap/?sections=leads').json()
+        self.assertEqual(data['lists']['leads']['count'], 4)
+
+    def test_sections_are_missed_after_a_change_to_what_they_show(self):
+        self.student_client.get('/api/bootstrap/?sections=jobs,blogs')
+        self.blog.title = 'Study in Korea'
+        self.blog.save()
+        self.manager_user.first_name = 'Renamed'
+        self.manager_user.save()
+        lists = self.student_client.get('/api/bootstrap/?sections=jobs,blogs').json()['lists']
+        self.assertEqual(lists['blogs']['results'][0]['title'], 'Study in Korea')
+        self.assertTrue(lists['jobs']['results'][0]['created_by_name'].startswith('Renamed'))
+
+
+class BatchTests(ThreadedApiTestCase):
+    def batch(self, client, paths):
+        return client.post('/api/batch/', {'requests': paths}, format='json')
+
+    def test_each_read_is_authorized_as_the_batch_user(self):
+        paths = ['student-attendance/', 'leads/', 'jobs/', f'students/{self.student.pk}/']
+        responses = self.batch(self.student_client, paths).json()['responses']
+        self.assertEqual(responses['student-attendance/']['status'], 403)
+        self.assertEqual((responses['leads/']['status'], responses['leads/']['body']), (200, []))
+        self.assertEqual(responses['jobs/']['status'], 200)
+        self.assertEqual(responses[f'students/{self.student.pk}/']['status'], 200)
+
+    def test_reads_are_scoped_like_direct_requests(self):
+        Lead.objects.create(name='Other', email='o@example.com', phone='1', nationality='NP',
+                            branch=self.other_branch, created_by=self.admin)
+        body = self.batch(self.manager_client, ['leads/']).json()['responses']['leads/']['body']
+        self.assertEqual(body, self.manager_client.get('/api/leads/').json())
+
+    def test_rejected_batches(self):
+        self.assertEqual(self.batch(self.anonymous_client, ['jobs/']).status_code, 401)
+        self.assertEqual(self.batch(self.admin_client, ['http://example.com/api/jobs/']).status_code, 400)
+        self.assertEqual(self.batch(self.admin_client, [f'jobs/?page={i}' for i in range(21)]).status_code, 400)
+        responses = self.batch(self.admin_client, ['batch/', 'missing/']).json()['responses']
+        self.assertEqual((responses['batch/']['status'], responses['missing/']['status']), (400, 404))
+
+    @override_settings(MIDDLEWARE=settings.MIDDLEWARE + [
+        'api.middleware.RoleBasedAccessMiddleware', 'api.middleware.BranchAccessMiddleware',
+    ])
+    def test_reads_pass_the_access_middleware(self):
+        # The middleware sees the session user, the views the access token
+        client = APIClient()
+        client.force_login(self.manager_user)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.manager_user)}')
+        paths = [f'students/{self.branch.pk}/', f'students/{self.other_branch.pk}/']
+        responses = self.batch(client, paths).json()['responses']
+        statuses = {path: client.get(f'/api/{path}').status_code for path in paths}
+        self.assertEqual(statuses[paths[1]], 403)
+        self.assertEqual({path: response['status'] for path, response in responses.items()}, statuses)
+
+
+class AttendanceAnalyticsTests(ApiTestCase):
+    def test_rates_and_streaks(self):
+        today = local_today()
+        start = today - timedelta(days=13)
+        Student.objects.filter(pk=self.student.pk).update(enrollment_date=today - timedelta(days=60))
+        calendars = BranchCalendars([self.branch.pk], start, today)
+        days = [start + timedelta(days=offset) for offset in range(14)]
+        working = [day for day in days if calendars.is_working_day(self.branch.pk, day)]
+        absent = working[-3:-1]
+        StudentAttendance.objects.bulk_create([
+            StudentAttendance(student=self.student, date=day, status='Absent' if day in absent else 'Present')
+            for day in working
+        ])
+
+        response = self.manager_client.get('/api/attendance/analytics/', {
+            'start_date': start.isoformat(), 'end_date': today.isoformat(),
+        })
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(data['summary']['status_counts']['Absent'], 2)
+        self.assertEqual(data['summary']['longest_absence_streak'], 2)
+        columns = data['people']['columns']
+        row = data['people']['rows'][0]
+        self.assertEqual(row[columns.index('attendance_rate')],
+                         round(100 * (len(working) - 2) / len(working), 1))
+
+    def test_requires_manager_or_admin(self):
+        self.assertEqual(self.student_client.get('/api/attendance/analytics/').status_code, 403)
+        self.assertEqual(self.admin_client.get('/api/attendance/analytics/').status_code, 400)
@@ -0,0 +1,220 @@
+"""
+Chunked, resumable document uploads.
+
+A client opens an UploadSession with the file name and size, PUTs the bytes
+in chunks (each with a Content-Range header) and finalizes the session. The
+chunks are streamed from the request in CHUNK_READ_SIZE pieces and appended
+to a staging file under CHUNKED_UPLOAD_DIR, so memory use does not grow with
+the document. If a connection drops, GET on the session returns how many
+bytes were received and the client resumes from there.
+
+A complete session is referenced from the create endpoints by id; the staged
+file is then copied into the model's storage once and removed. The session
+row is locked and marked 'Attached' for the create transaction, so two
+requests cannot attach the same upload.
+
+Chunks are staged on the local file system, not in the model storage. With
+several app nodes CHUNKED_UPLOAD_DIR must be a volume shared by all of them
+(NFS, EFS or similar), since the chunks of one upload may reach different
+nodes. Abandoned sessions are removed by the 'uploads.clean' task (see
+TASK_SCHEDULES) or `manage.py clean_uploads`.
+"""
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import UploadSession
+
+CHUNKED_UPLOAD_MAX_SIZE = getattr(settings, 'CHUNKED_UPLOAD_MAX_SIZE', 50 * 1024 * 1024)
+CHUNKED_UPLOAD_MAX_CHUNK_SIZE = getattr(settings, 'CHUNKED_UPLOAD_MAX_CHUNK_SIZE', 8 * 1024 * 1024)
+
+# Bytes read from the request body at a time
+CHUNK_READ_SIZE = 64 * 1024
+
+PDF_HEADER = b'%PDF-'
+PDF_TRAILER = b'%%EOF'
+# The EOF marker may be followed by whitespace or a little junk
+PDF_TRAILER_WINDOW = 1024
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadError(Exception):
+    """A chunk or session that cannot be accepted, with the HTTP status to return"""
+
+    def __init__(self, detail, status_code=400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+def parse_content_range(header, total_size):
+    """Return (start, end) from a 'bytes start-end/total' header, end exclusive"""
+    match = CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        raise UploadError("Invalid Content-Range header.")
+    start, last, total = (int(value) for value in match.groups())
+    if total != total_size:
+        raise UploadError("Content-Range total does not match the upload size.")
+    if last < start or last >= total:
+        raise UploadError("Content-Range is out of bounds.")
+    return start, last + 1
+
+
+def append_chunk(session, stream, start, length):
+    """
+    Append `length` bytes from `stream` to the session's staging file.
+
+    The caller holds a row lock on the session. The first chunk must start
+    with the PDF header, so a wrong file type is rejected before the rest of
+    it is sent.
+    """
+    if start != session.received_size:
+        raise UploadError(
+            f"Expected a chunk starting at byte {session.received_size}.", status_code=409
+        )
+    if length > CHUNKED_UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError(f"Chunks may be at most {CHUNKED_UPLOAD_MAX_CHUNK_SIZE} bytes.", status_code=413)
+    if start + length > session.total_size:
+        raise UploadError("Chunk extends past the declared upload size.")
+
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    written = 0
+    with open(session.part_path, 'ab') as part:
+        # Drop anything left over from a chunk that failed half way
+        part.truncate(start)
+        while written < length:
+            piece = stream.read(min(CHUNK_READ_SIZE, length - written))
+            if not piece:
+                break
+            if start == 0 and written < len(PDF_HEADER):
+                header = piece[:len(PDF_HEADER) - written]
+                if header != PDF_HEADER[written:written + len(header)]:
+                    raise UploadError("Only PDF documents can be uploaded.", status_code=415)
+            part.write(piece)
+            written += len(piece)
+
+    if written != length:
+        raise UploadError("Chunk body is shorter than its Content-Range.")
+
+    session.received_size = start + written
+    session.save(update_fields=['received_size', 'updated_at'])
+    return session
+
+
+def finalize(session):
+    """Mark a fully received session as complete after checking the PDF trailer"""
+    if session.status == 'Complete':
+        return session
+    if session.status != 'Uploading':
+        raise UploadError("This upload has already been used.", status_code=409)
+    if session.received_size != session.total_size:
+        raise UploadError(
+            f"Upload is incomplete: {session.received_size} of {session.total_size} bytes received.",
+            status_code=409
+        )
+
+    with open(session.part_path, 'rb') as part:
+        part.seek(max(0, session.total_size - PDF_TRAILER_WINDOW))
+        if PDF_TRAILER not in part.read():
+            raise UploadError("The uploaded file is not a complete PDF document.", status_code=415)
+
+    session.status = 'Complete'
+    session.save(update_fields=['status', 'updated_at'])
+    return session
+
+
+def discard(session):
+    """Remove a session's staging file"""
+    try:
+        os.remove(session.part_path)
+    except FileNotFoundError:
+        pass
+
+
+def get_completed_upload(user, upload_id, field_name):
+    """
+    Lock a complete upload session owned by `user` and mark it as attached.
+
+    Must run inside the transaction that saves the record. Returns None when
+    no id was given. Raises a ValidationError keyed by `field_name` if the id
+    does not refer to a usable upload, including one attached by a
+    concurrent request.
+    """
+    if not upload_id:
+        return None
+    try:
+        session = UploadSession.objects.select_for_update().get(pk=upload_id, user=user, status='Complete')
+    except (UploadSession.DoesNotExist, DjangoValidationError):
+        raise serializers.ValidationError({field_name: ["Upload not found or not finalized."]})
+    session.status = 'Attached'
+    session.save(update_fields=['status', 'updated_at'])
+    return session
+
+
+def upload_file(session):
+    """Django File reading the staged upload, for assigning to a FileField"""
+    return File(open(session.part_path, 'rb'), name=session.filename)
+
+
+def mark_used(session, file):
+    """Close the staged file once it is stored on a record and drop the staging copy"""
+    file.close()
+    session.status = 'Used'
+    session.save(update_fields=['status', 'updated_at'])
+    # A rolled back record keeps the upload usable
+    transaction.on_commit(lambda: discard(session))
+
+
+def remove_stale_uploads(hours=24):
+    """Delete sessions, and their staging files, not touched for `hours`. Returns the count."""
+    cutoff = timezone.now() - timedelta(hours=hours)
+    sessions = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in sessions:
+        discard(session)
+    UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+    return len(sessions)
+
+
+def attach_uploads(user, source, data, fields):
+    """
+    Put the uploads referenced as `<field>_upload_id` in `source` into `data`.
+
+    Called inside the transaction that saves the record. Fields that already
+    hold a directly uploaded file are left alone. Returns the attached
+    (session, file) pairs for release_uploads().
+    """
+    attached = []
+    try:
+        for field in fields:
+            session = get_completed_upload(user, source.get(f'{field}_upload_id'), f'{field}_upload_id')
+            if session is not None and not data.get(field):
+                file = upload_file(session)
+                data[field] = file
+                attached.append((session, file))
+    except Exception:
+        release_uploads(attached, used=False)
+        raise
+    return attached
+
+
+def release_uploads(attached, used=True):
+    """
+    Close the files of attached uploads. Uploads are marked as used when the
+    record holding them was saved; otherwise they are complete again, so the
+    request can be corrected and sent again with the same upload ids.
+    """
+    for session, file in attached:
+        if used:
+            mark_used(session, file)
+        else:
+            file.close()
+            session.status = 'Complete'
+            session.save(update_fields=['status', 'updated_at'])
@@ -5,8 +5,10 @@ from .views import (
     LeadViewSet, JobViewSet, JobResponseViewSet, BlogViewSet,
     StudentProfileView, StudentJobResponseView, StudentJobResponseListView,
     StudentAttendanceViewSet, EmployeeAttendanceViewSet, ActivityLogViewSet,
+    AttendanceCheckView, KioskSyncView, BootstrapView, BatchView, AttendanceAnalyticsView,
+    UploadSessionView, UploadSessionDetailView, UploadSessionFinalizeView, ProtectedMediaView,
     admin_stats, branch_manager_stats, counsellor_stats, receptionist_stats, bank_manager_stats,
-    CustomTokenObtainPairView
+    CustomTokenObtainPairView, activity_log_stream
 )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -24,7 +26,13 @@ router.register(r'student-attendance', StudentAttendanceViewSet)
 router.register(r'activity-logs', ActivityLogViewSet)
 
 urlpatterns = [
+    # Before the router, which would take 'stream' for an activity log id
+    path('activity-logs/stream/', activity_log_stream, name='activity-log-stream'),
     path('', include(router.urls)),
+    # Everything a dashboard opens with, in one response
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    # Several reads in one request
+    path('batch/', BatchView.as_view(), name='batch'),
     # JWT Authentication
     path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -32,6 +40,21 @@ urlpatterns = [
     path('student-profile/', StudentProfileView.as_view(), name='student-profile'),
     path('job-responses/', StudentJobResponseView.as_view(), name='job-responses'),
     path('my-job-applications/', StudentJobResponseListView.as_view(), name='my-job-applications'),
+    # Self-service attendance
+    path('attendance/check-in/', AttendanceCheckView.as_view(event='in'), name='attendance-check-in'),
+    path('attendance/check-out/', AttendanceCheckView.as_view(event='out'), name='attendance-check-out'),
+    # Attendance rates, streaks, weekday patterns and lateness of a branch
+    path('attendance/analytics/', AttendanceAnalyticsView.as_view(), name='attendance-analytics'),
+    # Offline kiosk attendance sync
+    path('kiosk/sync/', KioskSyncView.as_view(), name='kiosk-sync'),
+    # Chunked, resumable document uploads
+    path('uploads/', UploadSessionView.as_view(), name='upload-create'),
+    path('uploads/<uuid:pk>/', UploadSessionDetailView.as_view(), name='upload-detail'),
+    path('uploads/<uuid:pk>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-finalize'),
+    # Permission-checked downloads of resumes and documents
+    path('media/<str:kind>/<int:pk>/<str:field>/', ProtectedMediaView.as_view(), name='protected-media'),
+    path('media/<str:kind>/<int:pk>/<str:field>/<str:filename>', ProtectedMediaView.as_view(),
+         name='protected-media-file'),
     
     # Dashboard stats endpoints
     path('admin/stats/', admin_stats, name='admin-stats'),
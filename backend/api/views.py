@@ -5,38 +5,435 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.pagination import PageNumberPagination
 from django.db.models import Q, Count
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 import random
 # from guardian.shortcuts import assign_perm, get_objects_for_user  # Temporarily commented out
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from asgiref.sync import sync_to_async
 
 from .models import (
     User, Branch, Employee, Student, Lead,
-    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance, ActivityLog
+    Job, JobResponse, Blog, StudentAttendance, EmployeeAttendance, ActivityLog,
+    UploadSession, Kiosk
 )
 from .serializers import (
     UserSerializer, BranchSerializer, EmployeeSerializer, StudentSerializer,
     LeadSerializer, JobSerializer, JobResponseSerializer, BlogSerializer,
     StudentDetailSerializer, StudentUpdateSerializer, StudentAttendanceSerializer, 
-    EmployeeAttendanceSerializer, ActivityLogSerializer
+    EmployeeAttendanceSerializer, ActivityLogSerializer, UploadSessionSerializer
 )
 from .permissions import (
     IsSuperAdmin, IsBranchManager, IsCounsellor, IsReceptionist,
     BelongsToBranch, BranchManagerPermission, CounsellorPermission,
     ReceptionistPermission, IsStudent
 )
+from .fast_serializers import (
+    EmployeeAttendanceValuesSerializer, StudentAttendanceValuesSerializer, ActivityLogValuesSerializer
+)
+from .mixins import (
+    SparseFieldsetMixin, ConditionalGetMixin, AutoRelatedMixin, ValuesListMixin, AnonymousCacheMixin,
+    ChangeFeedMixin, get_related_models
+)
+from .attendance import (
+    exceptions_mode, local_today, parse_date_range, expand_rows,
+    employee_people, student_people, employee_default_row, student_default_row,
+    student_placeholder_row,
+)
+from .attendance_archive import with_archived
+from .checkin import get_checkin_person, branch_now, record_check
+from .kiosk_sync import SyncError, sync as kiosk_sync
+from .activity_stream import ACTIVITY_STREAM_TOKEN_MAX_AGE, make_stream_token, stream_user, event_stream
+from .bootstrap import BOOTSTRAP_PAGE_SIZE, build_sections
+from .batch import BatchError, run_batch
+from .analytics import KINDS as ANALYTICS_KINDS, ATTENDANCE_ANALYTICS_MAX_DAYS, branch_analytics
+from .tasks import enqueue
+from .protected_media import (
+    MediaTokenAuthentication, PROTECTED_MEDIA_TOKEN_MAX_AGE, make_media_token, serve_file, download_name,
+)
+from .uploads import (
+    UploadError, parse_content_range, append_chunk, finalize, discard,
+    attach_uploads, release_uploads, CHUNKED_UPLOAD_MAX_CHUNK_SIZE
+)
 
 User = get_user_model()
 
+
+def credentials_email_kwargs(user_data, extra_data):
+    """Task arguments for the credentials email, without the password"""
+    return {
+        'user_data': {key: user_data.get(key) for key in ('email', 'first_name', 'last_name', 'role')},
+        'extra_data': {'branch': extra_data.get('branch')} if extra_data else None,
+    }
+
+
 # Create your views here.
 
 # Dashboard stats API views
 
+def admin_stats_data(user):
+    """Statistics for the admin dashboard"""
+    # Count real data from the database
+    branch_count = Branch.objects.count()
+    manager_count = Employee.objects.filter(user__role='BranchManager').count()
+    counsellor_count = Employee.objects.filter(user__role='Counsellor').count()
+    receptionist_count = Employee.objects.filter(user__role='Receptionist').count()
+    student_count = Student.objects.count()
+    lead_count = Lead.objects.count()
+    job_count = Job.objects.count()
+    
+    # Get real branch data and student counts
+    branches = Branch.objects.all()
+    students_by_branch = {}
+    
+    if branches.exists():
+        for branch in branches:
+            students_count = Student.objects.filter(branch=branch).count()
+            students_by_branch[branch.name] = students_count
+    
+    # Get lead source distribution
+    lead_source_counts = {}
+    lead_sources = Lead.objects.values('lead_source').annotate(count=Count('lead_source'))
+    for item in lead_sources:
+        lead_source_counts[item['lead_source']] = item['count']
+        
+    # If no lead sources found, provide some default categories
+    if not lead_source_counts:
+        lead_source_counts = {
+            "Website": Lead.objects.filter(lead_source="Website").count(),
+            "Social Media": Lead.objects.filter(lead_source="Social Media").count(),
+            "Referral": Lead.objects.filter(lead_source="Referral").count(),
+            "Walk-in": Lead.objects.filter(lead_source="Walk-in").count(),
+            "Phone Inquiry": Lead.objects.filter(lead_source="Phone Inquiry").count(),
+            "Email": Lead.objects.filter(lead_source="Email").count(),
+            "Event": Lead.objects.filter(lead_source="Event").count(),
+            "Other": Lead.objects.filter(lead_source="Other").count()
+        }
+    
+    # Calculate monthly student registrations for the last 6 months
+    monthly_student_registrations = {}
+    current_date = timezone.now()
+    
+    # Get the last 6 months
+    for i in range(6):
+        # Calculate month and year (going back from current month)
+        month = (current_date.month - i) % 12
+        if month == 0:
+            month = 12
+        
+        year = current_date.year
+        if current_date.month - i <= 0:
+            year -= 1
+            
+        # Get month name
+        month_name = datetime(year, month, 1).strftime('%b')
+        
+        # Count students registered in this month
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+            
+        month_count = Student.objects.filter(enrollment_date__range=[start_date, end_date]).count()
+        monthly_student_registrations[month_name] = month_count
+    
+    # Reverse to show in chronological order
+    monthly_student_registrations = dict(reversed(list(monthly_student_registrations.items())))
+        
+    stats = {
+        "branchCount": branch_count,
+        "managerCount": manager_count,
+        "counsellorCount": counsellor_count,
+        "receptionistCount": receptionist_count,
+        "studentCount": student_count,
+        "leadCount": lead_count,
+        "jobCount": job_count,
+        "studentsByBranch": students_by_branch,
+        "leadsStatusCount": lead_source_counts,
+        "monthlyStudentRegistrations": monthly_student_registrations
+    }
+    
+    return stats
+
+
+def branch_manager_stats_data(user):
+    """Statistics for the branch manager dashboard"""
+    # Get the branch manager's branch
+    branch_name = "Unknown Branch"
+    branch = None
+    
+    if hasattr(user, 'employee_profile'):
+        branch = user.employee_profile.branch
+        branch_name = branch.name
+        
+    # Count employees and students for this branch
+    if branch:
+        employee_count = Employee.objects.filter(branch=branch).count() or 12
+        student_count = Student.objects.filter(branch=branch).count() or 78
+        lead_count = Lead.objects.filter(branch=branch).count() or 14
+    else:
+        # Mock data if branch not found
+        employee_count = 12
+        student_count = 78
+        lead_count = 14
+        
+    # Generate mock data for charts
+    course_distribution = {
+        "Web Development": random.randint(10, 30),
+        "Digital Marketing": random.randint(8, 20),
+        "Graphic Design": random.randint(5, 15),
+        "App Development": random.randint(10, 25),
+        "Data Science": random.randint(5, 15)
+    }
+    
+    lead_status_count = {
+        "New": random.randint(2, 7),
+        "Contacted": random.randint(3, 8),
+        "Qualified": random.randint(2, 5),
+        "Converted": random.randint(1, 5),
+        "Closed": random.randint(1, 3)
+    }
+    
+    # Student attendance rate per working weekday over the last 30 days
+    student_attendance = {}
+    if branch:
+        today = local_today()
+        analytics = branch_analytics(branch.pk, 'student', today - timedelta(days=29), today)
+        student_attendance = {
+            day: rate for day, rate in analytics['summary']['weekday_rates'].items() if rate is not None
+        }
+    
+    # Mock data for lead conversions over past 6 months
+    month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    current_month = timezone.now().month
+    
+    lead_conversions = {
+        "labels": [],
+        "values": []
+    }
+    
+    for i in range(6):
+        month_idx = (current_month - i - 1) % 12
+        if month_idx == 0:
+            month_idx = 12
+        
+        lead_conversions["labels"].append(month_names[month_idx - 1])
+        lead_conversions["values"].append(random.randint(3, 12))
+        
+    # Reverse for chronological order
+    lead_conversions["labels"].reverse()
+    lead_conversions["values"].reverse()
+    
+    stats = {
+        "branchName": branch_name,
+        "employeeCount": employee_count,
+        "studentCount": student_count,
+        "leadCount": lead_count,
+        "courseDistribution": course_distribution,
+        "leadStatusCount": lead_status_count,
+        "studentAttendance": student_attendance,
+        "leadConversions": lead_conversions
+    }
+    
+    return stats
+
+
+def counsellor_stats_data(user):
+    """Statistics for the counsellor dashboard"""
+    # Get the counsellor's name and branch
+    counsellor_name = f"{user.first_name} {user.last_name}"
+    branch_name = "Unknown Branch"
+    branch = None
+    
+    if hasattr(user, 'employee_profile'):
+        branch = user.employee_profile.branch
+        branch_name = branch.name
+    
+    from .models import Student, Lead, Employee
+    from django.db.models import Count
+    # Only count students, leads, and employees in the same branch
+    student_count = Student.objects.filter(branch=branch).count() if branch else 0
+    lead_count = Lead.objects.filter(branch=branch).count() if branch else 0
+    employee_count = Employee.objects.filter(branch=branch).count() if branch else 0
+    
+    # Real student status distribution for this branch
+    student_status_distribution = {}
+    if branch:
+        statuses = Student.objects.filter(branch=branch).values('gender').annotate(count=Count('gender'))
+        for item in statuses:
+            student_status_distribution[item['gender']] = item['count']
+    
+    # Real lead status distribution for this branch
+    lead_status_distribution = {}
+    if branch:
+        statuses = Lead.objects.filter(branch=branch).values('lead_source').annotate(count=Count('lead_source'))
+        for item in statuses:
+            lead_status_distribution[item['lead_source']] = item['count']
+    
+    # Real monthly student registrations for this branch (last 6 months)
+    from django.utils import timezone
+    from datetime import datetime, timedelta
+    monthly_student_registrations = {}
+    current_date = timezone.now()
+    for i in range(6):
+        month = (current_date.month - i) % 12
+        if month == 0:
+            month = 12
+        year = current_date.year
+        if current_date.month - i <= 0:
+            year -= 1
+        month_name = datetime(year, month, 1).strftime('%b')
+        start_date = datetime(year, month, 1)
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
+        month_count = Student.objects.filter(branch=branch, enrollment_date__range=[start_date, end_date]).count() if branch else 0
+        monthly_student_registrations[month_name] = month_count
+    monthly_student_registrations = dict(reversed(list(monthly_student_registrations.items())))
+    
+    stats = {
+        "counsellorName": counsellor_name,
+        "branchName": branch_name,
+        "assignedStudentCount": student_count,
+        "assignedLeadCount": lead_count,
+        "employeeCount": employee_count,
+        "upcomingAppointmentCount": 0,  # You can add real logic if you have appointments
+        "studentStatusDistribution": student_status_distribution,
+        "leadStatusDistribution": lead_status_distribution,
+        "monthlyStudentRegistrations": monthly_student_registrations,
+    }
+    return stats
+
+
+def receptionist_stats_data(user):
+    """Statistics for the receptionist dashboard"""
+    # Get the receptionist's name and branch
+    receptionist_name = f"{user.first_name} {user.last_name}"
+    branch_name = "Unknown Branch"
+    branch = None
+    
+    if hasattr(user, 'employee_profile'):
+        branch = user.employee_profile.branch
+        branch_name = branch.name
+    
+    from .models import Student, Employee, Lead
+    from django.db.models import Count
+    # Only count students, employees, and leads in the same branch
+    total_student_count = Student.objects.filter(branch=branch).count() if branch else 0
+    total_employee_count = Employee.objects.filter(branch=branch).count() if branch else 0
+    total_lead_count = Lead.objects.filter(branch=branch).count() if branch else 0
+    
+    # Real lead source distribution for this branch
+    lead_source_distribution = {}
+    if branch:
+        lead_sources = Lead.objects.filter(branch=branch).values('lead_source').annotate(count=Count('lead_source'))
+        for item in lead_sources:
+            lead_source_distribution[item['lead_source']] = item['count']
+    
+    # Real student course distribution for this branch (by institution_name)
+    student_course_distribution = {}
+    if branch:
+        courses = Student.objects.filter(branch=branch).values('institution_name').annotate(count=Count('institution_name'))
+        for item in courses:
+            student_course_distribution[item['institution_name']] = item['count']
+    
+    # Mock data for visitor traffic (last 7 days)
+    days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+    visitor_traffic = {}
+    for day in days:
+        visitor_traffic[day] = random.randint(5, 30)
+    
+    stats = {
+        "receptionistName": receptionist_name,
+        "branchName": branch_name,
+        "totalStudentCount": total_student_count,
+        "totalEmployeeCount": total_employee_count,
+        "totalLeadCount": total_lead_count,
+        "leadSourceDistribution": lead_source_distribution,
+        "studentCourseDistribution": student_course_distribution,
+        "visitorTraffic": visitor_traffic,
+    }
+    
+    return stats
+
+
+def bank_manager_stats_data(user):
+    """Statistics for the bank manager dashboard"""
+    # Get the bank manager's name
+    bank_manager_name = f"{user.first_name} {user.last_name}"
+        
+    # Mock data for loan counts
+    total_loans = random.randint(50, 200)
+    pending_loans = random.randint(10, 30)
+    approved_loans = random.randint(30, 150)
+    rejected_loans = random.randint(5, 20)
+        
+    # Generate mock data for charts
+    loan_type_distribution = {
+        "Education": random.randint(20, 70),
+        "Personal": random.randint(10, 40),
+        "Business": random.randint(5, 30),
+        "Housing": random.randint(10, 50),
+        "Vehicle": random.randint(5, 20)
+    }
+    
+    loan_status_distribution = {
+        "Pending": pending_loans,
+        "Approved": approved_loans,
+        "Rejected": rejected_loans,
+        "Completed": random.randint(10, 50)
+    }
+    
+    # Mock data for monthly loan amounts
+    month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+    current_month = timezone.now().month
+    
+    monthly_loan_amount = {}
+    
+    for i in range(6):
+        month_idx = (current_month - i - 1) % 12
+        if month_idx == 0:
+            month_idx = 12
+        
+        monthly_loan_amount[month_names[month_idx - 1]] = random.randint(50000, 250000)
+        
+    # Reverse for chronological order
+    monthly_loan_amount = dict(reversed(list(monthly_loan_amount.items())))
+    
+    # Mock data for branch distribution
+    branches = Branch.objects.all()
+    branch_names = [branch.name for branch in branches] if branches.exists() else [
+        "Kathmandu", "Pokhara", "Chitwan", "Butwal", "Biratnagar"
+    ]
+    
+    branch_distribution = {}
+    for name in branch_names:
+        branch_distribution[name] = random.randint(5, 50)
+    
+    stats = {
+        "bankManagerName": bank_manager_name,
+        "totalLoans": total_loans,
+        "pendingLoans": pending_loans,
+        "approvedLoans": approved_loans,
+        "rejectedLoans": rejected_loans,
+        "loanTypeDistribution": loan_type_distribution,
+        "loanStatusDistribution": loan_status_distribution,
+        "monthlyLoanAmount": monthly_loan_amount,
+        "branchDistribution": branch_distribution
+    }
+    
+    return stats
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, IsSuperAdmin])
 def admin_stats(request):
@@ -44,88 +441,7 @@ def admin_stats(request):
     API endpoint for admin dashboard statistics
     """
     try:
-        # Count real data from the database
-        branch_count = Branch.objects.count()
-        manager_count = Employee.objects.filter(user__role='BranchManager').count()
-        counsellor_count = Employee.objects.filter(user__role='Counsellor').count()
-        receptionist_count = Employee.objects.filter(user__role='Receptionist').count()
-        student_count = Student.objects.count()
-        lead_count = Lead.objects.count()
-        job_count = Job.objects.count()
-        
-        # Get real branch data and student counts
-        branches = Branch.objects.all()
-        students_by_branch = {}
-        
-        if branches.exists():
-            for branch in branches:
-                students_count = Student.objects.filter(branch=branch).count()
-                students_by_branch[branch.name] = students_count
-        
-        # Get lead source distribution
-        lead_source_counts = {}
-        lead_sources = Lead.objects.values('lead_source').annotate(count=Count('lead_source'))
-        for item in lead_sources:
-            lead_source_counts[item['lead_source']] = item['count']
-            
-        # If no lead sources found, provide some default categories
-        if not lead_source_counts:
-            lead_source_counts = {
-                "Website": Lead.objects.filter(lead_source="Website").count(),
-                "Social Media": Lead.objects.filter(lead_source="Social Media").count(),
-                "Referral": Lead.objects.filter(lead_source="Referral").count(),
-                "Walk-in": Lead.objects.filter(lead_source="Walk-in").count(),
-                "Phone Inquiry": Lead.objects.filter(lead_source="Phone Inquiry").count(),
-                "Email": Lead.objects.filter(lead_source="Email").count(),
-                "Event": Lead.objects.filter(lead_source="Event").count(),
-                "Other": Lead.objects.filter(lead_source="Other").count()
-            }
-        
-        # Calculate monthly student registrations for the last 6 months
-        monthly_student_registrations = {}
-        current_date = timezone.now()
-        
-        # Get the last 6 months
-        for i in range(6):
-            # Calculate month and year (going back from current month)
-            month = (current_date.month - i) % 12
-            if month == 0:
-                month = 12
-            
-            year = current_date.year
-            if current_date.month - i <= 0:
-                year -= 1
-                
-            # Get month name
-            month_name = datetime(year, month, 1).strftime('%b')
-            
-            # Count students registered in this month
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-                
-            month_count = Student.objects.filter(enrollment_date__range=[start_date, end_date]).count()
-            monthly_student_registrations[month_name] = month_count
-        
-        # Reverse to show in chronological order
-        monthly_student_registrations = dict(reversed(list(monthly_student_registrations.items())))
-            
-        stats = {
-            "branchCount": branch_count,
-            "managerCount": manager_count,
-            "counsellorCount": counsellor_count,
-            "receptionistCount": receptionist_count,
-            "studentCount": student_count,
-            "leadCount": lead_count,
-            "jobCount": job_count,
-            "studentsByBranch": students_by_branch,
-            "leadsStatusCount": lead_source_counts,
-            "monthlyStudentRegistrations": monthly_student_registrations
-        }
-        
-        return Response(stats)
+        return Response(admin_stats_data(request.user))
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -136,84 +452,7 @@ def branch_manager_stats(request):
     API endpoint for branch manager dashboard statistics
     """
     try:
-        # Get the branch manager's branch
-        branch_name = "Unknown Branch"
-        branch = None
-        
-        if hasattr(request.user, 'employee_profile'):
-            branch = request.user.employee_profile.branch
-            branch_name = branch.name
-            
-        # Count employees and students for this branch
-        if branch:
-            employee_count = Employee.objects.filter(branch=branch).count() or 12
-            student_count = Student.objects.filter(branch=branch).count() or 78
-            lead_count = Lead.objects.filter(branch=branch).count() or 14
-        else:
-            # Mock data if branch not found
-            employee_count = 12
-            student_count = 78
-            lead_count = 14
-            
-        # Generate mock data for charts
-        course_distribution = {
-            "Web Development": random.randint(10, 30),
-            "Digital Marketing": random.randint(8, 20),
-            "Graphic Design": random.randint(5, 15),
-            "App Development": random.randint(10, 25),
-            "Data Science": random.randint(5, 15)
-        }
-        
-        lead_status_count = {
-            "New": random.randint(2, 7),
-            "Contacted": random.randint(3, 8),
-            "Qualified": random.randint(2, 5),
-            "Converted": random.randint(1, 5),
-            "Closed": random.randint(1, 3)
-        }
-        
-        # Mock data for student attendance
-        student_attendance = {
-            "Monday": random.randint(70, 95),
-            "Tuesday": random.randint(70, 95),
-            "Wednesday": random.randint(70, 95),
-            "Thursday": random.randint(70, 95),
-            "Friday": random.randint(70, 95)
-        }
-        
-        # Mock data for lead conversions over past 6 months
-        month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        current_month = timezone.now().month
-        
-        lead_conversions = {
-            "labels": [],
-            "values": []
-        }
-        
-        for i in range(6):
-            month_idx = (current_month - i - 1) % 12
-            if month_idx == 0:
-                month_idx = 12
-            
-            lead_conversions["labels"].append(month_names[month_idx - 1])
-            lead_conversions["values"].append(random.randint(3, 12))
-            
-        # Reverse for chronological order
-        lead_conversions["labels"].reverse()
-        lead_conversions["values"].reverse()
-        
-        stats = {
-            "branchName": branch_name,
-            "employeeCount": employee_count,
-            "studentCount": student_count,
-            "leadCount": lead_count,
-            "courseDistribution": course_distribution,
-            "leadStatusCount": lead_status_count,
-            "studentAttendance": student_attendance,
-            "leadConversions": lead_conversions
-        }
-        
-        return Response(stats)
+        return Response(branch_manager_stats_data(request.user))
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -224,70 +463,7 @@ def counsellor_stats(request):
     API endpoint for counsellor dashboard statistics
     """
     try:
-        # Get the counsellor's name and branch
-        counsellor_name = f"{request.user.first_name} {request.user.last_name}"
-        branch_name = "Unknown Branch"
-        branch = None
-        
-        if hasattr(request.user, 'employee_profile'):
-            branch = request.user.employee_profile.branch
-            branch_name = branch.name
-        
-        from .models import Student, Lead, Employee
-        from django.db.models import Count
-        # Only count students, leads, and employees in the same branch
-        student_count = Student.objects.filter(branch=branch).count() if branch else 0
-        lead_count = Lead.objects.filter(branch=branch).count() if branch else 0
-        employee_count = Employee.objects.filter(branch=branch).count() if branch else 0
-        
-        # Real student status distribution for this branch
-        student_status_distribution = {}
-        if branch:
-            statuses = Student.objects.filter(branch=branch).values('gender').annotate(count=Count('gender'))
-            for item in statuses:
-                student_status_distribution[item['gender']] = item['count']
-        
-        # Real lead status distribution for this branch
-        lead_status_distribution = {}
-        if branch:
-            statuses = Lead.objects.filter(branch=branch).values('lead_source').annotate(count=Count('lead_source'))
-            for item in statuses:
-                lead_status_distribution[item['lead_source']] = item['count']
-        
-        # Real monthly student registrations for this branch (last 6 months)
-        from django.utils import timezone
-        from datetime import datetime, timedelta
-        monthly_student_registrations = {}
-        current_date = timezone.now()
-        for i in range(6):
-            month = (current_date.month - i) % 12
-            if month == 0:
-                month = 12
-            year = current_date.year
-            if current_date.month - i <= 0:
-                year -= 1
-            month_name = datetime(year, month, 1).strftime('%b')
-            start_date = datetime(year, month, 1)
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-            month_count = Student.objects.filter(branch=branch, enrollment_date__range=[start_date, end_date]).count() if branch else 0
-            monthly_student_registrations[month_name] = month_count
-        monthly_student_registrations = dict(reversed(list(monthly_student_registrations.items())))
-        
-        stats = {
-            "counsellorName": counsellor_name,
-            "branchName": branch_name,
-            "assignedStudentCount": student_count,
-            "assignedLeadCount": lead_count,
-            "employeeCount": employee_count,
-            "upcomingAppointmentCount": 0,  # You can add real logic if you have appointments
-            "studentStatusDistribution": student_status_distribution,
-            "leadStatusDistribution": lead_status_distribution,
-            "monthlyStudentRegistrations": monthly_student_registrations,
-        }
-        return Response(stats)
+        return Response(counsellor_stats_data(request.user))
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -298,54 +474,7 @@ def receptionist_stats(request):
     API endpoint for receptionist dashboard statistics
     """
     try:
-        # Get the receptionist's name and branch
-        receptionist_name = f"{request.user.first_name} {request.user.last_name}"
-        branch_name = "Unknown Branch"
-        branch = None
-        
-        if hasattr(request.user, 'employee_profile'):
-            branch = request.user.employee_profile.branch
-            branch_name = branch.name
-        
-        from .models import Student, Employee, Lead
-        from django.db.models import Count
-        # Only count students, employees, and leads in the same branch
-        total_student_count = Student.objects.filter(branch=branch).count() if branch else 0
-        total_employee_count = Employee.objects.filter(branch=branch).count() if branch else 0
-        total_lead_count = Lead.objects.filter(branch=branch).count() if branch else 0
-        
-        # Real lead source distribution for this branch
-        lead_source_distribution = {}
-        if branch:
-            lead_sources = Lead.objects.filter(branch=branch).values('lead_source').annotate(count=Count('lead_source'))
-            for item in lead_sources:
-                lead_source_distribution[item['lead_source']] = item['count']
-        
-        # Real student course distribution for this branch (by institution_name)
-        student_course_distribution = {}
-        if branch:
-            courses = Student.objects.filter(branch=branch).values('institution_name').annotate(count=Count('institution_name'))
-            for item in courses:
-                student_course_distribution[item['institution_name']] = item['count']
-        
-        # Mock data for visitor traffic (last 7 days)
-        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-        visitor_traffic = {}
-        for day in days:
-            visitor_traffic[day] = random.randint(5, 30)
-        
-        stats = {
-            "receptionistName": receptionist_name,
-            "branchName": branch_name,
-            "totalStudentCount": total_student_count,
-            "totalEmployeeCount": total_employee_count,
-            "totalLeadCount": total_lead_count,
-            "leadSourceDistribution": lead_source_distribution,
-            "studentCourseDistribution": student_course_distribution,
-            "visitorTraffic": visitor_traffic,
-        }
-        
-        return Response(stats)
+        return Response(receptionist_stats_data(request.user))
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -356,74 +485,11 @@ def bank_manager_stats(request):
     API endpoint for bank manager dashboard statistics
     """
     try:
-        # Get the bank manager's name
-        bank_manager_name = f"{request.user.first_name} {request.user.last_name}"
-            
-        # Mock data for loan counts
-        total_loans = random.randint(50, 200)
-        pending_loans = random.randint(10, 30)
-        approved_loans = random.randint(30, 150)
-        rejected_loans = random.randint(5, 20)
-            
-        # Generate mock data for charts
-        loan_type_distribution = {
-            "Education": random.randint(20, 70),
-            "Personal": random.randint(10, 40),
-            "Business": random.randint(5, 30),
-            "Housing": random.randint(10, 50),
-            "Vehicle": random.randint(5, 20)
-        }
-        
-        loan_status_distribution = {
-            "Pending": pending_loans,
-            "Approved": approved_loans,
-            "Rejected": rejected_loans,
-            "Completed": random.randint(10, 50)
-        }
-        
-        # Mock data for monthly loan amounts
-        month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-        current_month = timezone.now().month
-        
-        monthly_loan_amount = {}
-        
-        for i in range(6):
-            month_idx = (current_month - i - 1) % 12
-            if month_idx == 0:
-                month_idx = 12
-            
-            monthly_loan_amount[month_names[month_idx - 1]] = random.randint(50000, 250000)
-            
-        # Reverse for chronological order
-        monthly_loan_amount = dict(reversed(list(monthly_loan_amount.items())))
-        
-        # Mock data for branch distribution
-        branches = Branch.objects.all()
-        branch_names = [branch.name for branch in branches] if branches.exists() else [
-            "Kathmandu", "Pokhara", "Chitwan", "Butwal", "Biratnagar"
-        ]
-        
-        branch_distribution = {}
-        for name in branch_names:
-            branch_distribution[name] = random.randint(5, 50)
-        
-        stats = {
-            "bankManagerName": bank_manager_name,
-            "totalLoans": total_loans,
-            "pendingLoans": pending_loans,
-            "approvedLoans": approved_loans,
-            "rejectedLoans": rejected_loans,
-            "loanTypeDistribution": loan_type_distribution,
-            "loanStatusDistribution": loan_status_distribution,
-            "monthlyLoanAmount": monthly_loan_amount,
-            "branchDistribution": branch_distribution
-        }
-        
-        return Response(stats)
+        return Response(bank_manager_stats_data(request.user))
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ChangeFeedMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     """
     API endpoint for users
     """
@@ -589,7 +655,7 @@ class UserViewSet(viewsets.ModelViewSet):
         # Default - users can see themselves
         return User.objects.filter(id=user.id)
 
-class BranchViewSet(viewsets.ModelViewSet):
+class BranchViewSet(ChangeFeedMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Branch.objects.all()
     serializer_class = BranchSerializer
     
@@ -620,9 +686,10 @@ class BranchViewSet(viewsets.ModelViewSet):
             
         return super().destroy(request, *args, **kwargs)
 
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ChangeFeedMixin, ConditionalGetMixin, SparseFieldsetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
+    list_deferred_fields = ('address',)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -691,23 +758,29 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             if 'citizenship_document' in request.FILES:
                 serializer_data['citizenship_document'] = request.FILES['citizenship_document']
             
-            # Debug the serializer data
-            print("Serializer data:", serializer_data)
-            
-            serializer = self.get_serializer(data=serializer_data)
-            is_valid = serializer.is_valid()
-            
-            if not is_valid:
-                print("Serializer errors:", serializer.errors)
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            
-            self.perform_create(serializer)
+            # Documents sent earlier through the chunked upload API
+            with transaction.atomic():
+                uploads = attach_uploads(request.user, employee_data, serializer_data, ['citizenship_document'])
+                saved = False
+                try:
+                    # Debug the serializer data
+                    print("Serializer data:", serializer_data)
+                
+                    serializer = self.get_serializer(data=serializer_data)
+                    is_valid = serializer.is_valid()
+                
+                    if not is_valid:
+                        print("Serializer errors:", serializer.errors)
+                        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                
+                    self.perform_create(serializer)
+                    saved = True
+                finally:
+                    release_uploads(uploads, used=saved)
             
             # Send email notification for new employee - always try to send for all employee roles
             try:
-                from utils.email_sender import send_employee_credentials_email
-                print(f"Attempting to send email notification to {user_data['email']}")
-                send_employee_credentials_email(user_data, employee_data)
+                enqueue('email.credentials', **credentials_email_kwargs(user_data, employee_data))
                 print(f"Email notification successfully queued for {user_data['email']}")
             except Exception as e:
                 print(f"Error sending email notification: {str(e)}")
@@ -788,9 +861,10 @@ class EmployeeViewSet(viewsets.ModelViewSet):
         # If not using JSON, fall back to standard processing
         return super().update(request, *args, **kwargs)
 
-class StudentViewSet(viewsets.ModelViewSet):
+class StudentViewSet(ChangeFeedMixin, ConditionalGetMixin, SparseFieldsetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = Student.objects.all()
     serializer_class = StudentSerializer
+    list_deferred_fields = ('address',)
     
     def get_permissions(self):
         if self.action == 'create':
@@ -862,19 +936,28 @@ class StudentViewSet(viewsets.ModelViewSet):
                 serializer_data['resume'] = request.FILES['resume']
             if 'citizenship_document' in request.FILES:
                 serializer_data['citizenship_document'] = request.FILES['citizenship_document']
-            serializer = self.get_serializer(data=serializer_data)
-            is_valid = serializer.is_valid()
-            if not is_valid:
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-            try:
-                self.perform_create(serializer)
-            except IntegrityError as e:
-                if 'email' in str(e).lower():
-                    return Response({'email': ['A user with this email already exists.']}, status=status.HTTP_400_BAD_REQUEST)
-                return Response({'detail': 'A database error occurred.'}, status=status.HTTP_400_BAD_REQUEST)
+            # Documents sent earlier through the chunked upload API
+            with transaction.atomic():
+                uploads = attach_uploads(request.user, student_data, serializer_data, ['resume'])
+                saved = False
+                try:
+                    serializer = self.get_serializer(data=serializer_data)
+                    is_valid = serializer.is_valid()
+                    if not is_valid:
+                        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                    try:
+                        # A savepoint, the upload is released after a failed insert
+                        with transaction.atomic():
+                            self.perform_create(serializer)
+                    except IntegrityError as e:
+                        if 'email' in str(e).lower():
+                            return Response({'email': ['A user with this email already exists.']}, status=status.HTTP_400_BAD_REQUEST)
+                        return Response({'detail': 'A database error occurred.'}, status=status.HTTP_400_BAD_REQUEST)
+                    saved = True
+                finally:
+                    release_uploads(uploads, used=saved)
             # Send email notification to the new student
-            from utils.email_sender import send_employee_credentials_email
-            send_employee_credentials_email(user_data, student_data)
+            enqueue('email.credentials', **credentials_email_kwargs(user_data, student_data))
             headers = self.get_success_headers(serializer.data)
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
         # If not using JSON, fall back to standard processing
@@ -950,9 +1033,10 @@ class StudentViewSet(viewsets.ModelViewSet):
             status=status.HTTP_200_OK
         )
 
-class LeadViewSet(viewsets.ModelViewSet):
+class LeadViewSet(ChangeFeedMixin, ConditionalGetMixin, SparseFieldsetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = Lead.objects.all()
     serializer_class = LeadSerializer
+    list_deferred_fields = ('notes',)
     
     def get_permissions(self):
         if self.action == 'create':
@@ -1005,13 +1089,18 @@ class LeadViewSet(viewsets.ModelViewSet):
         # For SuperAdmin or fallback
         serializer.save()
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(ChangeFeedMixin, AnonymousCacheMixin, ConditionalGetMixin, SparseFieldsetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
+    list_deferred_fields = ('description', 'requirements')
+    cache_models = (Branch,)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
             permission_classes = [IsSuperAdmin | BranchManagerPermission]
+        elif self.action in ['list', 'retrieve']:
+            # Public job board
+            permission_classes = [permissions.AllowAny]
         else:
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -1019,6 +1108,10 @@ class JobViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
+        # Anonymous visitors see the active jobs
+        if not user.is_authenticated:
+            return Job.objects.filter(is_active=True)
+        
         # SuperAdmin can see all jobs
         if user.role == 'SuperAdmin':
             return Job.objects.all()
@@ -1031,7 +1124,11 @@ class JobViewSet(viewsets.ModelViewSet):
         # Other roles can see all active jobs
         return Job.objects.filter(is_active=True)
 
-class JobResponseViewSet(viewsets.ModelViewSet):
+    def get_deletion_scope(self):
+        # Active jobs are listed across branches and publicly, their ids are not scoped
+        return None
+
+class JobResponseViewSet(ChangeFeedMixin, ConditionalGetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = JobResponse.objects.all()
     serializer_class = JobResponseSerializer
     
@@ -1047,11 +1144,29 @@ class JobResponseViewSet(viewsets.ModelViewSet):
             permission_classes = [IsSuperAdmin | BranchManagerPermission]
         return [permission() for permission in permission_classes]
         
+    def create(self, request, *args, **kwargs):
+        # A resume sent earlier through the chunked upload API (signed in users only)
+        if request.user.is_authenticated and request.data.get('resume_upload_id'):
+            data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+            with transaction.atomic():
+                uploads = attach_uploads(request.user, request.data, data, ['resume'])
+                saved = False
+                try:
+                    serializer = self.get_serializer(data=data)
+                    serializer.is_valid(raise_exception=True)
+                    self.perform_create(serializer)
+                    saved = True
+                finally:
+                    release_uploads(uploads, used=saved)
+            headers = self.get_success_headers(serializer.data)
+            return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        return super().create(request, *args, **kwargs)
+        
     def get_queryset(self):
         user = self.request.user
         if user.role == 'Student':
             # Only return job responses for the logged-in student
-            return JobResponse.objects.filter(email=user.email)
+            return JobResponse.objects.filter(student__user=user)
         # SuperAdmin can see all job responses
         if user.role == 'SuperAdmin':
             return JobResponse.objects.all()
@@ -1062,9 +1177,13 @@ class JobResponseViewSet(viewsets.ModelViewSet):
         # Other roles can't see job responses
         return JobResponse.objects.none()
 
-class BlogViewSet(viewsets.ModelViewSet):
+class BlogViewSet(ChangeFeedMixin, AnonymousCacheMixin, ConditionalGetMixin, SparseFieldsetMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = Blog.objects.all()
     serializer_class = BlogSerializer
+    # List cards show the excerpt, the full text is on the detail page
+    list_deferred_fields = ('content',)
+    # author_name and branch_name come from these
+    cache_models = (Branch, User)
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -1093,6 +1212,10 @@ class BlogViewSet(viewsets.ModelViewSet):
         # Default - show only published blogs
         return Blog.objects.filter(is_published=True)
 
+    def get_deletion_scope(self):
+        # Published blogs are listed across branches and publicly, their ids are not scoped
+        return None
+
 # Student Portal Endpoints
 class StudentProfileView(APIView):
     """View for student to see and update their own profile"""
@@ -1124,12 +1247,24 @@ class StudentJobResponseView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def post(self, request):
-        serializer = JobResponseSerializer(data=request.data)
-        
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            data = request.data
+            uploads = []
+            if request.data.get('resume_upload_id'):
+                # Resume sent earlier through the chunked upload API
+                data = request.data.dict() if hasattr(request.data, 'dict') else dict(request.data)
+                uploads = attach_uploads(request.user, request.data, data, ['resume'])
+            saved = False
+            try:
+                serializer = JobResponseSerializer(data=data, context={'request': request})
+            
+                if serializer.is_valid():
+                    serializer.save()
+                    saved = True
+                    return Response(serializer.data, status=status.HTTP_201_CREATED)
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            finally:
+                release_uploads(uploads, used=saved)
 
 
 class StudentJobResponseListView(APIView):
@@ -1137,15 +1272,163 @@ class StudentJobResponseListView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     
     def get(self, request):
-        student = Student.objects.get(user=request.user)
-        # Get job responses by student email
-        responses = JobResponse.objects.filter(email=request.user.email).order_by('-created_at')
-        serializer = JobResponseSerializer(responses, many=True)
+        # Uses the (student, created_at) index
+        responses = JobResponse.objects.filter(student__user=request.user) \
+            .select_related('job').order_by('-created_at')
+        serializer = JobResponseSerializer(responses, many=True, context={'request': request})
         return Response(serializer.data)
 
-class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
+class UploadSessionView(APIView):
+    """
+    Start a chunked upload.
+
+    Expects: { "filename": "resume.pdf", "total_size": 1048576 }
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadSessionSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            data = dict(serializer.data, chunk_size=CHUNKED_UPLOAD_MAX_CHUNK_SIZE)
+            return Response(data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionDetailView(APIView):
+    """
+    Progress of an upload (GET), the next chunk (PUT) or cancellation (DELETE).
+
+    Chunks are sent as the raw request body with a
+    `Content-Range: bytes <start>-<end>/<total>` header. A chunk that does not
+    start at `received_size` is rejected with 409 so the client can resume
+    from the right offset.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        return Response(UploadSessionSerializer(session).data)
+
+    def put(self, request, pk):
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            return Response({"detail": "Chunk body is empty."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Concurrent chunks for the same upload are applied one at a time
+            session = get_object_or_404(
+                UploadSession.objects.select_for_update(), pk=pk, user=request.user
+            )
+            if session.status != 'Uploading':
+                return Response({"detail": "This upload is already finalized."}, status=status.HTTP_409_CONFLICT)
+            try:
+                content_range = request.META.get('HTTP_CONTENT_RANGE')
+                if content_range:
+                    start, end = parse_content_range(content_range, session.total_size)
+                    if end - start != length:
+                        raise UploadError("Content-Length does not match Content-Range.")
+                else:
+                    start = session.received_size
+                append_chunk(session, request.stream, start, length)
+            except UploadError as e:
+                return Response(
+                    {"detail": e.detail, "received_size": session.received_size},
+                    status=e.status_code
+                )
+        return Response(UploadSessionSerializer(session).data)
+
+    def delete(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, user=request.user)
+        discard(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadSessionFinalizeView(APIView):
+    """Check a fully received upload and make it available to the create endpoints"""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        with transaction.atomic():
+            session = get_object_or_404(
+                UploadSession.objects.select_for_update(), pk=pk, user=request.user
+            )
+            try:
+                finalize(session)
+            except UploadError as e:
+                return Response({"detail": e.detail}, status=e.status_code)
+        return Response(UploadSessionSerializer(session).data)
+
+class ProtectedMediaView(APIView):
+    """
+    Download a sensitive document after the same role and branch checks as
+    the record it belongs to, e.g. GET /api/media/students/5/resume/. The
+    URL may end with a file name, which is only there for the browser.
+
+    POST to the same URL returns a short-lived link with a signed ?token=,
+    for browsers opening the document without the Authorization header.
+    """
+    authentication_classes = [MediaTokenAuthentication, JWTAuthentication]
+    # kind -> (model, downloadable fields, permission classes)
+    protected_fields = {
+        'students': (
+            Student, ('resume',),
+            [IsSuperAdmin | BranchManagerPermission | CounsellorPermission | ReceptionistPermission | IsStudent],
+        ),
+        'employees': (
+            Employee, ('citizenship_document',),
+            [IsSuperAdmin | BranchManagerPermission | CounsellorPermission | ReceptionistPermission],
+        ),
+        'job-responses': (
+            JobResponse, ('resume',),
+            # IsStudent: the student who applied
+            [IsSuperAdmin | BranchManagerPermission | IsStudent],
+        ),
+    }
+
+    @property
+    def queryset(self):
+        # ReceptionistPermission looks at view.queryset to find the model
+        return self.protected_fields[self.kwargs['kind']][0].objects.all()
+
+    def get_permissions(self):
+        if self.kwargs.get('kind') not in self.protected_fields:
+            return [permissions.IsAuthenticated()]
+        return [permission() for permission in self.protected_fields[self.kwargs['kind']][2]]
+
+    def get_document(self, request, kind, pk, field):
+        """The record holding the document, after the permission checks"""
+        if kind not in self.protected_fields or field not in self.protected_fields[kind][1]:
+            raise Http404
+        instance = get_object_or_404(self.queryset, pk=pk)
+        self.check_object_permissions(request, instance)
+        if not getattr(instance, field):
+            raise Http404
+        return instance
+
+    def get(self, request, kind, pk, field, filename=None):
+        instance = self.get_document(request, kind, pk, field)
+        response = serve_file(request, getattr(instance, field), download_name(instance, field))
+        # Keep a ?token= out of the Referer of links inside the document
+        response['Referrer-Policy'] = 'no-referrer'
+        return response
+
+    def post(self, request, kind, pk, field, filename=None):
+        instance = self.get_document(request, kind, pk, field)
+        url = request.build_absolute_uri(reverse('protected-media-file', kwargs={
+            'kind': kind, 'pk': pk, 'field': field, 'filename': download_name(instance, field),
+        }))
+        token = make_media_token(request.user, kind, pk, field)
+        return Response({'url': f'{url}?token={token}', 'expires_in': PROTECTED_MEDIA_TOKEN_MAX_AGE})
+
+class EmployeeAttendanceViewSet(ChangeFeedMixin, ConditionalGetMixin, ValuesListMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = EmployeeAttendance.objects.all()
     serializer_class = EmployeeAttendanceSerializer
+    values_serializer_class = EmployeeAttendanceValuesSerializer
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve', 'create', 'update', 'partial_update', 'destroy']:
@@ -1173,6 +1456,15 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
         
         # Others can't see any records
         return EmployeeAttendance.objects.none()
+
+    def get_people_queryset(self):
+        """Employees whose attendance the user can see"""
+        user = self.request.user
+        if user.role == 'SuperAdmin':
+            return Employee.objects.all()
+        if user.role == 'BranchManager' and hasattr(user, 'employee_profile'):
+            return Employee.objects.filter(branch=user.employee_profile.branch)
+        return Employee.objects.none()
     
     @action(detail=False, methods=['get'])
     def by_date(self, request):
@@ -1191,24 +1483,33 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
                 start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
                 end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
                 queryset = self.get_queryset().filter(date__range=(start_date, end_date))
-                serializer = self.get_serializer(queryset, many=True)
-                return Response(serializer.data)
             elif date_str:
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                queryset = self.get_queryset().filter(date=date)
-                serializer = self.get_serializer(queryset, many=True)
-                return Response(serializer.data)
+                start_date = end_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+                queryset = self.get_queryset().filter(date=start_date)
             else:
                 # Return all records if no date or range is provided
                 queryset = self.get_queryset().all()
-                serializer = self.get_serializer(queryset, many=True)
-                return Response(serializer.data)
+                return Response(self.get_values_data(queryset))
+
+            people = employee_people(self.get_people_queryset())
+            records = with_archived(self.get_values_data(queryset), 'employee', people, start_date, end_date)
+            if exceptions_mode():
+                # Only exceptions are stored, fill in the implicit 'Present' days
+                records = expand_rows(
+                    records, people, start_date, end_date, 'employee',
+                    default_row=employee_default_row,
+                )
+            return Response(records)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def by_employee(self, request):
-        """Get attendance records for a specific employee"""
+        """
+        Get attendance records for a specific employee.
+        In exceptions mode the implicit 'Present' days from the joining date
+        (or 'start_date') to today (or 'end_date') are included.
+        """
         employee_id = request.query_params.get('employee_id')
         if not employee_id:
             return Response(
@@ -1217,8 +1518,23 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
             )
         
         queryset = self.get_queryset().filter(employee__employee_id=employee_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        people = employee_people(self.get_people_queryset().filter(employee_id=employee_id))
+        if not exceptions_mode():
+            return Response(with_archived(self.get_values_data(queryset), 'employee', people))
+
+        if not people:
+            return Response([])
+        try:
+            start_date, end_date = parse_date_range(request.query_params, people[0]['since'], local_today())
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        records = self.get_values_data(queryset.filter(date__range=(start_date, end_date)))
+        records = with_archived(records, 'employee', people, start_date, end_date)
+        return Response(expand_rows(
+            records, people, start_date, end_date, 'employee',
+            default_row=employee_default_row,
+        ))
 
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
@@ -1279,7 +1595,7 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
                     # Update existing record
                     attendance.status = status_value
                     attendance.updated_by = request.user
-                    attendance.save(update_fields=['status', 'updated_by'])
+                    attendance.save(update_fields=['status', 'updated_by', 'updated_at'])
                 
                 results.append({
                     'success': True,
@@ -1302,9 +1618,10 @@ class EmployeeAttendanceViewSet(viewsets.ModelViewSet):
         })
 
 
-class StudentAttendanceViewSet(viewsets.ModelViewSet):
+class StudentAttendanceViewSet(ChangeFeedMixin, ConditionalGetMixin, ValuesListMixin, AutoRelatedMixin, viewsets.ModelViewSet):
     queryset = StudentAttendance.objects.all()
     serializer_class = StudentAttendanceSerializer
+    values_serializer_class = StudentAttendanceValuesSerializer
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -1338,6 +1655,17 @@ class StudentAttendanceViewSet(viewsets.ModelViewSet):
         
         # Others can't see any records
         return StudentAttendance.objects.none()
+
+    def get_people_queryset(self):
+        """Students whose attendance the user can see"""
+        user = self.request.user
+        if user.role == 'SuperAdmin':
+            return Student.objects.all()
+        if user.role == 'BranchManager' and hasattr(user, 'employee_profile'):
+            return Student.objects.filter(branch=user.employee_profile.branch)
+        if user.role == 'Student' and hasattr(user, 'student_profile'):
+            return Student.objects.filter(pk=user.student_profile.pk)
+        return Student.objects.none()
     
     @action(detail=False, methods=['get'])
     def by_date(self, request):
@@ -1345,90 +1673,45 @@ class StudentAttendanceViewSet(viewsets.ModelViewSet):
         Get attendance records for a specific date or date range.
         For a date range, return a record for every student for every date in the range.
         If a real attendance record exists, use it; otherwise, return a placeholder (e.g., status: 'Not Marked').
+        In exceptions mode working days without a record are returned as 'Present'.
         If no date or range is provided, return all records.
         """
-        from datetime import datetime, timedelta
+        from datetime import datetime
         start_date_str = request.query_params.get('start_date')
         end_date_str = request.query_params.get('end_date')
         date_str = request.query_params.get('date')
 
         try:
-            user = self.request.user
-            # Get students in scope
-            if user.role == 'SuperAdmin':
-                students = Student.objects.select_related('user', 'branch').all()
-            elif user.role == 'BranchManager' and hasattr(user, 'employee_profile'):
-                user_branch = user.employee_profile.branch
-                students = Student.objects.select_related('user', 'branch').filter(branch=user_branch)
-            elif user.role == 'Student' and hasattr(user, 'student_profile'):
-                students = [user.student_profile]
-            else:
-                students = []
-
             if start_date_str and end_date_str:
                 start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
                 end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                delta = (end_date - start_date).days
-                all_records = []
-                for i in range(delta + 1):
-                    current_date = start_date + timedelta(days=i)
-                    # Get all attendance records for this date
-                    records = {rec.student_id: rec for rec in self.get_queryset().filter(date=current_date)}
-                    for student in students:
-                        if student.id in records:
-                            # Use real record
-                            rec = records[student.id]
-                            serializer = self.get_serializer(rec)
-                            all_records.append(serializer.data)
-                        else:
-                            # Placeholder
-                            all_records.append({
-                                'id': None,
-                                'student': student.id,
-                                'student_name': f"{student.user.first_name} {student.user.last_name}",
-                                'student_id': student.student_id,
-                                'branch_name': student.branch.name,
-                                'date': current_date,
-                                'time_in': None,
-                                'time_out': None,
-                                'status': 'Not Marked',
-                                'remarks': None
-                            })
-                return Response(all_records)
             elif date_str:
-                date = datetime.strptime(date_str, '%Y-%m-%d').date()
-                records = {rec.student_id: rec for rec in self.get_queryset().filter(date=date)}
-                all_records = []
-                for student in students:
-                    if student.id in records:
-                        rec = records[student.id]
-                        serializer = self.get_serializer(rec)
-                        all_records.append(serializer.data)
-                    else:
-                        all_records.append({
-                            'id': None,
-                            'student': student.id,
-                            'student_name': f"{student.user.first_name} {student.user.last_name}",
-                            'student_id': student.student_id,
-                            'branch_name': student.branch.name,
-                            'date': date,
-                            'time_in': None,
-                            'time_out': None,
-                            'status': 'Not Marked',
-                            'remarks': None
-                        })
-                return Response(all_records)
+                start_date = end_date = datetime.strptime(date_str, '%Y-%m-%d').date()
             else:
                 # Return all records if no date or range is provided
-                queryset = self.get_queryset().all()
-                serializer = self.get_serializer(queryset, many=True)
-                return Response(serializer.data)
+                return Response(self.get_values_data(self.get_queryset().all()))
+
+            # Load the whole range in one query, the rest is filled in memory
+            queryset = self.get_queryset().filter(date__range=(start_date, end_date))
+            people = student_people(self.get_people_queryset())
+            records = with_archived(self.get_values_data(queryset), 'student', people, start_date, end_date)
+            all_records = expand_rows(
+                records, people, start_date, end_date, 'student',
+                default_row=student_default_row if exceptions_mode() else None,
+                missing_row=student_placeholder_row,
+                newest_first=False,
+            )
+            return Response(all_records)
         except Exception as e:
             return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
     def by_student(self, request):
-        """Get attendance records for a specific student"""
+        """
+        Get attendance records for a specific student.
+        In exceptions mode the implicit 'Present' days from the enrollment date
+        (or 'start_date') to today (or 'end_date') are included.
+        """
         student_id = request.query_params.get('student_id')
         if not student_id:
             return Response(
@@ -1437,8 +1720,23 @@ class StudentAttendanceViewSet(viewsets.ModelViewSet):
             )
         
         queryset = self.get_queryset().filter(student__student_id=student_id)
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        people = student_people(self.get_people_queryset().filter(student_id=student_id))
+        if not exceptions_mode():
+            return Response(with_archived(self.get_values_data(queryset), 'student', people))
+
+        if not people:
+            return Response([])
+        try:
+            start_date, end_date = parse_date_range(request.query_params, people[0]['since'], local_today())
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        records = self.get_values_data(queryset.filter(date__range=(start_date, end_date)))
+        records = with_archived(records, 'student', people, start_date, end_date)
+        return Response(expand_rows(
+            records, people, start_date, end_date, 'student',
+            default_row=student_default_row,
+        ))
     
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
@@ -1499,7 +1797,7 @@ class StudentAttendanceViewSet(viewsets.ModelViewSet):
                     # Update existing record
                     attendance.status = status_value
                     attendance.updated_by = request.user
-                    attendance.save(update_fields=['status', 'updated_by'])
+                    attendance.save(update_fields=['status', 'updated_by', 'updated_at'])
                 
                 results.append({
                     'success': True,
@@ -1522,29 +1820,116 @@ class StudentAttendanceViewSet(viewsets.ModelViewSet):
         })
 
 
+class AttendanceCheckView(APIView):
+    """
+    Employees and students check themselves in or out for today.
+    The time is the server's clock in the branch's time zone.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    event = None
+
+    def post(self, request):
+        person = get_checkin_person(request.user)
+        if person is None:
+            return Response({"detail": "Employee or student profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        model, person_field, person_id, tz = person
+        now = branch_now(tz)
+        record = record_check(model, person_field, person_id, now.date(), now.time(), self.event, request.user)
+        return Response({
+            'id': record['id'],
+            person_field: person_id,
+            'event': self.event,
+            'date': record['date'],
+            'time_in': record['time_in'],
+            'time_out': record['time_out'],
+            'status': record['status'],
+        })
+
+
+class KioskSyncView(APIView):
+    """
+    Offline front desk kiosks upload their queued attendance events and
+    download the roster and today's attendance in one round trip.
+    See api.kiosk_sync for the protocol.
+    """
+    permission_classes = [IsSuperAdmin | IsBranchManager | IsReceptionist]
+
+    def post(self, request):
+        name = request.data.get('kiosk')
+        if not name:
+            return Response({"detail": "Kiosk name is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.user.role == 'SuperAdmin':
+            branch_id = request.data.get('branch')
+            if not branch_id or not Branch.objects.filter(pk=branch_id).exists():
+                return Response({"detail": "A valid branch is required."}, status=status.HTTP_400_BAD_REQUEST)
+        elif hasattr(request.user, 'employee_profile'):
+            branch_id = request.user.employee_profile.branch_id
+        else:
+            return Response({"detail": "Employee profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        kiosk, _ = Kiosk.objects.get_or_create(branch_id=branch_id, name=name)
+        try:
+            return Response(kiosk_sync(kiosk, request.data, request.user))
+        except SyncError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class AttendanceAnalyticsView(APIView):
+    """
+    Attendance rates, absence streaks, weekday patterns and late arrival
+    trends of a branch's students (?type=student) or employees
+    (?type=employee) from start_date to end_date, the last 90 days by
+    default. SuperAdmins pass ?branch=. See api.analytics.
+    """
+    permission_classes = [IsSuperAdmin | IsBranchManager]
+
+    def get(self, request):
+        kind = request.query_params.get('type', 'student')
+        if kind not in ANALYTICS_KINDS:
+            return Response({"detail": "type must be 'student' or 'employee'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.user.role == 'SuperAdmin':
+            branch_id = request.query_params.get('branch')
+            if not branch_id or not branch_id.isdigit() or not Branch.objects.filter(pk=branch_id).exists():
+                return Response({"detail": "A valid branch is required."}, status=status.HTTP_400_BAD_REQUEST)
+            branch_id = int(branch_id)
+        elif hasattr(request.user, 'employee_profile'):
+            branch_id = request.user.employee_profile.branch_id
+        else:
+            return Response({"detail": "Employee profile not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        today = local_today()
+        try:
+            start, end = parse_date_range(request.query_params, today - timedelta(days=89), today)
+        except ValueError:
+            return Response({"detail": "Dates must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if start > end or (end - start).days >= ATTENDANCE_ANALYTICS_MAX_DAYS:
+            return Response(
+                {"detail": f"start_date must be before end_date and at most {ATTENDANCE_ANALYTICS_MAX_DAYS} days apart."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(branch_analytics(branch_id, kind, start, end))
+
 class ActivityLogPagination(PageNumberPagination):
     """Custom pagination class for activity logs"""
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+class ActivityLogViewSet(ChangeFeedMixin, ConditionalGetMixin, ValuesListMixin, AutoRelatedMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing activity logs"""
     queryset = ActivityLog.objects.all()
     serializer_class = ActivityLogSerializer
+    values_serializer_class = ActivityLogValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsSuperAdmin]
     pagination_class = ActivityLogPagination
+    timestamp_field = 'created_at'
     
     def get_queryset(self):
         # Only SuperAdmin can see all logs
         if self.request.user.role == 'SuperAdmin':
-            # Clean old logs (older than 1 day)
-            from django.utils import timezone
-            from datetime import timedelta
-            cutoff_date = timezone.now() - timedelta(days=1)
-            ActivityLog.objects.filter(created_at__lt=cutoff_date).delete()
-            
-            # Get remaining logs
+            # Old logs are removed by the 'logs.clean' task
             queryset = ActivityLog.objects.all().order_by('-created_at')
             
             # Filter by user role if specified
@@ -1571,9 +1956,163 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'])
     def all(self, request):
         """Get all activity logs without pagination"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.get_values_data(self.get_queryset()))
+
+
+async def activity_log_stream(request):
+    """
+    New activity logs as Server-Sent Events, for SuperAdmins.
+    GET accepts a stream link's ?token= and the 'role' and 'action_type'
+    filters. POST with the access token returns a new stream link.
+    """
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+    user = await sync_to_async(stream_user)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    if user.role != 'SuperAdmin':
+        return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+    if request.method == 'POST':
+        url = request.build_absolute_uri(reverse('activity-log-stream'))
+        return JsonResponse({
+            'url': f'{url}?token={make_stream_token(user)}', 'expires_in': ACTIVITY_STREAM_TOKEN_MAX_AGE,
+        })
+
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    filters = {'user_role': request.GET.get('role'), 'action_type': request.GET.get('action_type')}
+    response = StreamingHttpResponse(
+        event_stream(filters, int(last_id) if last_id and last_id.isdigit() else None),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Keeps nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+# Authenticated by the Authorization header or a signed link, never by cookies.
+# Set directly, csrf_exempt() does not keep a view async before Django 5.0.
+activity_log_stream.csrf_exempt = True
+
+def first_page(viewset_class, request):
+    """The first BOOTSTRAP_PAGE_SIZE rows of a viewset's list response, with the total count"""
+    viewset = viewset_class(request=request, action='list', format_kwarg=None, args=(), kwargs={})
+    viewset.check_permissions(request)
+    queryset = viewset.filter_queryset(viewset.get_queryset())
+    page = queryset[:BOOTSTRAP_PAGE_SIZE]
+    if getattr(viewset, 'values_serializer_class', None) is not None:
+        results = viewset.get_values_data(page)
+    else:
+        results = viewset.get_serializer(page, many=True).data
+    return {'count': queryset.count(), 'results': results}
+
+
+def user_branch_data(user, context):
+    """The branch of an employee or student, None for other users"""
+    profile = getattr(user, 'employee_profile', None) or getattr(user, 'student_profile', None)
+    if profile is None:
+        return None
+    return BranchSerializer(profile.branch, context=context).data
+
+
+# Stats of each role's dashboard
+BOOTSTRAP_STATS = {
+    'SuperAdmin': admin_stats_data,
+    'BranchManager': branch_manager_stats_data,
+    'Counsellor': counsellor_stats_data,
+    'Receptionist': receptionist_stats_data,
+    'BankManager': bank_manager_stats_data,
+}
+# Models the stats read, saving one misses the cached stats
+STATS_MODELS = (Branch, Employee, Student, Lead, Job)
+
+# Lists each role's dashboard opens with, as (name, viewset)
+BOOTSTRAP_LISTS = {
+    'SuperAdmin': [
+        ('branches', BranchViewSet),
+        ('activity_logs', ActivityLogViewSet),
+    ],
+    'BranchManager': [
+        ('employees', EmployeeViewSet),
+        ('students', StudentViewSet),
+        ('leads', LeadViewSet),
+    ],
+    'Counsellor': [
+        ('students', StudentViewSet),
+        ('leads', LeadViewSet),
+    ],
+    'Receptionist': [
+        ('leads', LeadViewSet),
+        ('students', StudentViewSet),
+    ],
+    'Student': [
+        ('jobs', JobViewSet),
+        ('blogs', BlogViewSet),
+    ],
+}
+# Logs are written on almost every request, not worth caching
+UNCACHED_LISTS = {'activity_logs'}
+
+
+def list_models(viewset_class, user):
+    """
+    Models a viewset's list is built from: the viewset's own, the ones its
+    serializer reads through relations, its cache_models, and the profile
+    the list is scoped to the requester's branch by.
+    """
+    serializer_class = viewset_class.serializer_class
+    models = get_related_models(serializer_class(), serializer_class.Meta.model)
+    models |= {viewset_class.queryset.model, *getattr(viewset_class, 'cache_models', ())}
+    models.add(Student if user.role == 'Student' else Employee)
+    return tuple(sorted(models, key=lambda model: model._meta.label))
+
+
+class BootstrapView(APIView):
+    """
+    Everything a dashboard needs to open, in one response: the current user,
+    their branch, the stats of their role and the first page of their
+    role's lists. ?sections= (e.g. "stats,leads") limits it to some of them.
+    Sections are built concurrently and cached separately, see api.bootstrap.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        user = request.user
+        context = {'request': request}
+        sections = {
+            'user': (lambda: UserSerializer(user, context=context).data, (User,)),
+            'branch': (lambda: user_branch_data(user, context), (Branch, Employee, Student)),
+        }
+        if user.role in BOOTSTRAP_STATS:
+            sections['stats'] = (lambda: BOOTSTRAP_STATS[user.role](user), STATS_MODELS)
+        list_names = []
+        for name, viewset_class in BOOTSTRAP_LISTS.get(user.role, []):
+            models = None if name in UNCACHED_LISTS else list_models(viewset_class, user)
+            sections[name] = (lambda viewset_class=viewset_class: first_page(viewset_class, request), models)
+            list_names.append(name)
+
+        if request.query_params.get('sections'):
+            wanted = {name.strip() for name in request.query_params['sections'].split(',')}
+            sections = {name: section for name, section in sections.items() if name in wanted}
+
+        data, errors = build_sections(sections, user)
+        response = {name: data[name] for name in ('user', 'branch', 'stats') if name in data}
+        response['lists'] = {name: data[name] for name in list_names if name in data}
+        response['errors'] = errors
+        return Response(response)
+
+class BatchView(APIView):
+    """
+    Several API reads in one request: {"requests": [path, ...]} returns
+    {"responses": {path: {"status", "body"}}}. Each read goes through its
+    own view and permissions, see api.batch.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        try:
+            return Response({'responses': run_batch(request, request.data.get('requests'))})
+        except BatchError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = User.EMAIL_FIELD
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+Compare the ModelSerializer and .values() based read paths for attendance
+and activity log lists.
+
+Synthetic rows are created inside a transaction that is rolled back at the
+end, so the script can be pointed at any database.
+Run it with: python scripts/benchmark_attendance_serializers.py --days 60
+"""
+import os
+import sys
+import time
+import json
+import argparse
+from datetime import date, timedelta
+
+import django
+
+# Set up Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admin_bridge.settings')
+django.setup()
+
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from api.models import User, Branch, Employee, EmployeeAttendance, ActivityLog
+from api.serializers import EmployeeAttendanceSerializer, ActivityLogSerializer
+from api.fast_serializers import EmployeeAttendanceValuesSerializer, ActivityLogValuesSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+def create_rows(employees, days):
+    branch = Branch.objects.create(name='Benchmark Branch', address='Benchmark')
+    people = []
+    for i in range(employees):
+        user = User.objects.create(
+            email=f'benchmark-{i}@example.com', first_name='Bench', last_name=f'Mark {i}',
+            role='Counsellor', password='!'
+        )
+        people.append(Employee.objects.create(
+            user=user, branch=branch, employee_id=f'BENCH{i:06d}',
+            contact_number='0000000000', address='Benchmark'
+        ))
+
+    start = date.today() - timedelta(days=days)
+    EmployeeAttendance.objects.bulk_create([
+        EmployeeAttendance(employee=employee, date=start + timedelta(days=day), status='Present')
+        for employee in people
+        for day in range(days)
+    ], batch_size=1000)
+    ActivityLog.objects.bulk_create([
+        ActivityLog(user=employee.user, action_type='UPDATE', action_model='STUDENTS',
+                    action_details='Benchmark entry', ip_address='127.0.0.1')
+        for employee in people
+        for _ in range(days)
+    ], batch_size=1000)
+    return branch
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def compare(name, queryset, serializer_class, values_serializer_class):
+    model_seconds, model_data = timed(
+        lambda: serializer_class(queryset.all(), many=True).data
+    )
+    values_seconds, values_data = timed(
+        lambda: values_serializer_class(values_serializer_class.prepare(queryset.all())).data
+    )
+
+    renderer = JSONRenderer()
+    identical = renderer.render(model_data) == renderer.render(values_data)
+    rows = len(values_data) or 1
+    print(f'\n{name}: {len(values_data)} rows, identical JSON: {identical}')
+    print(f'  ModelSerializer : {model_seconds * 1000:9.1f} ms  {model_seconds / rows * 1e6:7.1f} us/row')
+    print(f'  values()        : {values_seconds * 1000:9.1f} ms  {values_seconds / rows * 1e6:7.1f} us/row')
+    print(f'  speedup         : {model_seconds / values_seconds:9.1f}x')
+    if not identical:
+        print(json.dumps(model_data[:1], default=str))
+        print(json.dumps(values_data[:1], default=str))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--employees', type=int, default=100)
+    parser.add_argument('--days', type=int, default=60)
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic():
+            branch = create_rows(args.employees, args.days)
+            compare(
+                'employee attendance',
+                EmployeeAttendance.objects.filter(employee__branch=branch).select_related(
+                    'employee', 'employee__user', 'employee__branch'
+                ),
+                EmployeeAttendanceSerializer, EmployeeAttendanceValuesSerializer,
+            )
+            compare(
+                'activity logs',
+                ActivityLog.objects.filter(user__employee_profile__branch=branch).select_related('user'),
+                ActivityLogSerializer, ActivityLogValuesSerializer,
+            )
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Benchmark the API renderers on payloads shaped like the largest list responses
+(attendance ranges and activity logs).
+
+Measures render time and bytes on the wire, raw and compressed.
+Run it with: python scripts/benchmark_renderers.py --rows 20000
+"""
+import os
+import sys
+import time
+import gzip
+import argparse
+from datetime import date, time as dtime, timedelta
+
+import django
+
+# Set up Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admin_bridge.settings')
+django.setup()
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnList
+from api.renderers import FastJSONRenderer, MessagePackRenderer, orjson, msgpack
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def attendance_rows(count):
+    """Rows shaped like EmployeeAttendanceSerializer output"""
+    start = date.today() - timedelta(days=365)
+    now = timezone.now()
+    return ReturnList([
+        {
+            'id': i,
+            'employee': i % 500,
+            'employee_name': f'Employee {i % 500}',
+            'employee_role': 'Counsellor',
+            'employee_id': f'EMP{i % 500:08d}',
+            'branch_name': 'Kathmandu Main Branch',
+            'date': (start + timedelta(days=i % 365)).isoformat(),
+            'time_in': dtime(9, 0).isoformat(),
+            'time_out': dtime(17, 0).isoformat(),
+            'status': 'Present',
+            'remarks': None,
+            'created_by': 1,
+            'updated_by': None,
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat(),
+        }
+        for i in range(count)
+    ], serializer=None)
+
+
+def activity_log_rows(count):
+    """Rows shaped like ActivityLogSerializer output"""
+    now = timezone.now()
+    return ReturnList([
+        {
+            'id': i,
+            'user': i % 50,
+            'user_name': f'User {i % 50}',
+            'user_role': 'BranchManager',
+            'action_type': 'UPDATE',
+            'action_model': 'STUDENTS',
+            'action_details': f'User {i % 50} updated student details',
+            'ip_address': '127.0.0.1',
+            'created_at': now.isoformat(),
+        }
+        for i in range(count)
+    ], serializer=None)
+
+
+def measure(renderer, data, repeat):
+    """Return (best render seconds, rendered bytes)"""
+    best = None
+    content = b''
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = renderer.render(data, renderer.media_type, {})
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, content
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    renderers = [('json (stdlib)', JSONRenderer())]
+    if orjson is not None:
+        renderers.append(('json (orjson)', FastJSONRenderer()))
+    else:
+        print('orjson is not installed, FastJSONRenderer uses the stdlib')
+    if msgpack is not None:
+        renderers.append(('msgpack', MessagePackRenderer()))
+
+    for name, data in [('attendance', attendance_rows(args.rows)),
+                       ('activity logs', activity_log_rows(args.rows))]:
+        print(f'\n{name}: {args.rows} rows')
+        print(f"{'renderer':<16}{'render ms':>12}{'raw KB':>12}{'gzip KB':>12}{'br KB':>12}")
+        for renderer_name, renderer in renderers:
+            seconds, content = measure(renderer, data, args.repeat)
+            gzip_size = len(gzip.compress(content, compresslevel=6))
+            br_size = len(brotli.compress(content, quality=5)) if brotli else None
+            print(
+                f'{renderer_name:<16}{seconds * 1000:>12.1f}{len(content) / 1024:>12.1f}'
+                f'{gzip_size / 1024:>12.1f}'
+                f"{(br_size / 1024 if br_size else float('nan')):>12.1f}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Concurrency load test for the self-service check-in endpoint.
+
+Creates a branch of synthetic employees and has them check in at once from
+a thread pool, each thread with its own database connection, like a branch
+opening in the morning. Two phases:
+
+  rush  - every employee POSTs /api/attendance/check-in/ once; reports
+          throughput, latency percentiles and errors
+  race  - every employee sends --events check-ins and check-outs with
+          random times at once; verifies there is one row per employee
+          holding the earliest check-in and the latest check-out
+
+Runs against the configured database (PostgreSQL), or a SQLite file with
+--sqlite, which is migrated first. The synthetic rows are deleted at the end.
+Run it with: python scripts/load_test_checkin.py --employees 500 --threads 50
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import time as dtime
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+# Set up Django environment
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'admin_bridge.settings')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--employees', type=int, default=300)
+    parser.add_argument('--threads', type=int, default=50)
+    parser.add_argument('--events', type=int, default=6, help='Concurrent events per employee in the race phase')
+    parser.add_argument('--sqlite', metavar='FILE', help='Use a SQLite database file instead of the configured one')
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.sqlite:
+    from django.conf import settings
+    settings.DATABASES = {'default': {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': args.sqlite,
+        # Writers queue on the database lock instead of failing at once
+        'OPTIONS': {'timeout': 30},
+    }}
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+from api.models import User, Branch, Employee, EmployeeAttendance
+from api.checkin import record_check
+
+settings.ALLOWED_HOSTS = ['*']
+
+
+def create_employees(count):
+    branch = Branch.objects.create(name='Check-in Load Test', address='Load test')
+    User.objects.bulk_create([
+        User(email=f'checkin-load-{i}@example.com', first_name='Load', last_name=f'Test {i}',
+             role='Counsellor', password='!')
+        for i in range(count)
+    ])
+    users = list(User.objects.filter(email__startswith='checkin-load-'))
+    Employee.objects.bulk_create([
+        Employee(user=user, branch=branch, employee_id=f'LOAD{i:06d}',
+                 contact_number='0000000000', address='Load test')
+        for i, user in enumerate(users)
+    ])
+    return branch, list(Employee.objects.filter(branch=branch).select_related('user'))
+
+
+def in_thread(func):
+    """Run `func` with the thread's own connection, closed afterwards"""
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+    return run
+
+
+@in_thread
+def check_in(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    started = time.perf_counter()
+    response = client.post('/api/attendance/check-in/')
+    return time.perf_counter() - started, response.status_code
+
+
+@in_thread
+def random_event(employee, day, rng_seed):
+    rng = random.Random(rng_seed)
+    event = rng.choice(('in', 'out'))
+    at = dtime(rng.randint(6, 20), rng.randint(0, 59), rng.randint(0, 59))
+    record_check(EmployeeAttendance, 'employee', employee.pk, day, at, event, employee.user)
+    return employee.pk, event, at
+
+
+def rush(employees, threads):
+    with ThreadPoolExecutor(threads) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(check_in, [employee.user for employee in employees]))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = [code for _, code in results if code != 200]
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f'\nrush: {len(results)} check-ins from {threads} threads in {elapsed:.2f} s')
+    print(f'  throughput : {len(results) / elapsed:8.1f} check-ins/s')
+    print(f'  latency    : p50 {percentile(0.5):.1f} ms  p95 {percentile(0.95):.1f} ms  max {latencies[-1] * 1000:.1f} ms')
+    print(f'  errors     : {len(errors)} {sorted(set(errors)) if errors else ""}')
+    return not errors
+
+
+def race(employees, threads, events):
+    # A date of its own, so rows from the rush phase do not interfere
+    day = timezone.localdate().replace(year=2000)
+    jobs = [(employee, day, i * 1000 + n) for i, employee in enumerate(employees) for n in range(events)]
+    random.shuffle(jobs)
+    with ThreadPoolExecutor(threads) as pool:
+        started = time.perf_counter()
+        sent = list(pool.map(lambda job: random_event(*job), jobs))
+        elapsed = time.perf_counter() - started
+
+    expected = {}
+    for person_id, event, at in sent:
+        time_in, time_out = expected.get(person_id, (None, None))
+        if event == 'in':
+            time_in = min(filter(None, (time_in, at)))
+        else:
+            time_out = max(filter(None, (time_out, at)))
+        expected[person_id] = (time_in, time_out)
+
+    rows = list(EmployeeAttendance.objects.filter(
+        employee__in=employees, date=day
+    ).values_list('employee_id', 'time_in', 'time_out'))
+    wrong = [row for row in rows if expected.get(row[0]) != (row[1], row[2])]
+    print(f'\nrace: {len(jobs)} events for {len(employees)} employees in {elapsed:.2f} s '
+          f'({len(jobs) / elapsed:.1f} events/s)')
+    print(f'  rows       : {len(rows)} (expected {len(expected)})')
+    print(f'  mismatches : {len(wrong)}')
+    return len(rows) == len(expected) and not wrong
+
+
+def main():
+    print(f'database: {connection.vendor} ({connection.settings_dict["NAME"]})')
+    if args.sqlite:
+        call_command('migrate', verbosity=0)
+
+    branch, employees = create_employees(args.employees)
+    try:
+        ok = rush(employees, args.threads)
+        ok = race(employees, args.threads, args.events) and ok
+    finally:
+        EmployeeAttendance.objects.filter(employee__branch=branch).delete()
+        User.objects.filter(email__startswith='checkin-load-').delete()
+        branch.delete()
+    print('\nOK' if ok else '\nFAILED')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,54 @@
 #!/usr/bin/env python
 """
 This script sets the default password to "Nepal@123" for all users except SuperAdmin.
-Run it with: python manage.py shell < scripts/set_default_passwords.py
+It uses the same engine as `python manage.py reset_passwords`.
+Run it with: python scripts/set_default_passwords.py [--dry-run] [--workers N] [--shared-hash]
 """
 import os
 import sys
+import argparse
+
 import django
 
 # Set up Django environment
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "adminbridge.settings")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "admin_bridge.settings")
 django.setup()
 
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 
+from api.passwords import DEFAULT_PASSWORD, reset_passwords, ProgressPrinter
+
 User = get_user_model()
 
-# Set default password for all non-SuperAdmin users
-default_password = "Nepal@123"
-users = User.objects.filter(~Q(role="SuperAdmin"))
 
-count = 0
-for user in users:
-    user.set_password(default_password)
-    user.save()
-    count += 1
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--shared-hash', action='store_true')
+    args = parser.parse_args()
+
+    # Set default password for all non-SuperAdmin users
+    users = User.objects.filter(~Q(role="SuperAdmin"))
+    count = reset_passwords(
+        users,
+        password=DEFAULT_PASSWORD,
+        salt_batch_size=None if args.shared_hash else 1,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+        progress=ProgressPrinter(print),
+    )
+
+    if args.dry_run:
+        print(f"Dry run: would reset passwords for {count} users.")
+        return
+    print(f"Successfully reset passwords for {count} users to the default password.")
+    print("Users can now log in with their email address and the default password.")
+
 
-print(f"Successfully reset passwords for {count} users to the default password.")
-print("Users can now log in with their email address and the default password.") 
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { XMarkIcon, ArrowUpTrayIcon, CheckCircleIcon, ExclamationCircleIcon } from '@heroicons/react/24/outline';
 import axios from 'axios';
+import { openProtectedMedia } from '../lib/api';
 import toast from 'react-hot-toast';
 import { useAuth } from '../lib/AuthContext';
 
@@ -46,7 +47,7 @@ const FileUpload = ({ id, label, accept, value, onChange, error, existingFile })
           <CheckCircleIcon className="h-5 w-5 text-green-500" />
           <span>Existing file</span>
           {typeof existingFile === 'string' && (
-            <a href={existingFile} target="_blank" rel="noopener noreferrer" className="text-blue-600 hover:underline">
+            <a href={existingFile} onClick={(e) => openProtectedMedia(existingFile, e)} target="_blank" rel="noopener noreferrer" className="text-blue-600 hover:underline">
               View
             </a>
           )}
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { XMarkIcon, ArrowUpTrayIcon, CheckCircleIcon, ExclamationCircleIcon } from '@heroicons/react/24/outline';
 import axios from 'axios';
+import { openProtectedMedia } from '../lib/api';
 
 const FormField = ({ label, error, children, required }) => (
   <div>
@@ -35,7 +36,7 @@ const FileUpload = ({ id, label, accept, value, onChange, error, existingFile })
           <CheckCircleIcon className="h-5 w-5 text-green-500" />
           <span>Existing file</span>
           {typeof existingFile === 'string' && (
-            <a href={existingFile} target="_blank" rel="noopener noreferrer" className="text-blue-600 hover:underline">View</a>
+            <a href={existingFile} onClick={(e) => openProtectedMedia(existingFile, e)} target="_blank" rel="noopener noreferrer" className="text-blue-600 hover:underline">View</a>
           )}
         </div>
       ) : null}
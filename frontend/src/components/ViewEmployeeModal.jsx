@@ -1,5 +1,6 @@
 import React from 'react';
 import { XMarkIcon, ArrowTopRightOnSquareIcon } from '@heroicons/react/24/outline';
+import { openProtectedMedia } from '../lib/api';
 
 const BACKEND_URL = 'http://localhost:8000';
 const getFullUrl = (url) => {
@@ -15,6 +16,7 @@ const DetailsItem = ({ label, value, isLink }) => (
       {isLink && value ? (
         <a 
           href={value} 
+          onClick={(e) => openProtectedMedia(value, e)}
           target="_blank" 
           rel="noopener noreferrer"
           className="text-blue-600 hover:text-blue-800 flex items-center"
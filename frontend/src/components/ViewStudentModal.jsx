@@ -1,5 +1,6 @@
 import React from 'react';
 import { XMarkIcon, DocumentTextIcon, DocumentArrowDownIcon } from '@heroicons/react/24/outline';
+import { openProtectedMedia } from '../lib/api';
 
 const InfoSection = ({ title, children }) => (
   <div className="space-y-4">
@@ -150,6 +151,7 @@ const ViewStudentModal = ({ isOpen, onClose, student }) => {
                     </div>
                     <a 
                       href={student.cv}
+                      onClick={(e) => openProtectedMedia(student.cv, e)}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="inline-flex items-center justify-center px-4 py-2 border border-transparent text-sm font-medium rounded-md text-white bg-[#1e1b4b] hover:bg-[#1e1b4b]/90 focus:outline-none focus:ring-2 focus:ring-offset-2 focus:ring-[#1e1b4b] transition-colors"
@@ -113,6 +113,26 @@ export const userAPI = {
     api.delete(`/users/${id}/`),
 };
 
+// Resumes and documents are served by /api/media/ after a permission check.
+// Links the browser opens itself cannot send the Authorization header, so a
+// short-lived link for that one document is requested first. Use as the
+// onClick of a link to the document, or call it directly.
+export const openProtectedMedia = (url: string | null | undefined, event?: { preventDefault: () => void }) => {
+  if (!url || !url.includes('/api/media/')) return;
+  event?.preventDefault();
+  // Opened by the click itself, popup blockers refuse windows opened later
+  const documentWindow = window.open('', '_blank');
+  if (documentWindow) documentWindow.opener = null;
+  api.post(url)
+    .then((response) => {
+      if (documentWindow) documentWindow.location.href = response.data.url;
+    })
+    .catch((error) => {
+      console.error('Error opening document:', error);
+      documentWindow?.close();
+    });
+};
+
 // Employee API
 export const employeeAPI = {
   getAll: () => 
@@ -153,7 +173,8 @@ export const studentAPI = {
 export const leadAPI = {
   getAll: () => {
     console.log('Fetching all leads');
-    return api.get('/leads/');
+    // Notes are left out of lists unless included, the export needs them
+    return api.get('/leads/?include=notes');
   },
   
   getById: (id: number) => 
@@ -182,7 +203,7 @@ export const jobAPI = {
     
   getActive: () => {
     const token = localStorage.getItem('access_token');
-    return api.get('/jobs/?is_active=true&ordering=-created_at', {
+    return api.get('/jobs/?is_active=true&ordering=-created_at&include=description', {
       headers: {
         Authorization: `Bearer ${token}`
       }
@@ -294,11 +315,12 @@ export const branchAPI = {
 
 // Blog API
 export const blogAPI = {
-  getAll: () => 
-    api.get('/blogs/'),
+  // Lists leave out the full content, pass include='content' where rows are edited
+  getAll: (include?: string) => 
+    api.get(`/blogs/${include ? `?include=${include}` : ''}`),
     
-  getPublished: () => 
-    api.get('/blogs/?status=published&ordering=-published_date'),
+  getPublished: (include?: string) => 
+    api.get(`/blogs/?status=published&ordering=-published_date${include ? `&include=${include}` : ''}`),
   
   getById: (id: number) => 
     api.get(`/blogs/${id}/`),
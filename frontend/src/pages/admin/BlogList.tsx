@@ -28,6 +28,7 @@ interface ApiBlog {
   id: number;
   title: string;
   content: string;
+  excerpt: string;
   featured_image: string | null;
   branch: number;
   branch_name: string;
@@ -47,6 +48,7 @@ interface Blog {
   id: number;
   title: string;
   content: string;
+  excerpt: string;
   thumbnail_image: string | null;
   branch: number;
   branch_name: string;
@@ -130,7 +132,7 @@ const BlogList = () => {
       setError('');
       
       // Make API call
-      const response = await blogAPI.getAll();
+      const response = await blogAPI.getAll('content');
       
       setBlogs(response.data);
       setLoading(false);
@@ -439,7 +441,7 @@ const BlogList = () => {
                   <div className="p-4">
                     <h3 className="font-semibold text-lg text-gray-800 mb-2 line-clamp-1">{blog.title}</h3>
                     <p className="text-gray-600 text-sm mb-4 line-clamp-2">
-                      {truncateText(blog.content, 100)}
+                      {truncateText(blog.excerpt, 100)}
                     </p>
                     
                     <div className="space-y-2 text-sm text-gray-500 mb-4">
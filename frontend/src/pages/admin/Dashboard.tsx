@@ -141,13 +141,54 @@ const AdminDashboard = () => {
     // Set up interval to refresh data every 5 minutes (300000 ms)
     const intervalId = setInterval(() => {
       fetchStats();
-      fetchAllActivityLogs();
     }, 300000);
+
+    // New activity logs are pushed by the server instead of polled. The stream
+    // is opened through a short-lived link, asked for again once it is refused.
+    let logStream: EventSource | null = null;
+    let lastEventId = '';
+    let reopenTimer: ReturnType<typeof setTimeout> | undefined;
+    let unmounted = false;
+    const openLogStream = async () => {
+      try {
+        const response = await axios.post(`${API_BASE_URL}/activity-logs/stream/`, null, {
+          headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` }
+        });
+        if (unmounted) return;
+        const url: string = response.data.url;
+        logStream = new EventSource(lastEventId ? `${url}&last_event_id=${lastEventId}` : url);
+        logStream.onmessage = (event) => {
+          lastEventId = event.lastEventId;
+          const log: ActivityLogType = JSON.parse(event.data);
+          setAllLogs((logs) => (logs.some((existing) => existing.id === log.id) ? logs : [log, ...logs]));
+        };
+        logStream.onerror = () => {
+          if (logStream?.readyState === EventSource.CLOSED && !unmounted) {
+            reopenTimer = setTimeout(openLogStream, 3000);
+          }
+        };
+      } catch (error) {
+        console.error('Error opening activity log stream:', error);
+      }
+    };
+    openLogStream();
     
-    // Clean up interval on component unmount
-    return () => clearInterval(intervalId);
+    // Clean up interval and stream on component unmount
+    return () => {
+      unmounted = true;
+      clearInterval(intervalId);
+      clearTimeout(reopenTimer);
+      logStream?.close();
+    };
   }, [navigate]);
 
+  // Keep the shown page in step with logs arriving from the stream
+  useEffect(() => {
+    setTotalPages(Math.ceil(allLogs.length / logsPerPage));
+    const startIndex = (currentPage - 1) * logsPerPage;
+    setActivityLogs(allLogs.slice(startIndex, startIndex + logsPerPage));
+  }, [allLogs]);
+
   const fetchAllActivityLogs = async () => {
     try {
       setIsLoadingLogs(true);
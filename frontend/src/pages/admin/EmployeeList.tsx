@@ -129,7 +129,7 @@ const EmployeeList = () => {
       setError('');
       
       // Make API call to backend
-      const response = await axios.get(`${API_BASE_URL}/employees/`, {
+      const response = await axios.get(`${API_BASE_URL}/employees/?include=address`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
       
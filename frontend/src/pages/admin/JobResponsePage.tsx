@@ -10,7 +10,7 @@ import {
   SelectTrigger,
   SelectValue,
 } from "../../components/ui/select";
-import { jobAPI } from "../../lib/api";
+import { jobAPI, openProtectedMedia } from "../../lib/api";
 
 interface JobApplication {
   id: number;
@@ -278,7 +278,7 @@ export default function JobResponsePage() {
                             variant="outline"
                             size="sm"
                             className="text-blue-600 border-blue-200 hover:bg-blue-50"
-                            onClick={() => window.open(selectedApplication.resume, '_blank')}
+                            onClick={() => openProtectedMedia(selectedApplication.resume)}
                           >
                             <Download className="h-4 w-4 mr-2" />
                             Resume
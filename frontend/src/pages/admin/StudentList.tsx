@@ -153,7 +153,7 @@ const StudentList = () => {
       setError('');
       
       // Make API call to backend
-      const response = await axios.get(`${API_BASE_URL}/students/`, {
+      const response = await axios.get(`${API_BASE_URL}/students/?include=address`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
       
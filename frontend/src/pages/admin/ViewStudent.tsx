@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import axios from 'axios';
+import { openProtectedMedia } from '../../lib/api';
 
 interface Student {
   id: number;
@@ -169,6 +170,7 @@ const ViewStudent = () => {
                   <div className="mt-4">
                     <a
                       href={student.resume}
+                      onClick={(e) => openProtectedMedia(student.resume, e)}
                       target="_blank"
                       rel="noopener noreferrer"
                       className="inline-flex items-center px-4 py-2 bg-blue-100 text-blue-700 rounded-md hover:bg-blue-200"
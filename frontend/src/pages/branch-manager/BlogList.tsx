@@ -24,6 +24,7 @@ interface Blog {
   id: number;
   title: string;
   content: string;
+  excerpt: string;
   thumbnail_image: string | null;
   branch: number;
   branch_name: string;
@@ -99,7 +100,7 @@ const BranchManagerBlogList = () => {
       // Try to fetch all published blogs if branch information is missing
       if (!user?.branch) {
         console.warn('Branch information not available, fetching published blogs instead');
-        const response = await blogAPI.getPublished();
+        const response = await blogAPI.getPublished('content');
         setBlogs(response.data);
         setLoading(false);
         setRefreshing(false);
@@ -120,7 +121,7 @@ const BranchManagerBlogList = () => {
       
       // Fallback to published blogs on error
       try {
-        const response = await blogAPI.getPublished();
+        const response = await blogAPI.getPublished('content');
         setBlogs(response.data);
         setError('');
       } catch (fallbackErr) {
@@ -428,7 +429,7 @@ const BranchManagerBlogList = () => {
                   <div className="p-4">
                     <h3 className="font-semibold text-lg text-gray-800 mb-2 line-clamp-1">{blog.title}</h3>
                     <p className="text-gray-600 text-sm mb-4 line-clamp-2">
-                      {truncateText(blog.content, 100)}
+                      {truncateText(blog.excerpt, 100)}
                     </p>
                     <div className="space-y-2 text-sm text-gray-500 mb-4">
                       <div className="flex items-center">
@@ -131,7 +131,7 @@ const EmployeeList = () => {
       setError('');
       
       // API call - backend already filters by branch for branch managers
-      const response = await axios.get(`${API_BASE_URL}/employees/`, {
+      const response = await axios.get(`${API_BASE_URL}/employees/?include=address`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
       
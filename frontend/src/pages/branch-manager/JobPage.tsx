@@ -97,7 +97,7 @@ export default function JobPage() {
       setError('');
       
       // Make API call to backend - already filtered by branch in backend
-      const response = await axios.get(`${API_BASE_URL}/jobs/`, {
+      const response = await axios.get(`${API_BASE_URL}/jobs/?include=description,requirements`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
       
@@ -143,7 +143,7 @@ const StudentList = (): ReactElement => {
         setLoading(true);
       }
 
-      const response = await axios.get(`${API_BASE_URL}/students/`, {
+      const response = await axios.get(`${API_BASE_URL}/students/?include=address`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
 
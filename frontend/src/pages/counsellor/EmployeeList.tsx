@@ -39,7 +39,7 @@ const CounsellorEmployeeList = () => {
           return;
         }
 
-        const response = await axios.get('http://localhost:8000/api/employees/', {
+        const response = await axios.get('http://localhost:8000/api/employees/?include=address', {
           headers: { Authorization: `Bearer ${accessToken}` }
         });
 
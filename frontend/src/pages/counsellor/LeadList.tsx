@@ -207,7 +207,7 @@ const CounsellorLeadList = () => {
         return;
       }
 
-      const response = await axios.get(`${API_BASE_URL}/leads/`, {
+      const response = await axios.get(`${API_BASE_URL}/leads/?include=notes`, {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
 
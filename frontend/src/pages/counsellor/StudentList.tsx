@@ -53,7 +53,7 @@ const CounsellorStudentList = () => {
         return;
       }
 
-      const response = await axios.get('http://localhost:8000/api/students/', {
+      const response = await axios.get('http://localhost:8000/api/students/?include=address', {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
 
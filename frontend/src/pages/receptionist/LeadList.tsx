@@ -44,7 +44,7 @@ const ReceptionistLeadList = () => {
           return;
         }
 
-        const response = await axios.get('http://localhost:8000/api/leads/', {
+        const response = await axios.get('http://localhost:8000/api/leads/?include=notes', {
           headers: { Authorization: `Bearer ${accessToken}` }
         });
 
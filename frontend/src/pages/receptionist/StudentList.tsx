@@ -39,7 +39,7 @@ const ReceptionistStudentList = () => {
         return;
       }
 
-      const response = await axios.get('http://localhost:8000/api/students/', {
+      const response = await axios.get('http://localhost:8000/api/students/?include=address', {
         headers: { Authorization: `Bearer ${accessToken}` }
       });
 
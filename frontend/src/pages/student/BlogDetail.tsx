@@ -11,6 +11,7 @@ interface Blog {
   id: number;
   title: string;
   content: string;
+  excerpt: string;
   author: {
     first_name: string;
     last_name: string;
@@ -264,7 +265,7 @@ const BlogDetail: React.FC = () => {
                           <h3 className="text-lg font-bold text-[#153147] mb-2 line-clamp-2">{relatedBlog.title}</h3>
                           
                           <p className="text-gray-600 mb-4 text-sm line-clamp-2">
-                            {truncateText(relatedBlog.content || "", 80)}
+                            {truncateText(relatedBlog.excerpt || "", 80)}
                           </p>
                           
                           <div className="mt-auto">
@@ -10,7 +10,8 @@ import BlogModal from '../../components/student/BlogModal';
 interface Blog {
   id: number;
   title: string;
-  content: string;
+  excerpt: string;
+  reading_time: number;
   author: {
     first_name: string;
     last_name: string;
@@ -63,7 +64,7 @@ const Blogs: React.FC = () => {
     } else {
       const filtered = blogs.filter(blog => 
         blog.title.toLowerCase().includes(searchQuery.toLowerCase()) ||
-        blog.content.toLowerCase().includes(searchQuery.toLowerCase()) ||
+        blog.excerpt.toLowerCase().includes(searchQuery.toLowerCase()) ||
         `${blog.author.first_name} ${blog.author.last_name}`.toLowerCase().includes(searchQuery.toLowerCase())
       );
       setFilteredBlogs(filtered);
@@ -131,13 +132,7 @@ const Blogs: React.FC = () => {
   };
 
   // Get reading time estimate
-  const getReadingTime = (content: string) => {
-    if (!content) return '1 min read';
-    const wordsPerMinute = 200;
-    const words = content.replace(/<[^>]*>?/gm, '').split(/\s+/).length;
-    const minutes = Math.ceil(words / wordsPerMinute);
-    return `${minutes} min read`;
-  };
+  const getReadingTime = (minutes: number | undefined) => `${minutes || 1} min read`;
 
   return (
     <StudentLayout>
@@ -215,7 +210,7 @@ const Blogs: React.FC = () => {
                       <h2 className="text-3xl font-bold text-[#153147] mb-4">{filteredBlogs[0].title}</h2>
                       
                       <p className="text-gray-600 mb-6">
-                        {truncateText(filteredBlogs[0]?.content || "", 280)}
+                        {truncateText(filteredBlogs[0]?.excerpt || "", 280)}
                       </p>
                       
                       <div className="flex flex-col sm:flex-row sm:items-center gap-4 mb-6">
@@ -235,7 +230,7 @@ const Blogs: React.FC = () => {
                           </div>
                           <div className="flex items-center gap-1 text-sm text-gray-500">
                             <Clock className="h-4 w-4" />
-                            {getReadingTime(filteredBlogs[0]?.content || "")}
+                            {getReadingTime(filteredBlogs[0]?.reading_time)}
                           </div>
                         </div>
                       </div>
@@ -283,7 +278,7 @@ const Blogs: React.FC = () => {
                       <h3 className="text-xl font-bold text-[#153147] mb-3 line-clamp-2">{blog.title}</h3>
                       
                       <p className="text-gray-600 mb-4 line-clamp-3">
-                        {truncateText(blog?.content || "", 150)}
+                        {truncateText(blog?.excerpt || "", 150)}
                       </p>
                       
                       <div className="mt-auto pt-4 border-t border-gray-100 flex items-center justify-between">
@@ -298,7 +293,7 @@ const Blogs: React.FC = () => {
                         </div>
                         <div className="flex items-center gap-1 text-xs text-gray-500">
                           <Clock className="h-3 w-3" />
-                          {getReadingTime(blog?.content || "")}
+                          {getReadingTime(blog?.reading_time)}
                         </div>
                       </div>
                     </div>
@@ -26,7 +26,7 @@ interface FeaturedJob {
 interface Blog {
   id: number;
   title: string;
-  content: string;
+  excerpt: string;
   author: {
     id: number;
     first_name: string;
@@ -174,7 +174,7 @@ const Dashboard: React.FC = () => {
       
       <div className="mb-4">
         <p className="text-gray-600 text-sm">
-          {truncateText(blog.content || "", 120)}
+          {truncateText(blog.excerpt || "", 120)}
         </p>
       </div>
 